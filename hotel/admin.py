@@ -1,7 +1,9 @@
 from django.contrib import admin
-from .models import CustomUser, Room, Booking  # Import your models
+from .models import CustomUser, Room, Booking, Service, RateRule  # Import your models
 
 # Register models here
 admin.site.register(CustomUser)
 admin.site.register(Room)
-admin.site.register(Booking)
\ No newline at end of file
+admin.site.register(Booking)
+admin.site.register(Service)
+admin.site.register(RateRule)
@@ -0,0 +1,205 @@
+"""
+Async versions of the hot read endpoints, for ASGI deployments.
+
+hotel_backend/asgi.py serves hotel_backend/urls_asgi.py, which sends the
+room list, detail and search, my-bookings and the profile here. GET/HEAD
+are answered by these views with the same payloads, status codes and cache
+validators as the DRF views in hotel/views.py; any other method is handed
+to that DRF view. A request waiting on the database or on a slow client
+holds a coroutine instead of a worker.
+
+Rooms, bookings, their nested rooms and services and the booking list
+aggregate are read with the async ORM (async for, aget, aaggregate). Steps
+built on synchronous APIs run through sync_to_async as a whole:
+authentication (simplejwt and the user cache), room cache bookkeeping and
+DRF's cursor pagination. Django's async ORM still runs each query in a
+thread (there is no async database driver under it), so this saves
+coroutine hops rather than threads.
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.http import Http404, HttpResponse
+from django.shortcuts import aget_object_or_404
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions, permissions, status
+from rest_framework.request import Request
+from rest_framework.views import exception_handler
+
+from . import cache as room_cache
+from . import listing, replicas, views
+from .authentication import CachedJWTAuthentication
+from .models import Booking, Room
+from .pagination import RoomSearchPagination
+from .renderers import FastJSONRenderer
+from .serializers import RoomSearchSerializer, RoomSerializer, UserSerializer
+
+
+def render(data, status_code=status.HTTP_200_OK, headers=None):
+    response = HttpResponse(
+        FastJSONRenderer().render(data), content_type='application/json', status=status_code, headers=headers,
+    )
+    response['Vary'] = 'Accept'
+    return response
+
+
+async def cached_room_response(request, version_key, build):
+    """hotel.cache.cached_room_response for an async build(request)."""
+
+    def lookup():
+        etag, last_modified, headers, key = room_cache.room_response_state(request, version_key)
+        if room_cache.not_modified(request, etag, last_modified):
+            return True, headers, key, None
+        payload = cache.get(key)
+        if payload is not None:
+            room_cache.count(room_cache.HITS_KEY)
+        return False, headers, key, payload
+
+    def store(key, payload):
+        room_cache.count(room_cache.MISSES_KEY)
+        cache.set(key, payload, timeout=settings.ROOM_CACHE_TIMEOUT)
+
+    fresh, headers, key, payload = await sync_to_async(lookup)()
+    if fresh:
+        return render(None, status.HTTP_304_NOT_MODIFIED, headers)
+    if payload is None:
+        payload = await build(request)
+        await sync_to_async(store)(key, payload)
+    return render(payload, headers=headers)
+
+
+class AsyncReadView(View):
+    """
+    Authentication, permissions, replica choice and error responses as the
+    DRF view would do them, for GET/HEAD. sync_view handles the rest.
+    """
+    sync_view = None
+    permission_classes = [permissions.AllowAny]
+    authenticator = CachedJWTAuthentication()
+    read_from_replica = False  # as the DRF views using ReplicaReadMixin
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # Token authentication only, like the DRF views
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    def replica_not_before(self):
+        return None
+
+    async def dispatch(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return await sync_to_async(self.sync_view)(request, *args, **kwargs)
+        try:
+            alias = await sync_to_async(self.authorize)(request)
+        except exceptions.APIException as exc:
+            return self.error_response(request, exc)
+
+        token = replicas.read_alias.set(alias)
+        try:
+            return await self.get(request, *args, **kwargs)
+        except Http404 as exc:
+            return self.error_response(request, exceptions.NotFound(*exc.args))
+        except exceptions.APIException as exc:
+            return self.error_response(request, exc)
+        finally:
+            replicas.read_alias.reset(token)
+
+    def authorize(self, request):
+        """Authenticate and check permissions; returns the alias to read from."""
+        result = self.authenticator.authenticate(request)
+        # Not the session user AuthenticationMiddleware put there: DRF ignores it too
+        request.user, request.auth = result if result is not None else (AnonymousUser(), None)
+        for permission in (permission_class() for permission_class in self.permission_classes):
+            if not permission.has_permission(request, self):
+                if result is None:
+                    raise exceptions.NotAuthenticated()
+                raise exceptions.PermissionDenied(getattr(permission, 'message', None))
+        if not self.read_from_replica:
+            return None
+        return replicas.choose_replica(request.user.pk, self.replica_not_before())
+
+    def error_response(self, request, exc):
+        if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+            exc.auth_header = self.authenticator.authenticate_header(request)
+        response = exception_handler(exc, {'request': request, 'view': self})
+        headers = {key: value for key, value in response.items() if key != 'Content-Type'}
+        return render(response.data, response.status_code, headers)
+
+
+class RoomListView(AsyncReadView):
+    sync_view = staticmethod(views.RoomList.as_view())
+    permission_classes = [permissions.IsAdminUser]
+    read_from_replica = True
+
+    def replica_not_before(self):
+        return room_cache.current_version(room_cache.CATALOG_VERSION_KEY) / 1000
+
+    async def get(self, request):
+        return await cached_room_response(request, room_cache.CATALOG_VERSION_KEY, self.build)
+
+    async def build(self, request):
+        fields, _ = listing.parse_fields(request, listing.ROOM_FIELDS)
+        rows = [row async for row in listing.room_values(Room.objects.with_availability(), fields)]
+        return listing.room_payload(rows, request, fields)
+
+
+class RoomDetailView(AsyncReadView):
+    sync_view = staticmethod(views.RoomDetailView.as_view())
+    permission_classes = [permissions.IsAdminUser]
+    read_from_replica = True
+
+    def replica_not_before(self):
+        return room_cache.current_version(room_cache.room_version_key(self.kwargs['pk'])) / 1000
+
+    async def get(self, request, pk):
+        return await cached_room_response(request, room_cache.room_version_key(pk), self.build)
+
+    async def build(self, request):
+        room = await aget_object_or_404(Room.objects.with_availability(), pk=self.kwargs['pk'])
+        return RoomSerializer(room, context={'request': request}).data
+
+
+class RoomSearchView(AsyncReadView):
+    sync_view = staticmethod(views.RoomSearchView.as_view())
+
+    async def get(self, request):
+        params = RoomSearchSerializer(data=request.GET)
+        params.is_valid(raise_exception=True)
+        fields, _ = listing.parse_fields(request, listing.ROOM_FIELDS)
+        rooms = listing.room_values(
+            Room.objects.search(**params.validated_data).with_availability(), fields, RoomSearchPagination.ordering,
+        )
+        # DRF's keyset pagination slices and evaluates the queryset itself
+        paginator = RoomSearchPagination()
+        rows = await sync_to_async(paginator.paginate_queryset)(rooms, Request(request), self)
+        return render(paginator.get_paginated_response(listing.room_payload(rows, request, fields)).data)
+
+
+class UserBookingListView(AsyncReadView):
+    sync_view = staticmethod(views.UserBookingListView.as_view())
+    permission_classes = [permissions.IsAuthenticated]
+    read_from_replica = True
+
+    async def get(self, request):
+        fields, nested = listing.parse_fields(
+            request, listing.BOOKING_FIELDS, {'room_detail': listing.ROOM_FIELDS},
+        )
+        bookings = Booking.objects.filter(user=request.user).order_by('-created_at')
+        summary = await bookings.order_by().aaggregate(**room_cache.booking_list_summary())
+        etag, headers = await sync_to_async(room_cache.booking_list_state)(bookings, summary)
+        if room_cache.not_modified(request, etag):
+            return render(None, status.HTTP_304_NOT_MODIFIED, headers)
+        # Rooms and services are looked up once the bookings are read
+        rows = [row async for row in listing.booking_values(bookings, fields)]
+        data = await listing.abooking_payload(rows, request, fields, nested.get('room_detail', listing.ROOM_FIELDS))
+        return render(data, headers=headers)
+
+
+class UserProfileView(AsyncReadView):
+    sync_view = staticmethod(views.UserProfileView.as_view())
+    permission_classes = [permissions.IsAuthenticated]
+
+    async def get(self, request):
+        return render(UserSerializer(request.user).data)
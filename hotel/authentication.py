@@ -0,0 +1,79 @@
+"""
+JWT authentication with a short-lived cache of the authenticated user.
+
+A cached snapshot holds only the fields authentication, permissions and
+the profile endpoints read (SNAPSHOT_FIELDS). Never the password hash: with
+CHECK_REVOKE_TOKEN it keeps the hash of the hash simplejwt compares tokens
+against. The rebuilt instance has the other fields deferred, so reading one
+loads it, and saving it writes only the fields it holds. Snapshots are keyed
+by user id and a per-user version; any save or delete of the user bumps the
+version (see hotel/signals.py).
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+
+SNAPSHOT_FIELDS = ('id', 'username', 'email', 'phone', 'role', 'is_active', 'is_staff', 'is_superuser')
+
+
+def version_key(user_id):
+    return f'auth:user:{user_id}:version'
+
+
+def snapshot_key(user_id, version):
+    return f'auth:user:{user_id}:v{version}'
+
+
+def invalidate_user(user_id):
+    cache.add(version_key(user_id), 0, timeout=None)
+    try:
+        cache.incr(version_key(user_id))
+    except ValueError:
+        # Evicted between add and incr; a fresh version works just as well
+        cache.set(version_key(user_id), 1, timeout=None)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        version = cache.get(version_key(user_id), 0)
+        key = snapshot_key(user_id, version)
+        snapshot = cache.get(key)
+        if snapshot is None:
+            # Miss: the parent class loads the user and runs its checks
+            user = super().get_user(validated_token)
+            cache.set(key, self.snapshot(user), timeout=settings.AUTH_USER_CACHE_TIMEOUT)
+            return user
+
+        values, password_hash = snapshot
+        user = self.user_model.from_db(DEFAULT_DB_ALIAS, self.snapshot_fields(), values)
+        self.check_user(user, validated_token, password_hash)
+        return user
+
+    def snapshot_fields(self):
+        # In model order, as from_db() expects the values
+        return [field.attname for field in self.user_model._meta.concrete_fields if field.attname in SNAPSHOT_FIELDS]
+
+    def snapshot(self, user):
+        password_hash = get_md5_hash_password(user.password) if api_settings.CHECK_REVOKE_TOKEN else None
+        return [getattr(user, name) for name in self.snapshot_fields()], password_hash
+
+    def check_user(self, user, validated_token, password_hash):
+        # Same checks JWTAuthentication.get_user runs after loading the row
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != password_hash:
+                raise AuthenticationFailed(
+                    _("The user's password has been changed."), code="password_changed"
+                )
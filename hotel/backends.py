@@ -1,15 +1,34 @@
 from django.contrib.auth import get_user_model
 from django.contrib.auth.backends import ModelBackend
+from django.db.models import Value
+from django.db.models.functions import Lower
 
 class EmailBackend(ModelBackend):
     def authenticate(self, request, email=None, password=None, **kwargs):
+        if email is None:
+            # Username logins (admin site, TokenObtainPairView) keep ModelBackend's behaviour
+            return super().authenticate(request, password=password, **kwargs)
+        if password is None:
+            return None
+
         UserModel = get_user_model()
-        try:
-            # Get the first user with this email (temporary fix)
-            user = UserModel.objects.filter(email=email).first()
-        except UserModel.DoesNotExist:
+        # One query on the LOWER(email) index; prefer an exact match if case variants exist
+        candidates = list(
+            UserModel._default_manager.alias(email_lower=Lower('email'))
+            .filter(email_lower=Lower(Value(email)))[:2]
+        )
+        user = next((candidate for candidate in candidates if candidate.email == email), None)
+        if user is None and candidates:
+            user = candidates[0]
+
+        if user is None:
+            # Run the password hasher anyway, so an unknown email takes as long as
+            # a wrong password and can't be told apart by timing
+            UserModel().set_password(password)
             return None
-        
-        if user and user.check_password(password):
+
+        # check_password() re-hashes and saves the password when it was made with
+        # another hasher or cost than the password hashing settings ask for
+        if user.check_password(password) and self.user_can_authenticate(user):
             return user
-        return None
\ No newline at end of file
+        return None
@@ -0,0 +1,138 @@
+"""
+Shared helpers for the benchmark management commands (bench_*).
+
+Benchmarks run against a throwaway copy of the test database (see
+DATABASES['default']['TEST']) so they never touch real data.
+"""
+import json
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from . import pricing, stats
+from .models import CustomUser, Room, Service, Booking
+
+BENCH_PASSWORD = 'bench-Passw0rd!'
+ROOM_TYPES = ['Single', 'Double', 'Twin', 'Family', 'Suite']
+
+
+@contextmanager
+def benchmark_database():
+    # Create an empty, migrated test database and drop it afterwards
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def seed_dataset(users=100, rooms=50, services=10, bookings=1000, seed=0):
+    """
+    Insert a synthetic dataset and return the benchmark accounts.
+
+    Dates spread over the year around today, statuses are mixed, and every
+    booking gets zero to three services.
+    """
+    rng = random.Random(seed)
+    today = timezone.now().date()
+    password = make_password(BENCH_PASSWORD)
+
+    CustomUser.objects.bulk_create([
+        CustomUser(username=f'bench{i}', email=f'bench{i}@example.com', password=password, role='user')
+        for i in range(users)
+    ])
+    admin = CustomUser.objects.create(
+        username='bench-admin', email='bench-admin@example.com', password=password,
+        role='admin', is_staff=True, is_superuser=True,
+    )
+    Room.objects.bulk_create([
+        Room(
+            type=rng.choice(ROOM_TYPES),
+            price=Decimal(rng.randrange(5000, 50000)) / 100,
+            description=f'Benchmark room {i}',
+            max_guests=rng.randint(1, 6),
+            image_url=f'https://example.com/rooms/{i}.jpg',
+        )
+        for i in range(rooms)
+    ])
+    Service.objects.bulk_create([
+        Service(name=f'Service {i}', price=Decimal(rng.randrange(500, 5000)) / 100)
+        for i in range(services)
+    ])
+
+    user_ids = list(CustomUser.objects.filter(is_staff=False).values_list('pk', flat=True))
+    rooms_by_id = Room.objects.in_bulk()
+    room_ids = list(rooms_by_id)
+    services_by_id = Service.objects.in_bulk()
+    service_ids = list(services_by_id)
+    statuses = ['pending', 'approved', 'approved', 'canceled']
+
+    rows, chosen_services = [], []
+    for _ in range(bookings):
+        check_in = today + timedelta(days=rng.randint(-180, 180))
+        nights = rng.randint(1, 7)
+        room_id = rng.choice(room_ids)
+        picked = rng.sample(service_ids, k=min(len(service_ids), rng.randint(0, 3)))
+        rows.append(Booking(
+            user_id=rng.choice(user_ids),
+            room_id=room_id,
+            check_in=check_in,
+            check_out=check_in + timedelta(days=nights),
+            status=rng.choice(statuses),
+            total_price=rooms_by_id[room_id].price * nights + sum(services_by_id[pk].price for pk in picked),
+        ))
+        chosen_services.append(picked)
+    created = Booking.objects.bulk_create(rows, batch_size=500)
+
+    Through = Booking.services.through
+    Through.objects.bulk_create([
+        Through(booking_id=booking.pk, service_id=service_id)
+        for booking, picked in zip(created, chosen_services)
+        for service_id in picked
+    ], batch_size=1000)
+
+    # bulk_create bypasses the signals that maintain the dashboard counters
+    # and the rate calendars
+    stats.rebuild()
+    pricing.rebuild_calendars()
+
+    return {
+        'user': CustomUser.objects.get(username='bench0'),
+        'admin': admin,
+    }
+
+
+def percentile(values, pct):
+    # Nearest-rank percentile, good enough for benchmark reporting
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def timing_summary(seconds):
+    # Milliseconds, rounded for stable JSON output
+    return {
+        'p50_ms': round(percentile(seconds, 50) * 1000, 3),
+        'p95_ms': round(percentile(seconds, 95) * 1000, 3),
+    }
+
+
+def write_json(path, data):
+    with open(path, 'w') as fh:
+        json.dump(data, fh, indent=2, sort_keys=True)
+        fh.write('\n')
+
+
+def read_json(path):
+    with open(path) as fh:
+        return json.load(fh)
@@ -0,0 +1,167 @@
+"""
+Booking operations that change many rows at once.
+
+They write with QuerySet.update() / bulk_create(), which skip the model
+signals, so they apply the dashboard deltas, room cache invalidation,
+replica stickiness and notification emails themselves (the per-instance
+versions live in hotel/signals.py).
+"""
+import operator
+from collections import Counter, defaultdict
+from functools import reduce
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import replicas, stats
+from .mail import build_template_email, enqueue_many
+from .models import ACTIVE_BOOKING_STATUSES, Booking
+from .signals import availability_footprint, booking_deltas, booking_state, invalidate_rooms_on_commit
+
+# Status changes that email the guest, as ApproveBookingView / RejectBookingView do
+NOTIFY_STATUSES = ('approved', 'rejected')
+
+
+def booking_status_email(booking):
+    return build_template_email(
+        f"Your booking is {booking.status}",
+        'email/booking_status',
+        {'booking': booking, 'user': booking.user, 'room': booking.room},
+        [booking.user.email],
+    )
+
+
+def notify_booking_status(booking):
+    booking_status_email(booking).save()
+
+
+def overlaps(a_in, a_out, b_in, b_out):
+    # Stays share a night; check-out days are free, as in BookingQuerySet.overlapping
+    return a_in < b_out and a_out > b_in
+
+
+def find_conflicts(bookings):
+    """
+    For each booking (saved or not), the ids of other active bookings holding
+    its room on any of its days, in input order. One query for the whole list.
+    """
+    if not bookings:
+        return []
+    condition = reduce(operator.or_, [
+        Q(room_id=booking.room_id, check_in__lt=booking.check_out, check_out__gt=booking.check_in)
+        for booking in bookings
+    ])
+    by_room = defaultdict(list)
+    others = (
+        Booking.objects.active().filter(condition)
+        .exclude(pk__in=[booking.pk for booking in bookings if booking.pk is not None])
+        .values_list('pk', 'room_id', 'check_in', 'check_out')
+    )
+    for pk, room_id, check_in, check_out in others:
+        by_room[room_id].append((pk, check_in, check_out))
+    return [
+        [
+            pk for pk, check_in, check_out in by_room[booking.room_id]
+            if overlaps(check_in, check_out, booking.check_in, booking.check_out)
+        ]
+        for booking in bookings
+    ]
+
+
+def record_created(bookings):
+    """Dashboard and room cache updates for bookings inserted with bulk_create()."""
+    deltas = Counter()
+    for booking in bookings:
+        booking._saved_state = booking_state(booking)
+        deltas.update(booking_deltas(booking, booking._saved_state, 1))
+    stats.apply_deltas(deltas)
+    invalidate_rooms_on_commit(*[
+        booking.room_id for booking in bookings if availability_footprint(booking._saved_state)
+    ])
+    record_writes_on_commit(bookings)
+
+
+def record_writes_on_commit(bookings):
+    user_ids = {booking.user_id for booking in bookings}
+    transaction.on_commit(lambda: replicas.record_write(*user_ids))
+
+
+def bulk_update_status(ids, status):
+    """
+    Move the given bookings to status with one UPDATE.
+
+    Returns a result per requested id: 'updated', 'unchanged', 'not_found', or
+    'conflict' when approving the booking (or making it active again) would
+    double-book its room (the overlapping booking ids are listed). Within the
+    batch, the first of two overlapping bookings wins. Conflicts only skip
+    that booking; the others are still updated.
+    """
+    ids = list(dict.fromkeys(ids))
+    with transaction.atomic():
+        bookings = Booking.objects.filter(pk__in=ids).select_related('user', 'room').order_by('pk')
+        if connection.features.has_select_for_update:
+            # Locks the bookings and, through the join, their rooms: the same room
+            # lock BookingSerializer.create takes. The users are only read for the
+            # emails and stay unlocked. SQLite serializes with BEGIN IMMEDIATE.
+            of = ('self', 'room') if connection.features.has_select_for_update_of else ()
+            bookings = bookings.select_for_update(of=of)
+        bookings = {booking.pk: booking for booking in bookings}
+
+        changing = [booking for booking in bookings.values() if booking.status != status]
+        # Approvals re-check, even from pending: two pending stays may overlap
+        checking = [
+            booking for booking in changing
+            if status == 'approved' or (
+                status in ACTIVE_BOOKING_STATUSES and booking.status not in ACTIVE_BOOKING_STATUSES
+            )
+        ]
+        # Other bookings in the batch are settled in order through `claimed` below
+        batch = {booking.pk for booking in checking}
+        conflicts = {
+            booking.pk: [pk for pk in found if pk not in batch]
+            for booking, found in zip(checking, find_conflicts(checking))
+        }
+
+        results, accepted = {}, []
+        claimed = defaultdict(list)  # room id -> stays approved earlier in this batch
+        for booking in changing:
+            if booking.pk in conflicts:
+                overlapping = conflicts[booking.pk] + [
+                    pk for pk, check_in, check_out in claimed[booking.room_id]
+                    if overlaps(check_in, check_out, booking.check_in, booking.check_out)
+                ]
+                if overlapping:
+                    results[booking.pk] = {'result': 'conflict', 'conflicts_with': sorted(overlapping)}
+                    continue
+                claimed[booking.room_id].append((booking.pk, booking.check_in, booking.check_out))
+            accepted.append(booking)
+
+        accepted_ids = [booking.pk for booking in accepted]
+        if accepted:
+            Booking.objects.filter(pk__in=accepted_ids).update(status=status, updated_at=timezone.now())
+
+            deltas, changed_rooms = Counter(), set()
+            for booking in accepted:
+                old_state = booking_state(booking)
+                booking.status = status
+                new_state = booking_state(booking)
+                deltas.update(booking_deltas(booking, old_state, -1))
+                deltas.update(booking_deltas(booking, new_state, 1))
+                if availability_footprint(old_state) != availability_footprint(new_state):
+                    changed_rooms.add(booking.room_id)
+                booking._saved_state = new_state
+            stats.apply_deltas(deltas)
+            if changed_rooms:
+                invalidate_rooms_on_commit(*changed_rooms)
+            record_writes_on_commit(accepted)
+            if status in NOTIFY_STATUSES:
+                enqueue_many([booking_status_email(booking) for booking in accepted])
+
+    accepted_ids = set(accepted_ids)
+    for pk in ids:
+        if pk not in bookings:
+            results[pk] = {'result': 'not_found'}
+        elif pk not in results:
+            results[pk] = {'result': 'updated' if pk in accepted_ids else 'unchanged'}
+    return [{'id': pk, **results[pk]} for pk in ids]
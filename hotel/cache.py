@@ -0,0 +1,155 @@
+"""
+Response cache for the room catalog (RoomList) and room detail pages.
+
+Payloads are stored under versioned keys. A version is the time (in ms) of
+the last change, kept per room and for the catalog as a whole; changing a
+room or a booking that affects its availability bumps both (see
+hotel/signals.py), which orphans the old entries instead of deleting them.
+The version also gives cheap ETag / Last-Modified validators.
+
+Booking lists aren't cached, but get an ETag from one aggregate query (see
+booking_list_state), so an unchanged list is answered with a 304 before any
+row is read or serialized.
+"""
+import hashlib
+import time
+from datetime import datetime, time as dt_time, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.utils import timezone
+from django.utils.http import http_date, parse_http_date_safe
+from rest_framework import status
+from rest_framework.response import Response
+
+CATALOG_VERSION_KEY = 'rooms:catalog:version'
+HITS_KEY = 'rooms:cache:hits'
+MISSES_KEY = 'rooms:cache:misses'
+
+
+def room_version_key(room_id):
+    return f'rooms:{room_id}:version'
+
+
+def now_ms():
+    return int(time.time() * 1000)
+
+
+def invalidate_rooms(room_ids):
+    """Mark the catalog and the given rooms as changed."""
+    version = now_ms()
+    keys = {room_version_key(room_id): version for room_id in room_ids}
+    keys[CATALOG_VERSION_KEY] = version
+    cache.set_many(keys, timeout=None)
+
+
+def current_version(version_key):
+    version = cache.get(version_key)
+    if version is None:
+        # Nothing recorded (cold cache): start a version now
+        cache.add(version_key, now_ms(), timeout=None)
+        version = cache.get(version_key)
+    return version
+
+
+def count(key):
+    # add + incr keeps the counter atomic on backends that support it
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        pass
+
+
+def counters():
+    values = cache.get_many([HITS_KEY, MISSES_KEY])
+    return {'hits': values.get(HITS_KEY, 0), 'misses': values.get(MISSES_KEY, 0)}
+
+
+def weak(etag):
+    # Weak comparison: hotel/middleware.py marks the ETags of compressed responses W/
+    return etag.strip().removeprefix('W/')
+
+
+def not_modified(request, etag, last_modified=None):
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match is not None:
+        return weak(etag) in [weak(tag) for tag in if_none_match.split(',')] or if_none_match.strip() == '*'
+    if last_modified is None:
+        return False
+    if_modified_since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+    return if_modified_since is not None and last_modified // 1000 <= if_modified_since
+
+
+def room_response_state(request, version_key):
+    """
+    Validators, response headers and cache key for a room payload at its current version.
+
+    Availability is computed for today, so the date is part of both the cache
+    key and the validators.
+    """
+    today = timezone.now().date()
+    version = current_version(version_key)
+    midnight = int(datetime.combine(today, dt_time.min, tzinfo=dt_timezone.utc).timestamp() * 1000)
+    last_modified = max(version, midnight)
+    etag = f'"{version}-{today.isoformat()}"'
+    headers = {
+        'ETag': etag,
+        'Last-Modified': http_date(last_modified // 1000),
+        'Cache-Control': 'private, no-cache',
+    }
+    url_hash = hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+    key = f'{version_key}:{version}:{today.isoformat()}:{url_hash}'
+    return etag, last_modified, headers, key
+
+
+def cached_room_response(request, version_key, build):
+    """Serve build()'s payload from the cache, or a 304 if the client's copy is current."""
+    etag, last_modified, headers, key = room_response_state(request, version_key)
+    if not_modified(request, etag, last_modified):
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    payload = cache.get(key)
+    if payload is None:
+        count(MISSES_KEY)
+        payload = build()
+        cache.set(key, payload, timeout=settings.ROOM_CACHE_TIMEOUT)
+    else:
+        count(HITS_KEY)
+    return Response(payload, headers=headers)
+
+
+def booking_list_summary():
+    # Aggregates the booking list ETag is built from
+    return {'count': Count('pk'), 'updated': Max('updated_at')}
+
+
+def booking_list_state(bookings, summary=None):
+    """
+    ETag and response headers for a list of bookings.
+
+    The count and the newest updated_at change with every insert, update or
+    delete in the list; the catalog version and the date cover the nested
+    rooms and their availability. There is no Last-Modified: a deletion has
+    no modification time to report. summary is the booking_list_summary()
+    aggregate when the caller has already read it (the async views do).
+    """
+    today = timezone.now().date()
+    if summary is None:
+        summary = bookings.order_by().aggregate(**booking_list_summary())
+    updated = int(summary['updated'].timestamp() * 1000) if summary['updated'] else 0
+    version = current_version(CATALOG_VERSION_KEY)
+    etag = f'"{summary["count"]}-{updated}-{version}-{today.isoformat()}"'
+    return etag, {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+
+
+def booking_list_response(request, bookings, build):
+    """build()'s response for these bookings, or a 304 if the client's copy is current."""
+    etag, headers = booking_list_state(bookings)
+    if not_modified(request, etag):
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response = build()
+    for name, value in headers.items():
+        response[name] = value
+    return response
@@ -0,0 +1,23 @@
+"""
+Per-connection database setup.
+
+SQLite keeps most tuning in per-connection PRAGMAs, so they are applied
+whenever Django opens a connection (the connection_created signal), from
+settings.SQLITE_PRAGMAS. They only last as long as the connection.
+
+The journal mode is different: it is stored in the database file, so setting
+it here would rewrite the file on every run of any command. It is set once,
+by migration 0014 (SQLITE_JOURNAL_MODE), like any other schema change.
+"""
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for pragma, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {pragma} = {value}')
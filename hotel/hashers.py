@@ -0,0 +1,30 @@
+"""
+Password hashers whose cost comes from settings.
+
+The algorithm names match Django's own hashers, so existing hashes keep
+verifying. When the configured cost differs from a stored hash's, must_update()
+is true and Django re-hashes the password on the next successful login (see
+hotel/backends.py), which lets ops move the cost in either direction.
+"""
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher, PBKDF2PasswordHasher
+
+
+class TunedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    @property
+    def iterations(self):
+        return settings.PASSWORD_PBKDF2_ITERATIONS
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    @property
+    def time_cost(self):
+        return settings.PASSWORD_ARGON2_TIME_COST
+
+    @property
+    def memory_cost(self):
+        return settings.PASSWORD_ARGON2_MEMORY_COST
+
+    @property
+    def parallelism(self):
+        return settings.PASSWORD_ARGON2_PARALLELISM
@@ -0,0 +1,191 @@
+"""
+Background checks of Room.image_url.
+
+validate_image_url only looks at the extension, so saving a room never waits
+on the network. A changed URL marks the room 'pending' (hotel/signals.py)
+and `manage.py probe_image_urls` (a worker, like send_queued_email) fetches
+the headers of pending URLs in parallel: the URL must answer 2xx with an
+image/* content type and at most IMAGE_URL_MAX_BYTES. Servers that reject
+HEAD or omit Content-Length get a GET whose body is read only up to the limit.
+
+Only http(s) URLs are fetched, and (unless IMAGE_URL_ALLOW_PRIVATE_HOSTS) only
+from hosts resolving to public addresses, so a room's URL can't be used to
+reach the server's own network. Redirects are checked the same way.
+
+Results are cached by URL, so rooms sharing an image and re-saves of a known
+URL don't fetch again. Network failures and 5xx answers are 'unreachable'
+and cached for a shorter time; the worker retries them once that expires.
+"""
+import hashlib
+import ipaddress
+import logging
+import socket
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+
+from . import cache as room_cache
+from .models import Room
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = 'hotel-backend image check'
+READ_CHUNK = 64 * 1024
+ALLOWED_SCHEMES = ('http', 'https')
+
+
+class RefusedURL(Exception):
+    pass
+
+
+def cache_key(url):
+    return f"image_url:{hashlib.sha256(url.encode()).hexdigest()}"
+
+
+def result(status, detail='', size=None):
+    return {'status': status, 'detail': detail[:255], 'size': size}
+
+
+def check_url(url):
+    """Raise RefusedURL unless url is http(s) on a host we may fetch from."""
+    parts = urllib.parse.urlsplit(url)
+    if parts.scheme not in ALLOWED_SCHEMES or not parts.hostname:
+        raise RefusedURL(f"Not an http(s) URL: {url}")
+    if settings.IMAGE_URL_ALLOW_PRIVATE_HOSTS:
+        return
+    for *_, sockaddr in socket.getaddrinfo(parts.hostname, None, proto=socket.IPPROTO_TCP):
+        address = ipaddress.ip_address(sockaddr[0].split('%')[0])
+        if not address.is_global or address.is_multicast:
+            raise RefusedURL(f"Refused non-public host: {parts.hostname}")
+
+
+class CheckedRedirectHandler(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        check_url(newurl)
+        return super().redirect_request(req, fp, code, msg, headers, newurl)
+
+
+opener = urllib.request.build_opener(CheckedRedirectHandler)
+
+
+def request(url, method):
+    return opener.open(
+        urllib.request.Request(url, method=method, headers={'User-Agent': USER_AGENT}),
+        timeout=settings.IMAGE_URL_PROBE_TIMEOUT,
+    )
+
+
+def body_size(response, limit):
+    # Read at most one byte past the limit; we only need to know it is too big
+    size = 0
+    while size <= limit:
+        chunk = response.read(min(READ_CHUNK, limit + 1 - size))
+        if not chunk:
+            break
+        size += len(chunk)
+    return size
+
+
+def probe(url):
+    """Check one URL over the network. Returns {'status', 'detail', 'size'}."""
+    limit = settings.IMAGE_URL_MAX_BYTES
+    try:
+        check_url(url)
+        method = 'HEAD'
+        try:
+            response = request(url, method)
+        except urllib.error.HTTPError as exc:
+            if exc.code not in (403, 405, 501):
+                raise
+            method = 'GET'  # HEAD not supported
+            response = request(url, method)
+        with response:
+            content_type = response.headers.get_content_type()
+            length = response.headers.get('Content-Length', '')
+            if not content_type.startswith('image/'):
+                return result('invalid', f"Not an image: {content_type}")
+            if length.isdigit():
+                size = int(length)
+            elif method == 'GET':
+                size = body_size(response, limit)
+        if not length.isdigit() and method == 'HEAD':
+            with request(url, 'GET') as response:
+                size = body_size(response, limit)
+    except RefusedURL as exc:
+        return result('invalid', str(exc))
+    except urllib.error.HTTPError as exc:
+        if exc.code >= 500:
+            return result('unreachable', f"HTTP {exc.code}")
+        return result('invalid', f"HTTP {exc.code}")
+    except (OSError, ValueError) as exc:
+        # URLError, timeouts, refused connections, malformed responses
+        return result('unreachable', str(getattr(exc, 'reason', exc)))
+
+    if size > limit:
+        return result('invalid', f"Image is larger than {limit} bytes", size)
+    return result('valid', size=size)
+
+
+def cached_probe(url):
+    found = cache.get(cache_key(url))
+    if found is not None:
+        return found
+    checked = probe(url)
+    timeout = (
+        settings.IMAGE_URL_RETRY_SECONDS if checked['status'] == 'unreachable'
+        else settings.IMAGE_URL_CACHE_TIMEOUT
+    )
+    cache.set(cache_key(url), checked, timeout)
+    return checked
+
+
+def pending_rooms():
+    # New or changed URLs, plus unreachable ones whose retry delay has passed
+    retry_before = timezone.now() - timedelta(seconds=settings.IMAGE_URL_RETRY_SECONDS)
+    return Room.objects.filter(
+        Q(image_url_status='pending')
+        | Q(image_url_status='unreachable', image_url_checked_at__lte=retry_before)
+    )
+
+
+def process_pending(batch_size=50):
+    """Probe up to batch_size rooms' URLs. Returns the number of rooms checked."""
+    rooms = list(pending_rooms().order_by('pk').values_list('pk', 'image_url')[:batch_size])
+    if not rooms:
+        return 0
+    urls = list({url for _, url in rooms})
+    with ThreadPoolExecutor(max_workers=min(settings.IMAGE_URL_PROBE_WORKERS, len(urls))) as pool:
+        results = dict(zip(urls, pool.map(cached_probe, urls)))
+
+    now = timezone.now()
+    for pk, url in rooms:
+        checked = results[url]
+        if checked['status'] != 'valid':
+            logger.info("Room %s image URL %s is %s: %s", pk, url, checked['status'], checked['detail'])
+        # Conditional on the URL, so one changed meanwhile stays pending.
+        # QuerySet.update skips signals, hence the explicit cache invalidation.
+        Room.objects.filter(pk=pk, image_url=url).update(
+            image_url_status=checked['status'], image_url_detail=checked['detail'],
+            image_url_size=checked['size'], image_url_checked_at=now,
+        )
+    room_cache.invalidate_rooms([pk for pk, _ in rooms])
+    return len(rooms)
+
+
+def reset_status(room):
+    """Mark a room's URL for checking, or apply a cached result straight away."""
+    checked = cache.get(cache_key(room.image_url))
+    if checked is None:
+        room.image_url_status, room.image_url_detail, room.image_url_size = 'pending', '', None
+        room.image_url_checked_at = None
+    else:
+        room.image_url_status, room.image_url_detail = checked['status'], checked['detail']
+        room.image_url_size = checked['size']
+        room.image_url_checked_at = timezone.now()
@@ -0,0 +1,112 @@
+"""
+Responsive variants of uploaded room images.
+
+Saving Room.image only stores the original. `manage.py process_room_images`
+(a worker, like send_queued_email) picks up rooms whose variants were made
+from a different file and writes resized JPEG and WebP copies plus a square
+thumbnail. Variant names contain a hash of their bytes, so a name never
+changes content and can be served with a far-future Cache-Control.
+RoomSerializer exposes them as srcset strings.
+"""
+import hashlib
+import io
+import logging
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models import F
+from PIL import Image, ImageOps
+
+from . import cache as room_cache
+from .models import Room
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {'jpeg': ('JPEG', 'jpg'), 'webp': ('WEBP', 'webp')}
+
+
+def pending_rooms():
+    # Rooms with an image their variants weren't made from (new upload or replaced)
+    return Room.objects.exclude(image='').exclude(image__isnull=True).exclude(image_variants_source=F('image'))
+
+
+def encode(image, fmt):
+    buffer = io.BytesIO()
+    pil_format, _ = FORMATS[fmt]
+    image.save(buffer, pil_format, quality=settings.ROOM_IMAGE_QUALITY, optimize=True)
+    return buffer.getvalue()
+
+
+def store(content, label, fmt):
+    """Save content under a name derived from its hash; identical bytes are stored once."""
+    digest = hashlib.sha256(content).hexdigest()[:16]
+    name = f"{settings.ROOM_IMAGE_VARIANT_DIR}/{digest}-{label}.{FORMATS[fmt][1]}"
+    if not default_storage.exists(name):
+        name = default_storage.save(name, ContentFile(content))
+    return name
+
+
+def build_variants(image_file):
+    """Resize one uploaded image into every configured width and format, plus thumbnails."""
+    with Image.open(image_file) as original:
+        original = ImageOps.exif_transpose(original).convert('RGB')
+        # Never upscale: keep the widths below the original, or the original width alone
+        widths = [width for width in settings.ROOM_IMAGE_WIDTHS if width < original.width] or [original.width]
+
+        variants = {fmt: [] for fmt in FORMATS}
+        for width in widths:
+            height = round(original.height * width / original.width)
+            resized = original.resize((width, height), Image.LANCZOS)
+            for fmt in FORMATS:
+                variants[fmt].append([width, store(encode(resized, fmt), f'{width}w', fmt)])
+
+        size = settings.ROOM_IMAGE_THUMBNAIL_SIZE
+        thumbnail = ImageOps.fit(original, (size, size), Image.LANCZOS)
+        variants['thumbnail'] = {fmt: store(encode(thumbnail, fmt), f'thumb{size}', fmt) for fmt in FORMATS}
+    return variants
+
+
+def process_pending(batch_size=20):
+    """Build variants for up to batch_size rooms. Returns (processed, failed) counts."""
+    processed = failed = 0
+    for room in pending_rooms().order_by('pk')[:batch_size]:
+        source = room.image.name
+        try:
+            with room.image.open('rb') as image_file:
+                variants, error = build_variants(image_file), ''
+            processed += 1
+        except Exception as exc:
+            # Unreadable upload: record it and move on rather than retrying forever
+            logger.warning("Could not build variants for room %s (%s): %s", room.pk, source, exc)
+            variants, error = {}, str(exc)
+            failed += 1
+        # Conditional on the image, so a replacement uploaded meanwhile stays pending.
+        # QuerySet.update skips signals, hence the explicit cache invalidation.
+        Room.objects.filter(pk=room.pk, image=source).update(
+            image_variants=variants, image_variants_source=source, image_variants_error=error,
+        )
+        room_cache.invalidate_rooms([room.pk])
+    return processed, failed
+
+
+def srcset(room, request=None):
+    """srcset strings per format plus thumbnail URLs, or None until the variants are ready."""
+    return srcset_from(room.image.name, room.image_variants_source, room.image_variants, request)
+
+
+def srcset_from(image, source, variants, request=None):
+    # srcset() for the raw column values (see hotel/listing.py)
+    if not image or source != image or not variants:
+        return None
+
+    def url(name):
+        location = default_storage.url(name)
+        return request.build_absolute_uri(location) if request is not None else location
+
+    payload = {
+        fmt: ', '.join(f'{url(name)} {width}w' for width, name in variants[fmt])
+        for fmt in FORMATS
+    }
+    payload['thumbnail'] = {fmt: url(name) for fmt, name in variants['thumbnail'].items()}
+    return payload
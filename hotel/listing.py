@@ -0,0 +1,191 @@
+"""
+Read-only list payloads built from .values() rows.
+
+RoomSerializer / BookingSerializer build every row field by field through
+model instances (and a nested RoomSerializer per booking). The list
+endpoints only read, so here rows come straight from .values() querysets
+and are converted into exactly what those serializers output: same keys
+in the same order, decimals as fixed-point strings, dates and datetimes as
+DRF formats them, absolute image URLs when a request is given.
+
+Clients may ask for fewer fields with ?fields=id,price (for bookings also
+nested room fields, e.g. room_detail.type); unselected columns, rooms and
+services are then not queried at all.
+"""
+from decimal import Decimal
+
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from rest_framework import serializers
+
+from . import images
+from .models import Room, Service
+
+# Output keys, in RoomSerializer / BookingSerializer order
+ROOM_FIELDS = (
+    'id', 'is_available', 'image_srcset', 'type', 'price', 'description', 'max_guests', 'image_url',
+    'image', 'image_url_status', 'image_url_detail', 'image_url_size', 'image_url_checked_at',
+)
+BOOKING_FIELDS = (
+    'id', 'user', 'room_detail', 'check_in', 'check_out', 'status', 'created_at', 'services', 'total_price',
+)
+
+# Columns each output field is built from
+ROOM_COLUMNS = {
+    'is_available': ('has_active_booking',),
+    'image_srcset': ('image', 'image_variants_source', 'image_variants'),
+}
+BOOKING_COLUMNS = {
+    'user': ('user_id',),
+    'room_detail': ('room_id',),
+    'services': (),
+}
+
+CENT = Decimal('0.01')
+
+
+def decimal(value):
+    # DecimalField(decimal_places=2) with COERCE_DECIMAL_TO_STRING
+    return None if value is None else f'{value.quantize(CENT):f}'
+
+
+def datetime(value):
+    if value is None:
+        return None
+    value = timezone.localtime(value).isoformat()
+    return value[:-6] + 'Z' if value.endswith('+00:00') else value
+
+
+def date(value):
+    return None if value is None else value.isoformat()
+
+
+def file_url(name, request):
+    if not name:
+        return None
+    url = default_storage.url(name)
+    return request.build_absolute_uri(url) if request is not None else url
+
+
+def parse_fields(request, fields, nested=None):
+    """
+    Fields selected with ?fields= as (fields, nested fields), in output order.
+
+    nested maps a field holding an object to that object's fields; naming the
+    field alone selects all of them. Without ?fields= everything is selected.
+    """
+    nested = nested or {}
+    # GET rather than query_params: async views pass Django's request
+    raw = request.GET.get('fields') if request is not None else None
+    if not raw:
+        return fields, dict(nested)
+
+    names = [name.strip() for name in raw.split(',') if name.strip()]
+    unknown = [
+        name for name in names
+        if name not in fields and not (
+            '.' in name and name.split('.', 1)[0] in nested and name.split('.', 1)[1] in nested[name.split('.', 1)[0]]
+        )
+    ]
+    if unknown:
+        raise serializers.ValidationError({'fields': [f"Unknown field: {name}" for name in unknown]})
+
+    selected_nested = {}
+    for parent, children in nested.items():
+        if parent in names:
+            selected_nested[parent] = children
+        else:
+            picked = {name.split('.', 1)[1] for name in names if name.startswith(parent + '.')}
+            if picked:
+                selected_nested[parent] = tuple(child for child in children if child in picked)
+    selected = tuple(field for field in fields if field in names or field in selected_nested)
+    return selected, selected_nested
+
+
+def columns(fields, mapping, always=()):
+    needed = list(dict.fromkeys(always))
+    for field in fields:
+        for column in mapping.get(field, (field,)):
+            if column not in needed:
+                needed.append(column)
+    return needed
+
+
+def room_values(rooms, fields=ROOM_FIELDS, always=()):
+    """rooms (annotated by with_availability() or available()) as .values() rows."""
+    return rooms.values(*columns(fields, ROOM_COLUMNS, always))
+
+
+def room_payload(rows, request=None, fields=ROOM_FIELDS):
+    convert = {
+        'is_available': lambda row: not row['has_active_booking'],
+        'image_srcset': lambda row: images.srcset_from(
+            row['image'], row['image_variants_source'], row['image_variants'], request,
+        ),
+        'price': lambda row: decimal(row['price']),
+        'image': lambda row: file_url(row['image'], request),
+        'image_url_checked_at': lambda row: datetime(row['image_url_checked_at']),
+    }
+    converters = [(field, convert.get(field) or (lambda row, field=field: row[field])) for field in fields]
+    return [{field: build(row) for field, build in converters} for row in rows]
+
+
+def rooms(queryset, request=None, fields=ROOM_FIELDS):
+    return room_payload(room_values(queryset, fields), request, fields)
+
+
+def booking_values(bookings, fields=BOOKING_FIELDS, always=()):
+    return bookings.values(*columns(fields, BOOKING_COLUMNS, ('id', *always)))
+
+
+def related_queries(rows, fields=BOOKING_FIELDS, room_fields=ROOM_FIELDS):
+    """The (room rows, (booking id, service id) pairs) querysets for booking rows, None if not selected."""
+    room_rows = services = None
+    if 'room_detail' in fields and rows:
+        room_rows = room_values(
+            Room.objects.with_availability().filter(pk__in={row['room_id'] for row in rows}), room_fields, ('id',),
+        )
+    if 'services' in fields and rows:
+        # The join prefetch_related('services') runs, so ids come in the same order
+        services = Service.objects.filter(booking__in=[row['id'] for row in rows]).values_list('booking', 'pk')
+    return room_rows, services
+
+
+def build_booking_payload(rows, room_rows, service_pairs, request=None, fields=BOOKING_FIELDS, room_fields=ROOM_FIELDS):
+    rooms_by_id = {row['id']: room for row, room in zip(room_rows, room_payload(room_rows, request, room_fields))}
+    services = {}
+    for booking_id, service_id in service_pairs:
+        services.setdefault(booking_id, []).append(service_id)
+
+    convert = {
+        'user': lambda row: row['user_id'],
+        'room_detail': lambda row: rooms_by_id.get(row['room_id']),
+        'check_in': lambda row: date(row['check_in']),
+        'check_out': lambda row: date(row['check_out']),
+        'created_at': lambda row: datetime(row['created_at']),
+        'services': lambda row: services.get(row['id'], []),
+        'total_price': lambda row: decimal(row['total_price']),
+    }
+    converters = [(field, convert.get(field) or (lambda row, field=field: row[field])) for field in fields]
+    return [{field: build(row) for field, build in converters} for row in rows]
+
+
+def booking_payload(rows, request=None, fields=BOOKING_FIELDS, room_fields=ROOM_FIELDS):
+    """Booking rows plus their rooms and services, one query each for the whole list."""
+    rows = list(rows)
+    room_rows, services = related_queries(rows, fields, room_fields)
+    return build_booking_payload(
+        rows, list(room_rows or ()), list(services or ()), request, fields, room_fields,
+    )
+
+
+async def abooking_payload(rows, request=None, fields=BOOKING_FIELDS, room_fields=ROOM_FIELDS):
+    """booking_payload() reading the rooms and services with the async ORM."""
+    room_rows, services = related_queries(rows, fields, room_fields)
+    room_rows = [row async for row in room_rows] if room_rows is not None else []
+    services = [pair async for pair in services] if services is not None else []
+    return build_booking_payload(rows, room_rows, services, request, fields, room_fields)
+
+
+def bookings(queryset, request=None, fields=BOOKING_FIELDS, room_fields=ROOM_FIELDS):
+    return booking_payload(booking_values(queryset, fields), request, fields, room_fields)
@@ -0,0 +1,121 @@
+"""
+Outbound email queue.
+
+Request handlers only call enqueue_email() / enqueue_template_email() (or
+enqueue_many() for a batch), which insert OutboundEmail rows.
+`manage.py send_queued_email` delivers due rows in batches over one SMTP
+connection and retries failures with exponential backoff.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+
+def build_email(subject, body, recipients, html_body='', from_email=''):
+    return OutboundEmail(
+        subject=subject,
+        body=body,
+        html_body=html_body or '',
+        from_email=from_email or '',
+        recipients=list(recipients),
+    )
+
+
+def enqueue_email(subject, body, recipients, html_body='', from_email=''):
+    message = build_email(subject, body, recipients, html_body=html_body, from_email=from_email)
+    message.save()
+    return message
+
+
+def build_template_email(subject, template_name, context, recipients):
+    """
+    Render <template_name>.txt (required) and <template_name>.html (optional)
+    into an unsaved message.
+    """
+    body = render_to_string(f'{template_name}.txt', context)
+    try:
+        html_body = render_to_string(f'{template_name}.html', context)
+    except Exception as exc:
+        # Fall back to text-only, as the synchronous sender used to
+        logger.warning("Could not render %s.html (%s); sending text only", template_name, exc)
+        html_body = ''
+    return build_email(subject, body, recipients, html_body=html_body)
+
+
+def enqueue_template_email(subject, template_name, context, recipients):
+    message = build_template_email(subject, template_name, context, recipients)
+    message.save()
+    return message
+
+
+def enqueue_many(messages):
+    """Queue several unsaved messages (see build_email) with one INSERT."""
+    return OutboundEmail.objects.bulk_create(messages)
+
+
+def retry_delay(attempts):
+    return timedelta(seconds=settings.EMAIL_OUTBOX_RETRY_BASE * 2 ** (attempts - 1))
+
+
+def claim_due(batch_size):
+    """
+    Lease up to batch_size due messages to this worker.
+
+    Pushing next_attempt_at past the lease keeps other workers off them while
+    SMTP runs outside any database transaction.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        due = OutboundEmail.objects.filter(status='pending', next_attempt_at__lte=now).order_by('next_attempt_at')
+        if transaction.get_connection().features.has_select_for_update_skip_locked:
+            due = due.select_for_update(skip_locked=True)
+        ids = list(due.values_list('id', flat=True)[:batch_size])
+        OutboundEmail.objects.filter(id__in=ids).update(
+            next_attempt_at=now + timedelta(seconds=settings.EMAIL_OUTBOX_LEASE_SECONDS)
+        )
+    return list(OutboundEmail.objects.filter(id__in=ids).order_by('id'))
+
+
+def deliver_due(batch_size=50, connection=None):
+    """Send one batch of due messages. Returns (sent, failed) counts."""
+    messages = claim_due(batch_size)
+    if not messages:
+        return 0, 0
+
+    sent = failed = 0
+    connection = connection or get_connection()
+    with connection:  # opens once, closes after the batch
+        for message in messages:
+            email = EmailMultiAlternatives(
+                message.subject, message.body, message.from_email or None, message.recipients,
+                connection=connection,
+            )
+            if message.html_body:
+                email.attach_alternative(message.html_body, 'text/html')
+
+            message.attempts += 1
+            try:
+                email.send()
+            except Exception as exc:
+                failed += 1
+                message.last_error = str(exc)
+                if message.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+                    message.status = 'failed'
+                else:
+                    message.next_attempt_at = timezone.now() + retry_delay(message.attempts)
+            else:
+                sent += 1
+                message.status = 'sent'
+                message.sent_at = timezone.now()
+                message.last_error = ''
+            message.save(update_fields=['status', 'attempts', 'next_attempt_at', 'last_error', 'sent_at'])
+    return sent, failed
@@ -0,0 +1,203 @@
+import asyncio
+import importlib.util
+import os
+import socket
+import subprocess
+import sys
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from hotel.bench import benchmark_database, percentile, seed_dataset, timing_summary, write_json
+from hotel.models import Room
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+async def read_response(reader):
+    """Read one HTTP/1.1 response; returns (status, whether the server closes the connection)."""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionResetError("connection closed")
+    status = int(status_line.split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    close = headers.get('connection', '').lower() == 'close' or status_line.startswith(b'HTTP/1.0')
+    if 'content-length' in headers:
+        await reader.readexactly(int(headers['content-length']))
+    elif headers.get('transfer-encoding', '').lower() == 'chunked':
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    elif status not in (204, 304):
+        await reader.read()
+        close = True
+    return status, close
+
+
+async def keep_alive_client(port, paths, token, deadline, think, results):
+    loop = asyncio.get_running_loop()
+    reader = writer = None
+    index = 0
+    while loop.time() < deadline:
+        path = paths[index % len(paths)]
+        index += 1
+        started = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+                results['connects'] += 1
+            writer.write((
+                f"GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nAuthorization: Bearer {token}\r\n"
+                f"Connection: keep-alive\r\n\r\n"
+            ).encode())
+            await writer.drain()
+            status, close = await asyncio.wait_for(read_response(reader), timeout=60)
+        except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError, ValueError, IndexError):
+            results['errors'] += 1
+            if writer is not None:
+                writer.close()
+            reader = writer = None
+            await asyncio.sleep(0.05)
+            continue
+        results['timings'].append(time.perf_counter() - started)
+        results['statuses'][status] = results['statuses'].get(status, 0) + 1
+        if close:
+            writer.close()
+            reader = writer = None
+        if think:
+            await asyncio.sleep(think)
+    if writer is not None:
+        writer.close()
+
+
+async def run_load(port, paths, token, connections, duration, think):
+    results = {'timings': [], 'statuses': {}, 'errors': 0, 'connects': 0}
+    deadline = asyncio.get_running_loop().time() + duration
+    started = time.perf_counter()
+    await asyncio.gather(*[
+        keep_alive_client(port, paths, token, deadline, think, results) for _ in range(connections)
+    ])
+    elapsed = time.perf_counter() - started
+    return {
+        'requests': len(results['timings']),
+        'requests_per_second': round(len(results['timings']) / elapsed, 1),
+        'errors': results['errors'],
+        'connects': results['connects'],
+        'statuses': {str(code): count for code, count in sorted(results['statuses'].items())},
+        'p99_ms': round(percentile(results['timings'], 99) * 1000, 3),
+        **timing_summary(results['timings']),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Serve the read endpoints with gunicorn sync workers (WSGI, hotel/views.py) and with "
+        "uvicorn workers (ASGI, hotel/async_views.py), and compare throughput and tail latency "
+        "with many concurrent keep-alive clients."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--connections', type=int, default=1000)
+        parser.add_argument('--duration', type=float, default=15.0, help="Seconds of load per server.")
+        parser.add_argument('--workers', type=int, default=4, help="Server processes for each mode.")
+        parser.add_argument('--threads', type=int, default=1, help="Threads per gunicorn sync worker (gthread if > 1).")
+        parser.add_argument('--think-ms', type=float, default=0.0, help="Idle time between a client's requests.")
+        parser.add_argument('--output', help="Write the results to this JSON file.")
+
+    def handle(self, *args, **options):
+        modes = [('wsgi', self.wsgi_command(options))]
+        if importlib.util.find_spec('uvicorn'):
+            modes.append(('asgi', self.asgi_command(options)))
+        else:
+            self.stdout.write("uvicorn is not installed: ASGI mode skipped (pip install uvicorn).")
+
+        results = {}
+        with benchmark_database():
+            accounts = seed_dataset(users=200, rooms=100, services=10, bookings=5000)
+            token = str(RefreshToken.for_user(accounts['admin']).access_token)
+            room_id = Room.objects.order_by('pk').values_list('pk', flat=True).first()
+            check_in = timezone.now().date() + timedelta(days=30)
+            paths = [
+                '/api/rooms/',
+                f'/api/rooms/{room_id}/',
+                f'/api/rooms/search/?check_in={check_in}&check_out={check_in + timedelta(days=3)}',
+                '/api/bookings/my-bookings/',
+                '/api/user/',
+            ]
+            env = {key: value for key, value in os.environ.items() if key != 'DJANGO_ROOT_URLCONF'}
+            env.update(self.database_env())
+            connection.close()
+
+            for mode, command in modes:
+                port = free_port()
+                server = subprocess.Popen(
+                    [*command, '--bind', f'127.0.0.1:{port}'], env=env,
+                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                )
+                try:
+                    self.wait_until_ready(port)
+                    results[mode] = asyncio.run(run_load(
+                        port, paths, token, options['connections'], options['duration'], options['think_ms'] / 1000,
+                    ))
+                finally:
+                    server.terminate()
+                    server.wait(timeout=30)
+                self.report(mode, results[mode])
+
+        if options['output']:
+            write_json(options['output'], results)
+
+    def wsgi_command(self, options):
+        command = [
+            sys.executable, '-m', 'gunicorn', 'hotel_backend.wsgi:application',
+            '--workers', str(options['workers']), '--backlog', str(max(2048, options['connections'] * 2)),
+        ]
+        if options['threads'] > 1:
+            command += ['--threads', str(options['threads'])]
+        return command
+
+    def asgi_command(self, options):
+        return [
+            sys.executable, '-m', 'gunicorn', 'hotel_backend.asgi:application',
+            '--worker-class', 'uvicorn.workers.UvicornWorker',
+            '--workers', str(options['workers']), '--backlog', str(max(2048, options['connections'] * 2)),
+        ]
+
+    def database_env(self):
+        # Point the servers at the benchmark database; asgi.py picks the async URLconf itself
+        name = str(connection.settings_dict['NAME'])
+        return {'SQLITE_PATH': name} if connection.vendor == 'sqlite' else {'DATABASE_NAME': name}
+
+    def wait_until_ready(self, port, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                with socket.create_connection(('127.0.0.1', port), timeout=1):
+                    return
+            except OSError:
+                time.sleep(0.2)
+        raise RuntimeError(f"server on port {port} did not start")
+
+    def report(self, mode, result):
+        self.stdout.write(
+            f"{mode:<5} {result['requests_per_second']:>9.1f} req/s  p50 {result['p50_ms']:>9.2f} ms  "
+            f"p95 {result['p95_ms']:>9.2f} ms  p99 {result['p99_ms']:>9.2f} ms  "
+            f"errors {result['errors']}  connects {result['connects']}  statuses {result['statuses']}"
+        )
@@ -0,0 +1,41 @@
+import time
+
+from django.contrib.auth import authenticate
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from hotel.bench import BENCH_PASSWORD, benchmark_database, seed_dataset, timing_summary
+
+
+class Command(BaseCommand):
+    help = (
+        "Microbenchmark email login through the configured authentication backends: "
+        "query count and p50/p95 latency for a hit, a wrong password and an unknown email."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--iterations', type=int, default=20)
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            user = seed_dataset(users=options['users'], rooms=1, services=0, bookings=0)['user']
+            cases = [
+                ('hit', user.email.upper(), BENCH_PASSWORD),
+                ('wrong-password', user.email, BENCH_PASSWORD + 'x'),
+                ('unknown-email', 'nobody@example.com', BENCH_PASSWORD),
+            ]
+            for name, email, password in cases:
+                with CaptureQueriesContext(connection) as queries:
+                    result = authenticate(email=email, password=password)
+                timings = []
+                for _ in range(options['iterations']):
+                    started = time.perf_counter()
+                    authenticate(email=email, password=password)
+                    timings.append(time.perf_counter() - started)
+                summary = timing_summary(timings)
+                self.stdout.write(
+                    f"{name:<16} {'ok' if result else 'rejected':<9} {len(queries):>2} queries  "
+                    f"p50 {summary['p50_ms']:>8.2f} ms  p95 {summary['p95_ms']:>8.2f} ms"
+                )
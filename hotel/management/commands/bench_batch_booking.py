@@ -0,0 +1,64 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from hotel.bench import benchmark_database, seed_dataset, timing_summary
+from hotel.models import Room, Service
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare booking N rooms one request at a time (bookings/create/) with one "
+        "bookings/batch/ request, reporting latency and items per second for each N."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='*', default=[1, 5, 20, 50, 100])
+        parser.add_argument('--iterations', type=int, default=10)
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            user = seed_dataset(users=10, rooms=max(options['sizes']), services=10, bookings=1000)['user']
+            client = APIClient()
+            client.force_authenticate(user)
+            room_ids = list(Room.objects.order_by('pk').values_list('pk', flat=True))
+            service_ids = list(Service.objects.order_by('pk').values_list('pk', flat=True)[:2])
+            check_in = timezone.now().date() + timedelta(days=400)
+
+            for size in options['sizes']:
+                items = [
+                    {
+                        'room': room_id,
+                        'check_in': check_in.isoformat(),
+                        'check_out': (check_in + timedelta(days=3)).isoformat(),
+                        'services': service_ids,
+                    }
+                    for room_id in room_ids[:size]
+                ]
+                single = self.measure(options['iterations'], lambda: [
+                    client.post('/api/bookings/create/', item, format='json') for item in items
+                ])
+                batch = self.measure(options['iterations'], lambda: [
+                    client.post('/api/bookings/batch/', {'items': items}, format='json')
+                ])
+                self.stdout.write(
+                    f"{size:>4} items  one-by-one p50 {single['p50_ms']:>9.2f} ms "
+                    f"({size / single['p50_ms'] * 1000:>7.0f} items/s)  "
+                    f"batch p50 {batch['p50_ms']:>8.2f} ms ({size / batch['p50_ms'] * 1000:>7.0f} items/s)"
+                )
+
+    def measure(self, iterations, run):
+        timings = []
+        for _ in range(iterations):
+            # Roll back so every round books the same free rooms
+            with transaction.atomic():
+                started = time.perf_counter()
+                responses = run()
+                timings.append(time.perf_counter() - started)
+                assert all(response.status_code == 201 for response in responses), responses[0].data
+                transaction.set_rollback(True)
+        return timing_summary(timings)
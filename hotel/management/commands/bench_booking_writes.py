@@ -0,0 +1,143 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from hotel.bench import benchmark_database, read_json, seed_dataset, timing_summary, write_json
+from hotel.models import Booking, CustomUser, Room
+
+# SQLite's own defaults, i.e. the settings before the tuned profile
+SQLITE_LEGACY_PRAGMAS = {'journal_mode': 'delete', 'synchronous': 'full', 'mmap_size': 0}
+
+
+@contextmanager
+def database_profile(conn_max_age, pragmas=None, pool=True):
+    # Threads open their connections from this same settings dict
+    pragmas = dict(pragmas or {})
+    journal_mode = pragmas.pop('journal_mode', settings.SQLITE_JOURNAL_MODE)
+    settings_dict = connection.settings_dict
+    saved = settings_dict['CONN_MAX_AGE'], settings_dict['OPTIONS'].get('pool')
+    settings_dict['CONN_MAX_AGE'] = conn_max_age
+    if not pool:
+        settings_dict['OPTIONS'].pop('pool', None)
+    try:
+        with override_settings(SQLITE_PRAGMAS={**settings.SQLITE_PRAGMAS, **pragmas}):
+            connection.close()
+            if connection.vendor == 'sqlite':
+                # Stored in the throwaway file: switch it before the writers start
+                with connection.cursor() as cursor:
+                    cursor.execute(f'PRAGMA journal_mode = {journal_mode}')
+            connection.close()
+            yield
+    finally:
+        settings_dict['CONN_MAX_AGE'] = saved[0]
+        if saved[1] is not None:
+            settings_dict['OPTIONS']['pool'] = saved[1]
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = (
+        "Booking creation throughput with concurrent writers (bookings/create/ through the test "
+        "client), comparing the legacy and tuned connection settings of the configured engine. "
+        "Run once with DATABASE_ENGINE=postgres against a local server and once without, "
+        "into the same --output file, to compare the two engines."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--bookings', type=int, default=50, help="Bookings per thread.")
+        parser.add_argument('--output', help="JSON file to merge the results into.")
+
+    def handle(self, *args, **options):
+        engine = connection.vendor
+        if engine == 'sqlite':
+            profiles = [
+                ('sqlite legacy', 0, SQLITE_LEGACY_PRAGMAS, True),
+                ('sqlite tuned', settings.DATABASE_CONN_MAX_AGE, None, True),
+            ]
+            self.stdout.write("PostgreSQL profiles: rerun with DATABASE_ENGINE=postgres and DATABASE_* set.")
+        else:
+            pooled = bool(connection.settings_dict['OPTIONS'].get('pool'))
+            profiles = [
+                (f'{engine} connect per request', 0, None, False),
+                (f'{engine} {"pooled" if pooled else "persistent"}', connection.settings_dict['CONN_MAX_AGE'], None, True),
+            ]
+
+        results = {}
+        with benchmark_database():
+            seed_dataset(users=options['threads'], rooms=options['threads'], services=5, bookings=500)
+            users = list(CustomUser.objects.filter(is_staff=False).order_by('pk'))
+            rooms = list(Room.objects.order_by('pk').values_list('pk', flat=True))
+            seeded = Booking.objects.order_by('-pk').values_list('pk', flat=True).first()
+
+            for label, conn_max_age, pragmas, pool in profiles:
+                with database_profile(conn_max_age, pragmas, pool):
+                    results[label] = self.run(users, rooms, options['threads'], options['bookings'])
+                # Same free dates for the next profile
+                Booking.objects.filter(pk__gt=seeded).delete()
+                connection.close()
+                self.report(label, results[label])
+
+        if options['output']:
+            merged = read_json(options['output']) if os.path.exists(options['output']) else {}
+            merged.update(results)
+            write_json(options['output'], merged)
+
+    def run(self, users, rooms, threads, per_thread):
+        start = timezone.now().date() + timedelta(days=400)
+        timings, failures = [], []
+
+        def writer(index):
+            client = APIClient()
+            client.force_authenticate(users[index % len(users)])
+            try:
+                for i in range(per_thread):
+                    # Own room per thread, stays three days apart: only lock contention, no conflicts
+                    check_in = start + timedelta(days=3 * i)
+                    started = time.perf_counter()
+                    try:
+                        response = client.post('/api/bookings/create/', {
+                            'room': rooms[index % len(rooms)],
+                            'check_in': check_in.isoformat(),
+                            'check_out': (check_in + timedelta(days=1)).isoformat(),
+                        }, format='json')
+                    except Exception as exc:  # e.g. OperationalError: database is locked
+                        failures.append(type(exc).__name__)
+                        continue
+                    timings.append(time.perf_counter() - started)
+                    if response.status_code != 201:
+                        failures.append(response.status_code)
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=writer, args=(index,)) for index in range(threads)]
+        started = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - started
+        created = threads * per_thread - len(failures)
+        return {
+            'threads': threads,
+            'bookings': created,
+            'failures': len(failures),
+            'bookings_per_second': round(created / elapsed, 1),
+            **timing_summary(timings),
+        }
+
+    def report(self, label, result):
+        self.stdout.write(
+            f"{label:<34} {result['bookings_per_second']:>8.1f} bookings/s  "
+            f"p50 {result['p50_ms']:>8.2f} ms  p95 {result['p95_ms']:>8.2f} ms  "
+            f"failures {result['failures']}"
+        )
@@ -0,0 +1,218 @@
+import time
+import tracemalloc
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.tokens import PasswordResetTokenGenerator
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from hotel.bench import (
+    BENCH_PASSWORD, benchmark_database, seed_dataset, timing_summary, write_json, read_json,
+)
+from hotel.models import Room, Service, Booking
+
+
+def endpoint_table(ctx):
+    """
+    One entry per route in hotel/urls.py: (name, method, path, payload, auth).
+
+    auth is 'user', 'admin' or None (anonymous).
+    """
+    user, admin = ctx['user'], ctx['admin']
+    room, booking = ctx['room'], ctx['booking']
+    check_in = timezone.now().date() + timedelta(days=400)
+    new_booking = {
+        'room': room.pk,
+        'check_in': check_in.isoformat(),
+        'check_out': (check_in + timedelta(days=3)).isoformat(),
+        'services': ctx['service_ids'],
+    }
+    ctx['batch_items'] = [
+        {**new_booking, 'room': room_id} for room_id in Room.objects.order_by('pk').values_list('pk', flat=True)[:20]
+    ]
+    return [
+        ('token_obtain_pair', 'post', '/api/token/', {'username': user.username, 'password': BENCH_PASSWORD}, None),
+        ('token_refresh', 'post', '/api/token/refresh/', {'refresh': ctx['refresh']}, None),
+        ('user-register', 'post', '/api/register/', {
+            'username': 'bench-new', 'email': 'bench-new@example.com', 'password': BENCH_PASSWORD,
+        }, None),
+        ('user-login', 'post', '/api/login/', {'email': user.email, 'password': BENCH_PASSWORD}, None),
+        ('password_reset', 'post', '/api/auth/password/reset/', {'email': user.email}, None),
+        ('password_reset_confirm', 'post', '/api/auth/password/reset/confirm/', {
+            'email': user.email, 'token': ctx['reset_token'], 'new_password': BENCH_PASSWORD,
+        }, None),
+        ('booking-create', 'post', '/api/bookings/create/', new_booking, 'user'),
+        ('booking-batch-create', 'post', '/api/bookings/batch/', {'items': ctx['batch_items']}, 'user'),
+        ('user-bookings', 'get', '/api/bookings/my-bookings/', None, 'user'),
+        ('cancel-booking', 'delete', f'/api/bookings/cancel/{booking.pk}/', None, 'user'),
+        ('profile-update', 'put', '/api/user/profile/update/', {'phone': '5550100'}, 'user'),
+        ('admin-bookings', 'get', '/api/admin/bookings/', None, 'admin'),
+        ('admin-bookings-export', 'get', '/api/admin/bookings/export/', None, 'admin'),
+        ('approve-booking', 'patch', f'/api/admin/bookings/approve/{booking.pk}/', {}, 'admin'),
+        ('reject-booking', 'patch', f'/api/admin/bookings/reject/{booking.pk}/', {}, 'admin'),
+        ('admin-bookings-bulk-status', 'post', '/api/admin/bookings/bulk-status/', {
+            'ids': ctx['bulk_ids'], 'status': 'approved',
+        }, 'admin'),
+        ('admin-dashboard', 'get', '/api/admin/dashboard/', None, 'admin'),
+        ('admin-cache-stats', 'get', '/api/admin/cache/stats/', None, 'admin'),
+        ('admin-throttle-stats', 'get', '/api/admin/throttle/stats/', None, 'admin'),
+        ('user-profile', 'get', '/api/user/', None, 'user'),
+        ('user-list', 'get', '/api/users/', None, 'user'),
+        ('room-list', 'get', '/api/rooms/', None, 'admin'),
+        ('room-search', 'get', '/api/rooms/search/?check_in={}&check_out={}&max_guests=2'.format(
+            check_in.isoformat(), (check_in + timedelta(days=3)).isoformat()), None, None),
+        ('room-detail', 'get', f'/api/rooms/{room.pk}/', None, 'admin'),
+        ('room-quote', 'get', '/api/rooms/{}/quote/?check_in={}&check_out={}&services={}'.format(
+            room.pk, (check_in - timedelta(days=300)).isoformat(), (check_in - timedelta(days=293)).isoformat(),
+            ctx['service_ids'][0]), None, None),
+        ('room-occupancy', 'get', '/api/rooms/occupancy/?end={}'.format(
+            (timezone.now().date() + timedelta(days=364)).isoformat()), None, None),
+        ('room-occupancy-bitmap', 'get', '/api/rooms/occupancy/?encoding=bitmap&end={}'.format(
+            (timezone.now().date() + timedelta(days=364)).isoformat()), None, None),
+        ('admin-rate-rules', 'get', '/api/admin/rate-rules/', None, 'admin'),
+        ('update-room', 'patch', f'/api/rooms/update/{room.pk}/', {'price': '123.45'}, 'admin'),
+        ('delete-room', 'delete', f'/api/rooms/delete/{room.pk}/', None, 'admin'),
+        ('booking-create-legacy', 'post', '/api/bookings/', new_booking, 'user'),
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a synthetic dataset into a throwaway SQLite database and report p50/p95 "
+        "latency, query count and peak allocated memory for every API endpoint."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--rooms', type=int, default=100)
+        parser.add_argument('--services', type=int, default=10)
+        parser.add_argument('--bookings', type=int, default=2000)
+        parser.add_argument('--iterations', type=int, default=20, help="Timed requests per endpoint.")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--only', nargs='*', help="Endpoint names to run (default: all).")
+        parser.add_argument('--output', help="Write the JSON report to this file.")
+        parser.add_argument('--baseline', help="Compare against a previously written report.")
+        parser.add_argument('--write-baseline', action='store_true', help="Write the report to --baseline.")
+        parser.add_argument(
+            '--latency-tolerance', type=float, default=1.0,
+            help="Allowed p95 growth over the baseline as a fraction (1.0 = twice as slow).",
+        )
+
+    def handle(self, *args, **options):
+        # Measure the auth endpoints themselves, not the throttle rejecting the
+        # repeated requests (see `manage.py bench_throttle` for that)
+        no_throttling = {**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {}}
+        with benchmark_database(), override_settings(REST_FRAMEWORK=no_throttling):
+            accounts = seed_dataset(
+                users=options['users'], rooms=options['rooms'],
+                services=options['services'], bookings=options['bookings'], seed=options['seed'],
+            )
+            report = {
+                'dataset': {key: options[key] for key in ('users', 'rooms', 'services', 'bookings', 'seed')},
+                'iterations': options['iterations'],
+                'endpoints': self.run_endpoints(accounts, options),
+            }
+
+        for name, result in report['endpoints'].items():
+            self.stdout.write(
+                f"{name:<24} {result['status']:>3}  p50 {result['p50_ms']:>8.2f} ms  "
+                f"p95 {result['p95_ms']:>8.2f} ms  {result['queries']:>4} queries  "
+                f"{result['peak_kb']:>9.1f} KiB"
+            )
+
+        if options['output']:
+            write_json(options['output'], report)
+        if options['baseline']:
+            if options['write_baseline']:
+                write_json(options['baseline'], report)
+                self.stdout.write(self.style.SUCCESS(f"Baseline written to {options['baseline']}"))
+            else:
+                self.compare(report, read_json(options['baseline']), options['latency_tolerance'])
+
+    def run_endpoints(self, accounts, options):
+        user, admin = accounts['user'], accounts['admin']
+        ctx = {
+            'user': user,
+            'admin': admin,
+            'room': Room.objects.order_by('pk').first(),
+            'booking': Booking.objects.filter(user=user).order_by('pk').first()
+            or Booking.objects.create(
+                user=user, room=Room.objects.order_by('pk').first(),
+                check_in=timezone.now().date(), check_out=timezone.now().date() + timedelta(days=1),
+            ),
+            'service_ids': list(Service.objects.order_by('pk').values_list('pk', flat=True)[:2]),
+            'bulk_ids': list(Booking.objects.exclude(status='approved').order_by('pk').values_list('pk', flat=True)[:50]),
+            'refresh': str(RefreshToken.for_user(user)),
+            'reset_token': PasswordResetTokenGenerator().make_token(user),
+        }
+        clients = {None: APIClient()}
+        for role, account in (('user', user), ('admin', admin)):
+            clients[role] = APIClient()
+            clients[role].credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(account).access_token}')
+
+        results = {}
+        for name, method, path, payload, auth in endpoint_table(ctx):
+            if options['only'] and name not in options['only']:
+                continue
+            client = clients[auth]
+
+            def call():
+                # Every request runs in a rolled-back transaction, so writes
+                # (bookings, deletes, password changes) never change the dataset
+                with transaction.atomic():
+                    response = getattr(client, method)(path, payload, format='json')
+                    if response.streaming:
+                        b''.join(response.streaming_content)
+                    transaction.set_rollback(True)
+                return response
+
+            response = call()  # warm-up
+            timings = []
+            for _ in range(options['iterations']):
+                started = time.perf_counter()
+                call()
+                timings.append(time.perf_counter() - started)
+
+            with CaptureQueriesContext(connection) as queries:
+                call()
+            # The BEGIN/ROLLBACK of the wrapper above is not the view's cost
+            query_count = sum(
+                1 for query in queries.captured_queries
+                if not query['sql'].startswith(('BEGIN', 'ROLLBACK'))
+            )
+
+            tracemalloc.start()
+            call()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            results[name] = {
+                'method': method.upper(),
+                'path': path,
+                'status': response.status_code,
+                'queries': query_count,
+                'peak_kb': round(peak / 1024, 1),
+                **timing_summary(timings),
+            }
+        return results
+
+    def compare(self, report, baseline, tolerance):
+        failures = []
+        for name, result in report['endpoints'].items():
+            expected = baseline.get('endpoints', {}).get(name)
+            if expected is None:
+                continue
+            if result['queries'] > expected['queries']:
+                failures.append(f"{name}: {result['queries']} queries (baseline {expected['queries']})")
+            if result['p95_ms'] > expected['p95_ms'] * (1 + tolerance):
+                failures.append(f"{name}: p95 {result['p95_ms']} ms (baseline {expected['p95_ms']} ms)")
+            if result['status'] != expected['status']:
+                failures.append(f"{name}: status {result['status']} (baseline {expected['status']})")
+        if failures:
+            raise CommandError("Benchmark regressions:\n  " + "\n  ".join(failures))
+        self.stdout.write(self.style.SUCCESS("No regressions against the baseline."))
@@ -0,0 +1,60 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth import authenticate
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from hotel.bench import BENCH_PASSWORD, benchmark_database, seed_dataset
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure successful email logins per second per core for each password hasher setting. "
+        "Profiles look like pbkdf2:600000 (iterations), argon2:2:65536 (time cost, memory KiB), "
+        "scrypt or bcrypt."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'profiles', nargs='*',
+            default=['pbkdf2:870000', 'pbkdf2:600000', 'pbkdf2:260000', 'argon2:2:102400', 'argon2:1:19456', 'scrypt'],
+        )
+        parser.add_argument('--logins', type=int, default=20)
+
+    def profile_settings(self, profile):
+        name, *params = profile.split(':')
+        overrides = {'PASSWORD_HASHERS': [settings.PASSWORD_HASHER_CHOICES[name]]}
+        if name == 'pbkdf2' and params:
+            overrides['PASSWORD_PBKDF2_ITERATIONS'] = int(params[0])
+        elif name == 'argon2' and params:
+            overrides['PASSWORD_ARGON2_TIME_COST'] = int(params[0])
+            if len(params) > 1:
+                overrides['PASSWORD_ARGON2_MEMORY_COST'] = int(params[1])
+        return overrides
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            user = seed_dataset(users=1, rooms=1, services=0, bookings=0)['user']
+            for profile in options['profiles']:
+                with override_settings(**self.profile_settings(profile)):
+                    try:
+                        user.set_password(BENCH_PASSWORD)
+                    except ValueError as exc:  # hasher library not installed
+                        self.stdout.write(f"{profile:<18} skipped: {exc}")
+                        continue
+                    user.save(update_fields=['password'])
+
+                    # process_time counts this process's CPU only: logins per CPU-second
+                    # is the throughput one worker core can sustain
+                    cpu_started, wall_started = time.process_time(), time.perf_counter()
+                    for _ in range(options['logins']):
+                        if authenticate(email=user.email, password=BENCH_PASSWORD) is None:
+                            raise CommandError(f"{profile}: login with the benchmark password failed")
+                    cpu = time.process_time() - cpu_started
+                    wall = time.perf_counter() - wall_started
+
+                self.stdout.write(
+                    f"{profile:<18} {options['logins'] / cpu:>8.1f} logins/s/core  "
+                    f"{wall / options['logins'] * 1000:>8.2f} ms/login"
+                )
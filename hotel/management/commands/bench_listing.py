@@ -0,0 +1,78 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from hotel import listing
+from hotel.bench import benchmark_database, seed_dataset, timing_summary, write_json
+from hotel.models import Booking, Room
+from hotel.renderers import FastJSONRenderer
+from hotel.serializers import BookingSerializer, RoomSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Render the room and booking lists through the ModelSerializers and JSONRenderer, "
+        "and through the .values() rows of hotel/listing.py and FastJSONRenderer; report rows "
+        "per second for both (queries and JSON encoding included)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rooms', type=int, default=500)
+        parser.add_argument('--bookings', type=int, default=5000)
+        parser.add_argument('--iterations', type=int, default=5)
+        parser.add_argument('--output', help="Write the results to this JSON file.")
+
+    def handle(self, *args, **options):
+        request = APIRequestFactory().get('/api/rooms/')
+        results = {}
+        with benchmark_database():
+            seed_dataset(users=200, rooms=options['rooms'], services=10, bookings=options['bookings'])
+            rooms = Room.objects.with_availability().order_by('pk')
+            bookings = Booking.objects.order_by('pk')
+            cases = {
+                'rooms': (
+                    lambda: RoomSerializer(rooms, many=True, context={'request': request}).data,
+                    lambda: listing.rooms(rooms, request),
+                ),
+                'bookings': (
+                    lambda: BookingSerializer(
+                        bookings.for_listing(), many=True, context={'request': request},
+                    ).data,
+                    lambda: listing.bookings(bookings, request),
+                ),
+            }
+            for name, (serializer, fast) in cases.items():
+                expected = JSONRenderer().render(serializer())
+                if FastJSONRenderer().render(fast()) != expected:
+                    raise CommandError(f"{name}: the fast path's output differs from the serializer's")
+                rows = len(fast())
+                results[name] = {
+                    'rows': rows,
+                    'bytes': len(expected),
+                    'serializer': self.measure(lambda: JSONRenderer().render(serializer()), rows, options['iterations']),
+                    'fast': self.measure(lambda: FastJSONRenderer().render(fast()), rows, options['iterations']),
+                }
+                results[name]['speedup'] = round(
+                    results[name]['fast']['rows_per_second'] / results[name]['serializer']['rows_per_second'], 2,
+                )
+
+        for name, result in results.items():
+            for mode in ('serializer', 'fast'):
+                self.stdout.write(
+                    f"{name:<9} {mode:<10} {result[mode]['rows_per_second']:>11.0f} rows/s  "
+                    f"p50 {result[mode]['p50_ms']:>9.2f} ms"
+                )
+            self.stdout.write(f"{name:<9} {result['rows']} rows, {result['bytes']} bytes: {result['speedup']}x")
+        if options['output']:
+            write_json(options['output'], results)
+
+    def measure(self, render, rows, iterations):
+        render()  # warm-up
+        timings = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            render()
+            timings.append(time.perf_counter() - started)
+        return {'rows_per_second': round(rows * len(timings) / sum(timings)), **timing_summary(timings)}
@@ -0,0 +1,88 @@
+import random
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from hotel import pricing
+from hotel.bench import benchmark_database, seed_dataset, timing_summary
+from hotel.models import RateRule, Room
+
+
+class Command(BaseCommand):
+    help = (
+        "Quotes per second over year-long rate calendars: range-sum lookups in the "
+        "precomputed calendar against evaluating the rules for every night."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rooms', type=int, default=50)
+        parser.add_argument('--quotes', type=int, default=500)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        with benchmark_database():
+            seed_dataset(users=1, rooms=options['rooms'], services=0, bookings=0)
+            today = timezone.now().date()
+            rooms = list(Room.objects.all())
+
+            # A realistic rule set: weekend uplift, two seasons, per-room date overrides
+            rules = [
+                RateRule(name='Weekend', weekdays=[4, 5], kind='percent', amount=Decimal('20')),
+                RateRule(name='Summer', start_date=today + timedelta(days=150), end_date=today + timedelta(days=240),
+                         kind='percent', amount=Decimal('35'), priority=1),
+                RateRule(name='Winter', start_date=today + timedelta(days=300), end_date=today + timedelta(days=360),
+                         kind='percent', amount=Decimal('-15'), priority=1),
+            ]
+            for room in rooms:
+                for _ in range(10):
+                    day = today + timedelta(days=rng.randint(0, 364))
+                    rules.append(RateRule(name='Event', room=room, start_date=day, end_date=day + timedelta(days=2),
+                                          kind='fixed', amount=Decimal(rng.randrange(20000, 60000)) / 100, priority=2))
+            RateRule.objects.bulk_create(rules)
+
+            started = time.perf_counter()
+            pricing.rebuild_calendars(days=365)
+            self.stdout.write(f"calendar build: {len(rooms)} rooms x 365 nights in {time.perf_counter() - started:.2f} s")
+
+            stays = []
+            for _ in range(options['quotes']):
+                check_in = today + timedelta(days=rng.randint(0, 330))
+                stays.append((rng.choice(rooms), check_in, check_in + timedelta(days=rng.randint(1, 30))))
+
+            # Both paths make one query per quote: two calendar rows, or the room's rules
+            calendar = self.measure(lambda stay: pricing.stay_prices([stay])[0], stays)
+            per_night = self.measure(lambda stay: self.evaluate_rules(*stay), stays)
+            assert calendar['prices'] == per_night['prices']
+
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                pricing.stay_prices(stays)
+                batch_seconds = time.perf_counter() - started
+
+            for label, result in (('calendar lookup', calendar), ('rules per night', per_night)):
+                self.stdout.write(
+                    f"{label:<16} {result['per_second']:>9.0f} quotes/s  "
+                    f"p50 {result['p50_ms']:>7.3f} ms  p95 {result['p95_ms']:>7.3f} ms"
+                )
+            self.stdout.write(
+                f"{'calendar batch':<16} {len(stays) / batch_seconds:>9.0f} quotes/s  "
+                f"({len(stays)} stays, {len(queries)} query)"
+            )
+
+    def evaluate_rules(self, room, check_in, check_out):
+        rules = pricing.rules_by_room([room.pk])[room.pk]
+        return sum(pricing.nightly_price(room.price, rules, night) for night in pricing.nights(check_in, check_out))
+
+    def measure(self, price, stays):
+        prices, timings = [], []
+        for stay in stays:
+            started = time.perf_counter()
+            prices.append(price(stay))
+            timings.append(time.perf_counter() - started)
+        return {'prices': prices, 'per_second': len(stays) / sum(timings), **timing_summary(timings)}
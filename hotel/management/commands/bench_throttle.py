@@ -0,0 +1,77 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIClient, APIRequestFactory
+
+from hotel.bench import BENCH_PASSWORD, benchmark_database, percentile
+from hotel.throttling import EmailTokenBucketThrottle, IPTokenBucketThrottle
+from hotel.views import UserLoginView
+
+BENCH_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'bench-throttle'}}
+
+
+def with_rates(rate):
+    rates = {scope: rate for scope in settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']}
+    return override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': rates})
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the token-bucket throttle: cost of one bucket check when allowed and "
+        "when rejected, and end-to-end latency and query count of a throttled login."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        # Buckets live in a private cache, so the cache.clear() below never
+        # touch the configured one (sessions, room payloads, validators, ...)
+        with override_settings(CACHES=BENCH_CACHES), benchmark_database():
+            request = APIRequestFactory().post(
+                '/api/login/', {'email': 'victim@example.com', 'password': BENCH_PASSWORD}, format='json',
+            )
+            view = UserLoginView()
+            drf_request = view.initialize_request(request)
+
+            for label, rate in (('allowed', f'{iterations * 10}/hour'), ('rejected', '1/hour')):
+                with with_rates(rate):
+                    throttles = [IPTokenBucketThrottle(), EmailTokenBucketThrottle()]
+                    for throttle in throttles:
+                        throttle.allow_request(drf_request, view)  # drains a '1/hour' bucket
+                    timings = []
+                    for _ in range(iterations):
+                        started = time.perf_counter()
+                        for throttle in throttles:
+                            throttle.allow_request(drf_request, view)
+                        timings.append(time.perf_counter() - started)
+                self.report(f'check ({label})', timings)
+                cache.clear()
+
+            client = APIClient()
+            payload = {'email': 'victim@example.com', 'password': BENCH_PASSWORD}
+            with with_rates('1/hour'):
+                client.post('/api/login/', payload, format='json')
+                timings, statuses = [], set()
+                for _ in range(iterations):
+                    started = time.perf_counter()
+                    response = client.post('/api/login/', payload, format='json')
+                    timings.append(time.perf_counter() - started)
+                    statuses.add(response.status_code)
+                with CaptureQueriesContext(connection) as queries:
+                    client.post('/api/login/', payload, format='json')
+            self.report(f'HTTP login {sorted(statuses)}', timings, queries=len(queries))
+
+    def report(self, label, timings, queries=None):
+        line = (
+            f"{label:<24} p50 {percentile(timings, 50) * 1e6:>9.1f} us  "
+            f"p95 {percentile(timings, 95) * 1e6:>9.1f} us"
+        )
+        if queries is not None:
+            line += f"  {queries} queries"
+        self.stdout.write(line)
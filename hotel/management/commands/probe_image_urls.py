@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from hotel import image_urls
+
+
+class Command(BaseCommand):
+    help = (
+        "Check new or changed room image URLs (status, content type and size) and record the result. "
+        "Use --loop to keep running as a worker."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--loop', action='store_true', help="Keep polling for URLs to check.")
+        parser.add_argument('--interval', type=float, default=10.0, help="Seconds to sleep when nothing is pending.")
+
+    def handle(self, *args, **options):
+        while True:
+            checked = image_urls.process_pending(batch_size=options['batch_size'])
+            if checked:
+                self.stdout.write(f"Checked {checked} room image URL(s)")
+
+            if not options['loop']:
+                return
+            if checked < options['batch_size']:
+                time.sleep(options['interval'])
@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from hotel import images
+
+
+class Command(BaseCommand):
+    help = (
+        "Build resized JPEG/WebP variants and thumbnails for newly uploaded room images. "
+        "Use --loop to keep running as a worker."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=20)
+        parser.add_argument('--loop', action='store_true', help="Keep polling for new uploads.")
+        parser.add_argument('--interval', type=float, default=10.0, help="Seconds to sleep when nothing is pending.")
+
+    def handle(self, *args, **options):
+        while True:
+            processed, failed = images.process_pending(batch_size=options['batch_size'])
+            if processed or failed:
+                self.stdout.write(f"Processed {processed}, failed {failed}")
+
+            if not options['loop']:
+                return
+            if processed + failed < options['batch_size']:
+                time.sleep(options['interval'])
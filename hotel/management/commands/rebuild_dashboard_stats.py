@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from hotel import stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the admin dashboard statistics from the booking, room and user tables. "
+        "With --check, only compare them with the incrementally maintained values."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help="Report drift instead of rebuilding.")
+
+    def handle(self, *args, **options):
+        if not options['check']:
+            stats.rebuild()
+            self.stdout.write(self.style.SUCCESS("Dashboard statistics rebuilt."))
+            return
+
+        expected = stats.compute_from_scratch()
+        stored = stats.stored_stats()
+        drift = sorted(
+            (key, stored.get(key, 0), expected.get(key, 0))
+            for key in expected.keys() | stored.keys()
+            if stored.get(key, 0) != expected.get(key, 0)
+        )
+        if drift:
+            for (metric, key), found, wanted in drift:
+                self.stdout.write(f"{metric}[{key}]: stored {found}, expected {wanted}")
+            raise CommandError(f"{len(drift)} dashboard statistics are out of date; run without --check.")
+        self.stdout.write(self.style.SUCCESS("Dashboard statistics match the source tables."))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from hotel import pricing
+from hotel.models import Room
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild every room's nightly rate calendar from today. Run daily so the "
+        "calendars keep covering PRICING_CALENDAR_DAYS nights ahead."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help="Nights per room (default: PRICING_CALENDAR_DAYS).")
+        parser.add_argument('--room', type=int, nargs='*', help="Only these room ids.")
+
+    def handle(self, *args, **options):
+        rooms = Room.objects.filter(pk__in=options['room']) if options['room'] else Room.objects.all()
+        pricing.rebuild_calendars(rooms, days=options['days'])
+        self.stdout.write(self.style.SUCCESS(f"Rate calendars rebuilt for {rooms.count()} rooms."))
@@ -0,0 +1,40 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from hotel import replicas
+
+
+class Command(BaseCommand):
+    help = (
+        "Write the replication heartbeat on the primary and record how far each read replica "
+        "has caught up; replicas without a recent status are not read from. Use --loop to keep running."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help="Keep beating every --interval seconds.")
+        parser.add_argument('--interval', type=float, default=1.0)
+        parser.add_argument(
+            '--copy-sqlite', action='store_true',
+            help="Copy the primary into each SQLite replica file after the beat (local stand-in for replication).",
+        )
+
+    def handle(self, *args, **options):
+        if not settings.DATABASE_REPLICAS:
+            self.stdout.write("No replicas configured (DATABASE_REPLICA_HOSTS / SQLITE_REPLICA_PATHS).")
+            return
+        while True:
+            replicas.beat()
+            if options['copy_sqlite']:
+                for alias in settings.DATABASE_REPLICAS:
+                    replicas.copy_sqlite(alias)
+            lags = replicas.measure()
+            if options['verbosity'] > 1 or not options['loop']:
+                self.stdout.write(', '.join(
+                    f"{alias}: {'unavailable' if lag is None else f'{lag:.3f}s behind'}" for alias, lag in lags.items()
+                ))
+
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from hotel import mail
+
+
+class Command(BaseCommand):
+    help = (
+        "Deliver queued outbound email in batches over one SMTP connection per batch. "
+        "Use --loop to keep running as a worker."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--loop', action='store_true', help="Keep polling for new messages.")
+        parser.add_argument('--interval', type=float, default=5.0, help="Seconds to sleep when the queue is idle.")
+
+    def handle(self, *args, **options):
+        while True:
+            try:
+                sent, failed = mail.deliver_due(batch_size=options['batch_size'])
+            except Exception as exc:
+                # SMTP unreachable: the leased batch is retried once the lease expires
+                self.stderr.write(f"Could not deliver batch: {exc}")
+                sent, failed = 0, 0
+                if not options['loop']:
+                    raise
+            if sent or failed:
+                self.stdout.write(f"Sent {sent}, failed {failed}")
+
+            if not options['loop']:
+                return
+            if sent + failed < options['batch_size']:
+                time.sleep(options['interval'])
@@ -0,0 +1,105 @@
+"""
+Compression of API responses.
+
+WhiteNoise serves static files with its own precompressed copies; nothing
+compressed the JSON API. CompressionMiddleware encodes responses of at
+least COMPRESSION_MIN_BYTES with brotli when the client prefers it,
+otherwise with gzip. Smaller payloads aren't worth the CPU and header
+overhead and go out as they are, as do files, content types in
+COMPRESSION_SKIP_TYPES (images are already compressed) and responses with
+a Content-Encoding of their own.
+
+Like GZipMiddleware, gzip output carries up to max_random_bytes of random
+padding in its header, Django's BREACH mitigation for pages mixing secrets
+(JWTs, reset tokens) with request input. Brotli has no such padding, so
+HTTPS responses are only ever gzipped.
+
+Encoded responses get a weak ETag, like Django's GZipMiddleware does;
+hotel.cache.not_modified compares ETags weakly, so If-None-Match still
+matches.
+"""
+import brotli
+from django.conf import settings
+from django.http import FileResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.text import compress_sequence, compress_string
+
+
+def accepted_encodings(header):
+    """{coding: q} from an Accept-Encoding header."""
+    accepted = {}
+    for item in header.split(','):
+        coding, _, params = item.strip().partition(';')
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding.strip().lower()] = q
+    return accepted
+
+
+def choose_encoding(header, supported=('br', 'gzip')):
+    """One of supported or None for an Accept-Encoding header; earlier wins ties."""
+    accepted = accepted_encodings(header)
+    weights = {coding: accepted.get(coding, accepted.get('*', 0.0)) for coding in supported}
+    best = max(supported, key=lambda coding: weights[coding])  # first of equals
+    return best if weights[best] > 0 else None
+
+
+def brotli_sequence(sequence):
+    compressor = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+    for item in sequence:
+        data = compressor.process(item)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+class CompressionMiddleware(MiddlewareMixin):
+
+    max_random_bytes = 100
+
+    def process_response(self, request, response):
+        if not response.streaming and len(response.content) < settings.COMPRESSION_MIN_BYTES:
+            return response
+        if response.has_header('Content-Encoding') or isinstance(response, FileResponse):
+            return response
+        content_type = response.get('Content-Type', '').split(';')[0].strip().lower()
+        if content_type.startswith(tuple(settings.COMPRESSION_SKIP_TYPES)):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        supported = ('gzip',) if request.is_secure() else ('br', 'gzip')
+        encoding = choose_encoding(request.headers.get('Accept-Encoding', ''), supported)
+        if encoding is None or (response.streaming and response.is_async):
+            return response
+
+        if response.streaming:
+            if encoding == 'br':
+                response.streaming_content = brotli_sequence(response.streaming_content)
+            else:
+                response.streaming_content = compress_sequence(response.streaming_content, max_random_bytes=self.max_random_bytes)
+            # The compressed size is only known once everything is sent
+            del response.headers['Content-Length']
+        else:
+            if encoding == 'br':
+                compressed = brotli.compress(response.content, quality=settings.COMPRESSION_BROTLI_QUALITY)
+            else:
+                compressed = compress_string(response.content, max_random_bytes=self.max_random_bytes)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+        return response
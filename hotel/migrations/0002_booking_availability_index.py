@@ -0,0 +1,17 @@
+# Generated by Django 5.1.7 on 2026-10-18 02:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotel', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['room', 'status', 'check_in', 'check_out'], name='booking_room_status_dates_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.7 on 2026-10-18 02:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotel', '0002_booking_availability_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='room',
+            index=models.Index(fields=['price', 'id'], name='room_price_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='room',
+            index=models.Index(fields=['type', 'price'], name='room_type_price_idx'),
+        ),
+    ]
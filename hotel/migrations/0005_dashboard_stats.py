@@ -0,0 +1,61 @@
+# Generated by Django 5.1.7 on 2026-10-18 02:53
+
+from collections import Counter
+from datetime import timedelta
+
+from django.db import migrations, models
+
+
+def fill_dashboard_stats(apps, schema_editor):
+    # Existing rooms, bookings and users; later writes apply deltas on top.
+    # The counters of hotel.stats.compute_from_scratch(), from the historical
+    # models so later schema changes don't break this migration.
+    Booking = apps.get_model('hotel', 'Booking')
+    CustomUser = apps.get_model('hotel', 'CustomUser')
+    DashboardStat = apps.get_model('hotel', 'DashboardStat')
+    Room = apps.get_model('hotel', 'Room')
+    db = schema_editor.connection.alias
+
+    stats = Counter({
+        ('total', 'rooms'): Room.objects.using(db).count(),
+        ('total', 'customers'): CustomUser.objects.using(db).count(),
+    })
+    bookings = Booking.objects.using(db).order_by()
+    for row in bookings.values('status').annotate(count=models.Count('id'), revenue=models.Sum('total_price')):
+        stats[('bookings_by_status', row['status'])] += row['count']
+        stats[('revenue_by_status', row['status'])] += row['revenue'] or 0
+    for row in bookings.values('room__type').annotate(count=models.Count('id')):
+        stats[('bookings_by_room_type', row['room__type'])] += row['count']
+    # Check-in through check-out day, as occupancy was counted at this point
+    stays = bookings.filter(status__in=('pending', 'approved')).values_list('check_in', 'check_out')
+    for check_in, check_out in stays.iterator(chunk_size=5000):
+        stats[('occupancy_delta', check_in.isoformat())] += 1
+        stats[('occupancy_delta', (check_out + timedelta(days=1)).isoformat())] -= 1
+
+    DashboardStat.objects.using(db).bulk_create(
+        [DashboardStat(metric=metric, key=key, value=value) for (metric, key), value in stats.items() if value],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotel', '0004_admin_booking_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DashboardStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('metric', models.CharField(choices=[('total', 'Total'), ('bookings_by_status', 'Bookings by status'), ('revenue_by_status', 'Revenue by status'), ('bookings_by_room_type', 'Bookings by room type'), ('occupancy_delta', 'Occupancy change per day')], max_length=30)),
+                ('key', models.CharField(max_length=50)),
+                ('value', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('metric', 'key'), name='dashboard_stat_metric_key_uniq')],
+            },
+        ),
+        migrations.RunPython(fill_dashboard_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.1.7 on 2026-10-18 03:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotel', '0007_user_email_lower_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='service',
+            name='per_night',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.CreateModel(
+            name='RateRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('start_date', models.DateField(blank=True, null=True)),
+                ('end_date', models.DateField(blank=True, null=True)),
+                ('weekdays', models.JSONField(blank=True, default=list)),
+                ('kind', models.CharField(choices=[('fixed', 'Fixed nightly price'), ('percent', 'Percentage adjustment')], max_length=10)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=8)),
+                ('priority', models.IntegerField(default=0)),
+                ('room', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='rate_rules', to='hotel.room')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='NightlyRate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('price', models.DecimalField(decimal_places=2, max_digits=8)),
+                ('cumulative', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='nightly_rates', to='hotel.room')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('room', 'date'), name='nightly_rate_room_date_uniq')],
+            },
+        ),
+    ]
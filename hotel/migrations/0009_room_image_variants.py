@@ -0,0 +1,28 @@
+# Generated by Django 5.1.7 on 2026-10-18 03:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotel', '0008_pricing'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='room',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='room',
+            name='image_variants_error',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='room',
+            name='image_variants_source',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+    ]
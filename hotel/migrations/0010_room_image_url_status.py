@@ -0,0 +1,37 @@
+# Generated by Django 5.1.7 on 2026-10-18 03:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotel', '0009_room_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='room',
+            name='image_url_checked_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='room',
+            name='image_url_detail',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='room',
+            name='image_url_size',
+            field=models.PositiveBigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='room',
+            name='image_url_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('valid', 'Valid'), ('invalid', 'Invalid'), ('unreachable', 'Unreachable')], default='pending', max_length=12),
+        ),
+        migrations.AddIndex(
+            model_name='room',
+            index=models.Index(fields=['image_url_status', 'image_url_checked_at'], name='room_image_url_status_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+from collections import Counter
+from datetime import timedelta
+
+from django.db import migrations
+
+
+def occupancy_deltas(apps, schema_editor, checkout_offset):
+    # Rewrite the dashboard's occupancy difference array: -1 on the check-out
+    # day (nights only) going forward, the day after it going back
+    Booking = apps.get_model('hotel', 'Booking')
+    DashboardStat = apps.get_model('hotel', 'DashboardStat')
+    db = schema_editor.connection.alias
+
+    deltas = Counter()
+    stays = Booking.objects.using(db).filter(status__in=('pending', 'approved')).values_list('check_in', 'check_out')
+    for check_in, check_out in stays.iterator(chunk_size=5000):
+        deltas[check_in.isoformat()] += 1
+        deltas[(check_out + timedelta(days=checkout_offset)).isoformat()] -= 1
+
+    DashboardStat.objects.using(db).filter(metric='occupancy_delta').delete()
+    DashboardStat.objects.using(db).bulk_create(
+        [DashboardStat(metric='occupancy_delta', key=key, value=value) for key, value in deltas.items() if value],
+        batch_size=1000,
+    )
+
+
+def count_nights(apps, schema_editor):
+    occupancy_deltas(apps, schema_editor, 0)
+
+
+def count_days(apps, schema_editor):
+    occupancy_deltas(apps, schema_editor, 1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotel', '0012_booking_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(count_nights, count_days),
+    ]
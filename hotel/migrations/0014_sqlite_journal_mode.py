@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.db import migrations
+
+
+def journal_mode(mode):
+    def set_mode(apps, schema_editor):
+        # Stored in the file, so once per database rather than per connection
+        # (hotel/db.py). Outside a transaction: SQLite won't switch to WAL in one.
+        if schema_editor.connection.vendor == 'sqlite':
+            with schema_editor.connection.cursor() as cursor:
+                cursor.execute(f'PRAGMA journal_mode = {mode}')
+    return set_mode
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('hotel', '0013_occupancy_delta_nights'),
+    ]
+
+    operations = [
+        migrations.RunPython(journal_mode(settings.SQLITE_JOURNAL_MODE), journal_mode('delete')),
+    ]
@@ -5,7 +5,8 @@ from django.contrib.auth.models import AbstractUser, Group, Permission
 from django.db import models
 
 from django.utils import timezone
-from django.db.models import Q
+from django.db.models import Q, Exists, OuterRef, Prefetch, Value
+from django.db.models.functions import Lower
 
 from .validators import validate_image_url
 
@@ -38,7 +39,53 @@ class CustomUser(AbstractUser):
         related_query_name="user",
     )
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Case-insensitive email login (hotel.backends.EmailBackend)
+            models.Index(Lower('email'), name='user_email_lower_idx'),
+        ]
+
+# Bookings in these states hold the room for their whole stay
+ACTIVE_BOOKING_STATUSES = ('pending', 'approved')
+
+
+class RoomQuerySet(models.QuerySet):
+    def with_availability(self, start=None, end=None):
+        # Annotate every room with its availability for [start, end] in one query,
+        # instead of one EXISTS query per room through Room.is_available
+        return self.annotate(
+            has_active_booking=Exists(
+                Booking.objects.filter(room=OuterRef('pk')).overlapping(start, end)
+            )
+        )
+
+    def available(self, start=None, end=None):
+        # Filter on the subquery without also selecting it: every row left is free
+        return self.alias(
+            booked=Exists(Booking.objects.filter(room=OuterRef('pk')).overlapping(start, end))
+        ).filter(booked=False).annotate(has_active_booking=Value(False))
+
+    def search(self, check_in, check_out, max_guests=None, type=None, min_price=None, max_price=None):
+        # Rooms free for the whole stay matching the optional filters (RoomSearchSerializer's fields)
+        rooms = self.available(check_in, check_out)
+        if max_guests is not None:
+            rooms = rooms.filter(max_guests__gte=max_guests)
+        if type is not None:
+            rooms = rooms.filter(type=type)
+        if min_price is not None:
+            rooms = rooms.filter(price__gte=min_price)
+        if max_price is not None:
+            rooms = rooms.filter(price__lte=max_price)
+        return rooms
+
+
 class Room(models.Model):
+    IMAGE_URL_STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('valid', 'Valid'),
+        ('invalid', 'Invalid'),
+        ('unreachable', 'Unreachable'),
+    ]
     type = models.CharField(max_length=50)
     price = models.DecimalField(max_digits=8, decimal_places=2)
     description = models.TextField()
@@ -46,25 +93,124 @@ class Room(models.Model):
     max_guests = models.PositiveIntegerField(default=2)  # New field
     image_url = models.URLField(max_length=500, validators=[validate_image_url])
     image = models.ImageField(upload_to='rooms/', null=True, blank=True)  # New field
+    # Resized copies of `image`, written by `manage.py process_room_images` (hotel/images.py)
+    image_variants = models.JSONField(default=dict, blank=True)
+    image_variants_source = models.CharField(max_length=255, blank=True)  # image name the variants were made from
+    image_variants_error = models.TextField(blank=True)
+    # Result of fetching image_url, written by `manage.py probe_image_urls` (hotel/image_urls.py)
+    image_url_status = models.CharField(max_length=12, choices=IMAGE_URL_STATUS_CHOICES, default='pending')
+    image_url_detail = models.CharField(max_length=255, blank=True)
+    image_url_size = models.PositiveBigIntegerField(null=True, blank=True)  # bytes
+    image_url_checked_at = models.DateTimeField(null=True, blank=True)
+
+    objects = RoomQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['price', 'id'], name='room_price_id_idx'),
+            models.Index(fields=['type', 'price'], name='room_type_price_idx'),
+            models.Index(fields=['image_url_status', 'image_url_checked_at'], name='room_image_url_status_idx'),
+        ]
 
     @property
     def is_available(self):
-        # Check if there are no approved/pending bookings overlapping with today
-        today = timezone.now().date()
-        return not self.booking_set.filter(
-            Q(status='approved') | Q(status='pending'),
-            check_in__lte=today,
-            check_out__gte=today
-        ).exists()
-    
+        # Rooms loaded through Room.objects.with_availability() already carry the answer
+        if 'has_active_booking' in self.__dict__:
+            return not self.has_active_booking
+        return self.is_available_between()
+
+    def is_available_between(self, start=None, end=None):
+        # Check if there are no approved/pending bookings overlapping the stay [start, end)
+        return not self.booking_set.overlapping(start, end).exists()
+
+
 class Service(models.Model):
     name = models.CharField(max_length=100)
     price = models.DecimalField(max_digits=8, decimal_places=2)
     description = models.TextField(blank=True)
+    per_night = models.BooleanField(default=False)  # charged for every night instead of once per stay
 
     def __str__(self):
         return f"{self.name} (${self.price})"
 
+
+class RateRule(models.Model):
+    # Adjusts a room's nightly price on matching nights (see hotel/pricing.py)
+    KIND_CHOICES = [
+        ('fixed', 'Fixed nightly price'),
+        ('percent', 'Percentage adjustment'),
+    ]
+    name = models.CharField(max_length=100)
+    room = models.ForeignKey(Room, on_delete=models.CASCADE, null=True, blank=True, related_name='rate_rules')  # null: every room
+    start_date = models.DateField(null=True, blank=True)  # first night, open-ended if empty
+    end_date = models.DateField(null=True, blank=True)  # last night, inclusive
+    weekdays = models.JSONField(default=list, blank=True)  # nights it applies to, Monday=0; empty: every night
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    amount = models.DecimalField(max_digits=8, decimal_places=2)  # price for 'fixed', +/- percent for 'percent'
+    priority = models.IntegerField(default=0)  # applied in ascending order, so higher wins
+
+    def __str__(self):
+        return self.name
+
+
+class NightlyRate(models.Model):
+    # Precomputed price of one night in one room, plus the running total of the
+    # room's calendar up to and including that night
+    room = models.ForeignKey(Room, on_delete=models.CASCADE, related_name='nightly_rates')
+    date = models.DateField()
+    price = models.DecimalField(max_digits=8, decimal_places=2)
+    cumulative = models.DecimalField(max_digits=14, decimal_places=2)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['room', 'date'], name='nightly_rate_room_date_uniq'),
+        ]
+
+    def __str__(self):
+        return f"Room {self.room_id} {self.date}: {self.price}"
+
+class BookingQuerySet(models.QuerySet):
+    def active(self):
+        return self.filter(status__in=ACTIVE_BOOKING_STATUSES)
+
+    def overlapping(self, start=None, end=None):
+        # Active bookings holding the room for any night of the stay [start, end):
+        # like pricing.nights(), the check-out day is free for the next guest.
+        # Without an end, bookings the room is in use for on that one day
+        # (default today), the guest checking out that morning included.
+        if end is None:
+            day = start or timezone.now().date()
+            return self.active().filter(check_in__lte=day, check_out__gte=day)
+        return self.active().filter(check_in__lt=end, check_out__gt=start)
+
+    def filter_admin(self, status=None, room=None, user=None, start=None, end=None):
+        # Filters shared by the admin booking list and export (see AdminBookingFilterSerializer)
+        bookings = self
+        if status:
+            bookings = bookings.filter(status=status)
+        if room:
+            bookings = bookings.filter(room_id=room)
+        if user:
+            bookings = bookings.filter(user_id=user)
+        # Bookings with a night on any day of [start, end]
+        if start:
+            bookings = bookings.filter(check_out__gt=start)
+        if end:
+            bookings = bookings.filter(check_in__lte=end)
+        return bookings
+
+    def with_room_detail(self):
+        # Load each booking's room with its availability already annotated, so a
+        # nested room_detail costs no extra query per row
+        return self.prefetch_related(
+            Prefetch('room', queryset=Room.objects.with_availability())
+        )
+
+    def for_listing(self):
+        # Everything BookingSerializer reads, in a constant number of queries per page
+        return self.with_room_detail().prefetch_related('services')
+
+
 class Booking(models.Model):
     STATUS_CHOICES = [
         ('pending', 'Pending'),
@@ -77,8 +223,83 @@ class Booking(models.Model):
     check_out = models.DateField()
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
     created_at = models.DateTimeField(auto_now_add=True)
+    # Set on every save; QuerySet.update() callers set it themselves (list ETags, hotel/cache.py)
+    updated_at = models.DateTimeField(auto_now=True)
     services = models.ManyToManyField(Service, blank=True)
     total_price = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
 
+    objects = BookingQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['room', 'status', 'check_in', 'check_out'],
+                name='booking_room_status_dates_idx',
+            ),
+            # Admin listing: newest first, optionally narrowed by status or user
+            models.Index(fields=['-created_at', '-id'], name='booking_created_idx'),
+            models.Index(fields=['status', '-created_at'], name='booking_status_created_idx'),
+            models.Index(fields=['user', '-created_at'], name='booking_user_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.email} - {self.room.type}"
+
+class DashboardStat(models.Model):
+    # Pre-aggregated admin dashboard counters, maintained incrementally by
+    # hotel.stats and rebuilt with `manage.py rebuild_dashboard_stats`
+    METRIC_CHOICES = [
+        ('total', 'Total'),
+        ('bookings_by_status', 'Bookings by status'),
+        ('revenue_by_status', 'Revenue by status'),
+        ('bookings_by_room_type', 'Bookings by room type'),
+        ('occupancy_delta', 'Occupancy change per day'),
+    ]
+    metric = models.CharField(max_length=30, choices=METRIC_CHOICES)
+    key = models.CharField(max_length=50)
+    value = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['metric', 'key'], name='dashboard_stat_metric_key_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.metric}[{self.key}] = {self.value}"
+
+
+class OutboundEmail(models.Model):
+    # Outbox row written by request handlers and delivered by `manage.py send_queued_email`
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    html_body = models.TextField(blank=True)
+    from_email = models.CharField(max_length=254, blank=True)
+    recipients = models.JSONField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {', '.join(self.recipients)} ({self.status})"
+
+
+class ReplicaHeartbeat(models.Model):
+    # Single row, updated on the primary by `manage.py replica_heartbeat`; its value
+    # on a replica tells how far that replica has caught up (see hotel/replicas.py)
+    beat_at = models.DateTimeField()
+
     def __str__(self):
-        return f"{self.user.email} - {self.room.type}"
\ No newline at end of file
+        return f"heartbeat {self.beat_at.isoformat()}"
@@ -0,0 +1,85 @@
+"""
+Per-room, per-day occupancy for a date window.
+
+One query returns every room with the active bookings that touch the window
+(a LEFT JOIN through a FilteredRelation, so free rooms still appear). Each
+room's days are packed into an int used as a bitset, bit i standing for
+start + i days, so a stay of any length is a single mask OR.
+
+Two output encodings:
+- 'ranges' (default): per room, the [first, last] dates of each run of
+  occupied days.
+- 'bitmap': the rows of the grid, each ceil(days / 8) bytes with day i in
+  bit i % 8 of byte i // 8, concatenated in room order, zlib-compressed and
+  base64-encoded. A 500-room x 365-day grid is a few KB.
+"""
+import base64
+import zlib
+from datetime import timedelta
+
+from django.db.models import FilteredRelation, Q
+
+from .models import ACTIVE_BOOKING_STATUSES, Room
+
+
+def occupancy_bits(start, end, rooms=None):
+    """{room id: bitset of occupied days in [start, end]}, ordered by room id."""
+    queryset = Room.objects.all() if rooms is None else Room.objects.filter(pk__in=rooms)
+    rows = queryset.annotate(
+        stay=FilteredRelation('booking', condition=Q(
+            booking__status__in=ACTIVE_BOOKING_STATUSES,
+            booking__check_in__lte=end,
+            booking__check_out__gt=start,
+        )),
+    ).order_by('pk').values_list('pk', 'stay__check_in', 'stay__check_out')
+
+    last = (end - start).days
+    bits = {}
+    for room_id, check_in, check_out in rows:
+        bits.setdefault(room_id, 0)
+        if check_in is None:
+            continue
+        # The nights check_in .. check_out - 1, as in BookingQuerySet.overlapping
+        first = max((check_in - start).days, 0)
+        through = min((check_out - start).days - 1, last)
+        bits[room_id] |= ((1 << (through - first + 1)) - 1) << first
+    return bits
+
+
+def ranges(bitset, start):
+    """Runs of set bits as [first date, last date] pairs."""
+    runs, offset = [], 0
+    while bitset:
+        # Skip the clear bits, then measure the run of set ones
+        skip = (bitset & -bitset).bit_length() - 1
+        bitset >>= skip
+        offset += skip
+        length = (~bitset & (bitset + 1)).bit_length() - 1
+        runs.append([start + timedelta(days=offset), start + timedelta(days=offset + length - 1)])
+        bitset >>= length
+        offset += length
+    return runs
+
+
+def encode_bitmap(bits, days):
+    stride = (days + 7) // 8
+    grid = b''.join(bitset.to_bytes(stride, 'little') for bitset in bits.values())
+    return base64.b64encode(zlib.compress(grid, 9)).decode('ascii')
+
+
+def calendar(start, end, rooms=None, encoding='ranges'):
+    bits = occupancy_bits(start, end, rooms)
+    days = (end - start).days + 1
+    payload = {'start': start, 'end': end, 'days': days}
+    if encoding == 'bitmap':
+        payload.update({
+            'rooms': list(bits),
+            'stride': (days + 7) // 8,
+            'bitmap': encode_bitmap(bits, days),
+        })
+    else:
+        payload['rooms'] = [
+            {'room': room_id, 'occupied_days': bitset.bit_count(), 'occupied': ranges(bitset, start)}
+            for room_id, bitset in bits.items()
+        ]
+    return payload
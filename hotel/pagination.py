@@ -0,0 +1,17 @@
+from rest_framework.pagination import CursorPagination
+
+
+class RoomSearchPagination(CursorPagination):
+    # Keyset pagination: each page seeks from the last price seen instead of
+    # counting an OFFSET, so deep pages cost the same as the first one
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('price', 'id')
+
+
+class AdminBookingPagination(CursorPagination):
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    ordering = ('-created_at', '-id')
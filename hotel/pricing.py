@@ -0,0 +1,201 @@
+"""
+Nightly room pricing.
+
+A room's price for one night is Room.price with every matching RateRule
+applied in priority order: 'fixed' replaces the price, 'percent' scales it.
+The rules are evaluated when a room's calendar is built, not on every quote.
+NightlyRate keeps each night's price and the running total of the calendar,
+so the room cost of any stay inside the calendar is the difference of two
+running totals, whatever the stay length. Stays reaching outside the
+calendar (before its first night or past PRICING_CALENDAR_DAYS) fall back to
+evaluating the rules night by night.
+
+Calendars are rebuilt when a room's price changes and repriced over a
+rule's dates, after commit, when the rule changes (see hotel/signals.py).
+They should be rolled forward daily with `manage.py rebuild_rate_calendars`.
+"""
+import operator
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+from functools import reduce
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import NightlyRate, RateRule, Room
+
+ONE_DAY = timedelta(days=1)
+CENT = Decimal('0.01')
+
+
+def nights(check_in, check_out):
+    # A stay is charged for check_in .. check_out - 1
+    night = check_in
+    while night < check_out:
+        yield night
+        night += ONE_DAY
+
+
+def rule_applies(rule, night):
+    if rule.start_date and night < rule.start_date:
+        return False
+    if rule.end_date and night > rule.end_date:
+        return False
+    return not rule.weekdays or night.weekday() in rule.weekdays
+
+
+def nightly_price(base_price, rules, night):
+    price = base_price
+    for rule in rules:
+        if rule_applies(rule, night):
+            if rule.kind == 'fixed':
+                price = rule.amount
+            else:
+                price = (price * (1 + rule.amount / 100)).quantize(CENT)
+    return price
+
+
+def rules_by_room(room_ids):
+    """Rules for each room (its own plus the global ones), in the order they apply."""
+    rules = list(
+        RateRule.objects.filter(Q(room_id__in=room_ids) | Q(room__isnull=True)).order_by('priority', 'pk')
+    )
+    return {
+        room_id: [rule for rule in rules if rule.room_id in (None, room_id)]
+        for room_id in room_ids
+    }
+
+
+@transaction.atomic
+def rebuild_calendars(rooms=None, start=None, days=None):
+    """Replace the calendars of the given rooms (default: all) with `days` nights from start (default: today)."""
+    rooms = list(Room.objects.all() if rooms is None else rooms)
+    start = start or timezone.now().date()
+    days = days or settings.PRICING_CALENDAR_DAYS
+    rules = rules_by_room([room.pk for room in rooms])
+
+    NightlyRate.objects.filter(room__in=[room.pk for room in rooms]).delete()
+    rows = []
+    for room in rooms:
+        running = Decimal('0.00')
+        for offset in range(days):
+            night = start + timedelta(days=offset)
+            price = nightly_price(room.price, rules[room.pk], night)
+            running += price
+            rows.append(NightlyRate(room_id=room.pk, date=night, price=price, cumulative=running))
+        if len(rows) >= 10000:
+            NightlyRate.objects.bulk_create(rows, batch_size=2000)
+            rows = []
+    NightlyRate.objects.bulk_create(rows, batch_size=2000)
+
+
+@transaction.atomic
+def reprice_calendars(rooms=None, first=None, last=None):
+    """
+    Re-evaluate the rules for the nights first..last (default: open-ended) of
+    the existing calendars of the given rooms (default: all). Running totals
+    after the range are shifted by the change with one UPDATE per room.
+    """
+    rooms = {room.pk: room for room in (Room.objects.all() if rooms is None else rooms)}
+    rules = rules_by_room(list(rooms))
+    rates = NightlyRate.objects.filter(room__in=list(rooms))
+    if first is not None:
+        rates = rates.filter(date__gte=first)
+    if last is not None:
+        rates = rates.filter(date__lte=last)
+
+    changed, shifts = [], defaultdict(Decimal)
+    for rate in rates.order_by('room_id', 'date'):
+        price = nightly_price(rooms[rate.room_id].price, rules[rate.room_id], rate.date)
+        shifts[rate.room_id] += price - rate.price
+        if shifts[rate.room_id] or price != rate.price:
+            rate.price, rate.cumulative = price, rate.cumulative + shifts[rate.room_id]
+            changed.append(rate)
+    NightlyRate.objects.bulk_update(changed, ['price', 'cumulative'], batch_size=2000)
+
+    if last is not None:
+        for room_id, shift in shifts.items():
+            if shift:
+                NightlyRate.objects.filter(room_id=room_id, date__gt=last).update(cumulative=F('cumulative') + shift)
+
+
+def stay_prices(stays):
+    """
+    Room cost of each (room, check_in, check_out) stay, in input order.
+
+    Stays inside the calendar read the running totals of their first and last
+    night, all in one query; the rest are priced night by night.
+    """
+    if not stays:
+        return []
+    condition = reduce(operator.or_, [
+        Q(room_id=room.pk, date__in=[check_in, check_out - ONE_DAY]) for room, check_in, check_out in stays
+    ])
+    totals = {
+        (room_id, date): (price, cumulative)
+        for room_id, date, price, cumulative in
+        NightlyRate.objects.filter(condition).values_list('room_id', 'date', 'price', 'cumulative')
+    }
+
+    prices, outside = [], []
+    for index, (room, check_in, check_out) in enumerate(stays):
+        first, last = totals.get((room.pk, check_in)), totals.get((room.pk, check_out - ONE_DAY))
+        if first and last:
+            # Running total through the last night, minus the total before the first
+            prices.append(last[1] - (first[1] - first[0]))
+        else:
+            prices.append(None)
+            outside.append(index)
+
+    if outside:
+        rules = rules_by_room({stays[index][0].pk for index in outside})
+        for index in outside:
+            room, check_in, check_out = stays[index]
+            prices[index] = sum(
+                (nightly_price(room.price, rules[room.pk], night) for night in nights(check_in, check_out)),
+                Decimal('0.00'),
+            )
+    return prices
+
+
+def service_charge(service, night_count):
+    return service.price * night_count if service.per_night else service.price
+
+
+def booking_totals(stays):
+    """Total price of each (room, check_in, check_out, services) stay: room nights plus services."""
+    room_totals = stay_prices([stay[:3] for stay in stays])
+    return [
+        room_total + sum(
+            (service_charge(service, (check_out - check_in).days) for service in services), Decimal('0.00')
+        )
+        for room_total, (_, check_in, check_out, services) in zip(room_totals, stays)
+    ]
+
+
+def quote(room, check_in, check_out, services=()):
+    night_count = (check_out - check_in).days
+    room_total = stay_prices([(room, check_in, check_out)])[0]
+    lines = [
+        {
+            'id': service.pk,
+            'name': service.name,
+            'price': service.price,
+            'per_night': service.per_night,
+            'amount': service_charge(service, night_count),
+        }
+        for service in services
+    ]
+    return {
+        'room': room.pk,
+        'check_in': check_in,
+        'check_out': check_out,
+        'nights': night_count,
+        'room_total': room_total,
+        'nightly_average': (room_total / night_count).quantize(CENT),
+        'services': lines,
+        'total': room_total + sum((line['amount'] for line in lines), Decimal('0.00')),
+    }
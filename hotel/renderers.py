@@ -0,0 +1,36 @@
+"""
+JSON rendering through orjson.
+
+Produces the same bytes as DRF's JSONRenderer with the default settings:
+compact, unescaped unicode, U+2028/U+2029 escaped. Dates, datetimes and
+types orjson doesn't know (Decimal, lazy strings, ...) go through DRF's
+encoder, so they keep its format. Other UNICODE_JSON / COMPACT_JSON
+settings, indented output and data orjson rejects (e.g. integers over 64
+bits) are rendered by JSONRenderer itself.
+"""
+import orjson
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+
+class FastJSONRenderer(JSONRenderer):
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            data is None or self.ensure_ascii or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            rendered = orjson.dumps(
+                data, default=self.default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS,
+            )
+        except TypeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Same as JSONRenderer: these are valid JSON but not valid JavaScript
+        return rendered.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
+
+    def default(self, value):
+        # orjson retries the result, so this may return anything it can encode
+        return JSONEncoder().default(value)
@@ -0,0 +1,135 @@
+"""
+Read replicas for the read-heavy views.
+
+Views opt in with ReplicaReadMixin: their GET/HEAD queries may go to a
+replica (DATABASE_REPLICAS), everything else stays on the primary. The
+router (hotel/routers.py) follows the choice the mixin made for the current
+request, kept in a context variable.
+
+`manage.py replica_heartbeat` writes the time into ReplicaHeartbeat on the
+primary and reads it back from every replica: a replica showing beat T holds
+every commit made before T. That "caught up to" time is kept in the cache
+for DATABASE_REPLICA_STATUS_TTL seconds. A replica is used only when
+
+- it caught up within DATABASE_REPLICA_MAX_LAG seconds (otherwise, or when
+  its status has expired, reads fall back to the primary),
+- it caught up past the user's last booking write, remembered for
+  DATABASE_REPLICA_STICKY_SECONDS, so users see their own bookings and
+  cancellations at once,
+- and past the time the view needs, e.g. the room cache version, so a stale
+  replica is never cached under a newer version.
+
+For SQLite, `replica_heartbeat --copy-sqlite` also copies the primary into
+the replica files with the backup API, a local stand-in for replication.
+"""
+import random
+import sqlite3
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils import timezone
+from rest_framework import permissions
+
+from .models import ReplicaHeartbeat
+
+# Alias chosen for the current request's reads, or None for the primary
+read_alias = ContextVar('read_alias', default=None)
+
+
+def caught_up_key(alias):
+    return f'replicas:{alias}:caught_up'
+
+
+def user_write_key(user_id):
+    return f'replicas:user:{user_id}:wrote'
+
+
+def record_write(*user_ids):
+    """Keep these users on the primary until a replica has their latest write."""
+    now = time.time()
+    cache.set_many(
+        {user_write_key(user_id): now for user_id in user_ids if user_id is not None},
+        timeout=settings.DATABASE_REPLICA_STICKY_SECONDS,
+    )
+
+
+def choose_replica(user_id=None, not_before=None):
+    """A replica fresh enough for this read, or None to use the primary."""
+    if not settings.DATABASE_REPLICAS:
+        return None
+    keys = [caught_up_key(alias) for alias in settings.DATABASE_REPLICAS]
+    if user_id is not None:
+        keys.append(user_write_key(user_id))
+    values = cache.get_many(keys)
+
+    required = max(
+        [value for value in (not_before, values.get(user_write_key(user_id))) if value is not None],
+        default=None,
+    )
+    oldest = time.time() - settings.DATABASE_REPLICA_MAX_LAG
+    fresh = [
+        alias for alias in settings.DATABASE_REPLICAS
+        if values.get(caught_up_key(alias), 0) >= max(oldest, required or 0)
+    ]
+    return random.choice(fresh) if fresh else None
+
+
+def beat():
+    ReplicaHeartbeat.objects.using(DEFAULT_DB_ALIAS).update_or_create(pk=1, defaults={'beat_at': timezone.now()})
+
+
+def copy_sqlite(alias):
+    """Overwrite a SQLite replica with the primary's current contents."""
+    primary = connections[DEFAULT_DB_ALIAS]
+    primary.ensure_connection()
+    connections[alias].close()
+    target = sqlite3.connect(connections[alias].settings_dict['NAME'])
+    try:
+        primary.connection.backup(target)
+    finally:
+        target.close()
+
+
+def measure():
+    """Record how far each replica has caught up. Returns {alias: lag in seconds or None}."""
+    lags, now = {}, time.time()
+    for alias in settings.DATABASE_REPLICAS:
+        try:
+            beat_at = ReplicaHeartbeat.objects.using(alias).values_list('beat_at', flat=True).first()
+        except Exception:
+            beat_at = None  # unreachable or not migrated yet: left to expire
+        if beat_at is None:
+            lags[alias] = None
+            continue
+        caught_up = beat_at.timestamp()
+        cache.set(caught_up_key(alias), caught_up, timeout=settings.DATABASE_REPLICA_STATUS_TTL)
+        lags[alias] = round(max(now - caught_up, 0.0), 3)
+    return lags
+
+
+class ReplicaReadMixin:
+    """
+    Let a view's safe requests read from a replica.
+
+    replica_not_before() returns the time (epoch seconds) the data must be
+    at least as recent as; None means any replica within the lag limit.
+    """
+
+    def replica_not_before(self):
+        return None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method in permissions.SAFE_METHODS:
+            alias = choose_replica(request.user.pk, self.replica_not_before())
+            self._read_alias_token = read_alias.set(alias)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, '_read_alias_token', None)
+        if token is not None:
+            read_alias.reset(token)
+            self._read_alias_token = None
+        return super().finalize_response(request, response, *args, **kwargs)
@@ -0,0 +1,26 @@
+"""
+Database router for read replicas (see hotel/replicas.py).
+
+Reads go wherever ReplicaReadMixin pointed the current request, the primary
+by default. Writes always go to the primary, including saves of instances
+that were loaded from a replica. Only the primary is migrated; replicas get
+the schema through replication.
+"""
+from django.db import DEFAULT_DB_ALIAS
+
+from .replicas import read_alias
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Every alias holds the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
@@ -1,9 +1,17 @@
+from collections import defaultdict
+from decimal import Decimal
+from datetime import timedelta
 from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS
 from django.contrib.auth.password_validation import validate_password
 from django.contrib.auth import authenticate
-from .models import CustomUser, Room, Booking, Service
+from .models import CustomUser, Room, Booking, Service, RateRule
+from . import images, pricing
+from .bookings import find_conflicts, overlaps, record_created
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.utils import timezone
 
 # --------------------------
 # General Model Serializers (for User, Room, Booking)
@@ -15,13 +23,120 @@ class UserSerializer(serializers.ModelSerializer):
 
 class RoomSerializer(serializers.ModelSerializer):
     is_available = serializers.BooleanField(read_only=True)  # Computed field
+    image_srcset = serializers.SerializerMethodField()  # resized variants of `image`, once processed
     class Meta:
         model = Room
-        fields = '__all__'
+        exclude = ['image_variants', 'image_variants_source', 'image_variants_error']
+        read_only_fields = ['image_url_status', 'image_url_detail', 'image_url_size', 'image_url_checked_at']
         extra_kwargs = {
             'image_url': {'required': True}  # Make URL mandatory
         }
 
+    def get_image_srcset(self, room):
+        return images.srcset(room, self.context.get('request'))
+
+class RoomSearchSerializer(serializers.Serializer):
+    # Query parameters accepted by the room search endpoint
+    check_in = serializers.DateField()
+    check_out = serializers.DateField()
+    max_guests = serializers.IntegerField(min_value=1, required=False)
+    type = serializers.CharField(max_length=50, required=False)
+    min_price = serializers.DecimalField(max_digits=8, decimal_places=2, min_value=Decimal('0'), required=False)
+    max_price = serializers.DecimalField(max_digits=8, decimal_places=2, min_value=Decimal('0'), required=False)
+
+    def validate(self, data):
+        if data['check_in'] >= data['check_out']:
+            raise serializers.ValidationError("Check-out date must be after check-in date.")
+        if 'min_price' in data and 'max_price' in data and data['min_price'] > data['max_price']:
+            raise serializers.ValidationError("min_price cannot be greater than max_price.")
+        return data
+
+class AdminBookingFilterSerializer(serializers.Serializer):
+    # Query parameters accepted by the admin booking list
+    status = serializers.ChoiceField(choices=['pending', 'approved', 'canceled', 'rejected'], required=False)
+    room = serializers.IntegerField(min_value=1, required=False)
+    user = serializers.IntegerField(min_value=1, required=False)
+    start = serializers.DateField(required=False)  # bookings overlapping [start, end]
+    end = serializers.DateField(required=False)
+
+    def validate(self, data):
+        if 'start' in data and 'end' in data and data['start'] > data['end']:
+            raise serializers.ValidationError("start cannot be after end.")
+        return data
+
+class QuoteSerializer(serializers.Serializer):
+    # Query parameters of the room quote endpoint; services may repeat (?services=1&services=2)
+    check_in = serializers.DateField()
+    check_out = serializers.DateField()
+    services = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, default=list)
+
+    def validate(self, data):
+        if data['check_in'] >= data['check_out']:
+            raise serializers.ValidationError("Check-out date must be after check-in date.")
+        if (data['check_out'] - data['check_in']).days > 366:
+            raise serializers.ValidationError("Stays are limited to one year.")
+        return data
+
+    def validate_services(self, ids):
+        services = Service.objects.in_bulk(ids)
+        missing = [pk for pk in ids if pk not in services]
+        if missing:
+            raise serializers.ValidationError([f'Invalid pk "{pk}" - object does not exist.' for pk in missing])
+        return [services[pk] for pk in dict.fromkeys(ids)]
+
+class RateRuleSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = RateRule
+        fields = '__all__'
+
+    def validate_weekdays(self, value):
+        if not isinstance(value, list) or any(day not in range(7) for day in value):
+            raise serializers.ValidationError("Weekdays must be a list of numbers from 0 (Monday) to 6.")
+        return sorted(set(value))
+
+    def validate(self, data):
+        start = data.get('start_date', getattr(self.instance, 'start_date', None))
+        end = data.get('end_date', getattr(self.instance, 'end_date', None))
+        if start and end and start > end:
+            raise serializers.ValidationError("start_date cannot be after end_date.")
+        kind = data.get('kind', getattr(self.instance, 'kind', None))
+        amount = data.get('amount', getattr(self.instance, 'amount', None))
+        if kind == 'fixed' and amount is not None and amount < 0:
+            raise serializers.ValidationError("A fixed nightly price cannot be negative.")
+        if kind == 'percent' and amount is not None and amount <= -100:
+            raise serializers.ValidationError("A percentage adjustment must be above -100.")
+        return data
+
+class BulkBookingStatusSerializer(serializers.Serializer):
+    # Body of the admin bulk status endpoint
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=500)
+    status = serializers.ChoiceField(choices=['approved', 'rejected', 'canceled'])
+
+class DashboardWindowSerializer(serializers.Serializer):
+    # Occupancy window for the admin dashboard, at most a year. start defaults
+    # to today and end to DEFAULT_DAYS days from start; the limits apply to the
+    # resolved window, so an end alone can't ask for centuries.
+    DEFAULT_DAYS = 30
+
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+
+    def validate(self, data):
+        data['start'] = data.get('start', timezone.now().date())
+        data['end'] = data.get('end', data['start'] + timedelta(days=self.DEFAULT_DAYS - 1))
+        if data['start'] > data['end']:
+            raise serializers.ValidationError("start cannot be after end.")
+        if (data['end'] - data['start']).days > 366:
+            raise serializers.ValidationError("The occupancy window is limited to one year.")
+        return data
+
+class OccupancyCalendarSerializer(DashboardWindowSerializer):
+    # Same window rules as the dashboard, plus room filter and output encoding
+    DEFAULT_DAYS = 31
+
+    rooms = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False)
+    encoding = serializers.ChoiceField(choices=['ranges', 'bitmap'], default='ranges')
+
 User = get_user_model()
 
 class PasswordResetSerializer(serializers.Serializer):
@@ -41,6 +156,37 @@ class BookingStatusSerializer(serializers.ModelSerializer):
         fields = ['status']  # Only include necessary fields
         read_only_fields = ['user', 'room', 'check_in', 'check_out']  # All other fields
 
+class BulkManyRelatedField(serializers.ManyRelatedField):
+    # Resolves a whole list of primary keys with one query instead of one per id
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+
+        pk_field = self.child_relation.get_queryset().model._meta.pk
+        try:
+            pks = list(dict.fromkeys(pk_field.to_python(pk) for pk in data))
+        except (TypeError, ValueError, ValidationError):
+            self.child_relation.fail('incorrect_type', data_type=type(data).__name__)
+
+        found = self.child_relation.get_queryset().in_bulk(pks)
+        for pk in pks:
+            if pk not in found:
+                self.child_relation.fail('does_not_exist', pk_value=pk)
+        return [found[pk] for pk in pks]
+
+
+class BulkPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return BulkManyRelatedField(**list_kwargs)
+
+
 class BookingSerializer(serializers.ModelSerializer):
     # For writing/input: Accept room ID
     room = serializers.PrimaryKeyRelatedField(
@@ -51,7 +197,7 @@ class BookingSerializer(serializers.ModelSerializer):
     # For reading/output: Show full room details
     room_detail = RoomSerializer(source='room', read_only=True)
 
-    services = serializers.PrimaryKeyRelatedField(
+    services = BulkPrimaryKeyRelatedField(
         many=True,
         queryset=Service.objects.all(),
         required=False
@@ -78,39 +224,143 @@ class BookingSerializer(serializers.ModelSerializer):
         if 'check_in' not in data or 'check_out' not in data:
             return data
         
-        # Date validation
+        # Date validation (room availability is checked under lock in create)
         if data['check_in'] >= data['check_out']:
             raise serializers.ValidationError(
                 "Check-out date must be after check-in date."
             )
-        
-        # Room availability check
-        room = data['room']
-        if not room.is_available:
-            raise serializers.ValidationError(
-                "This room is not currently available"
-            )
             
         return data
 
     def create(self, validated_data):
         # Extract services from validated data
         services = validated_data.pop('services', [])
-        
-        # Create booking instance
-        booking = super().create(validated_data)
-        
-        # Add services and calculate price
-        booking.services.set(services)
-        
-        # Calculate total price
-        room_price = booking.room.price
-        service_prices = sum(service.price for service in services)
-        booking.total_price = room_price + service_prices
-        booking.save()
-        
+        room = validated_data['room']
+
+        with transaction.atomic():
+            # Lock the room row so two concurrent requests can't both pass the
+            # overlap check. SQLite has no row locks; its transactions start with
+            # BEGIN IMMEDIATE instead (see settings), which already serializes them.
+            if connection.features.has_select_for_update:
+                room = validated_data['room'] = Room.objects.select_for_update().get(pk=room.pk)
+            if room.booking_set.overlapping(validated_data['check_in'], validated_data['check_out']).exists():
+                raise serializers.ValidationError(
+                    "This room is not available for the selected dates"
+                )
+
+            # Price the stay (nightly rates plus services) before the INSERT so the row is written once
+            validated_data['total_price'] = pricing.booking_totals([
+                (room, validated_data['check_in'], validated_data['check_out'], services)
+            ])[0]
+            booking = Booking.objects.create(**validated_data)
+
+            # Add services with a single bulk INSERT into the through table
+            Through = Booking.services.through
+            Through.objects.bulk_create(
+                [Through(booking_id=booking.pk, service_id=service.pk) for service in services]
+            )
+
         return booking
 
+class BatchBookingItemSerializer(serializers.Serializer):
+    # Rooms and services stay plain ids here; BatchBookingSerializer resolves
+    # all of them with one query per model
+    room = serializers.IntegerField(min_value=1)
+    check_in = serializers.DateField()
+    check_out = serializers.DateField()
+    services = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, default=list)
+
+    def validate(self, data):
+        if data['check_in'] >= data['check_out']:
+            raise serializers.ValidationError("Check-out date must be after check-in date.")
+        return data
+
+
+class BatchBookingSerializer(serializers.Serializer):
+    MAX_ITEMS = 100
+
+    items = BatchBookingItemSerializer(many=True, allow_empty=False, max_length=MAX_ITEMS)
+
+    def validate_items(self, items):
+        rooms = Room.objects.in_bulk({item['room'] for item in items})
+        services = Service.objects.in_bulk({pk for item in items for pk in item['services']})
+
+        errors = []
+        for item in items:
+            item_errors = {}
+            if item['room'] not in rooms:
+                item_errors['room'] = [f'Invalid pk "{item["room"]}" - object does not exist.']
+            missing = [pk for pk in item['services'] if pk not in services]
+            if missing:
+                item_errors['services'] = [f'Invalid pk "{pk}" - object does not exist.' for pk in missing]
+            errors.append(item_errors)
+        if any(errors):
+            raise serializers.ValidationError(errors)
+
+        return [
+            {
+                **item,
+                'room': rooms[item['room']],
+                'services': [services[pk] for pk in dict.fromkeys(item['services'])],
+            }
+            for item in items
+        ]
+
+    def create(self, validated_data):
+        items, user = validated_data['items'], validated_data['user']
+        totals = pricing.booking_totals([
+            (item['room'], item['check_in'], item['check_out'], item['services']) for item in items
+        ])
+        bookings = [
+            Booking(
+                user=user,
+                room=item['room'],
+                check_in=item['check_in'],
+                check_out=item['check_out'],
+                total_price=total,
+            )
+            for item, total in zip(items, totals)
+        ]
+
+        with transaction.atomic():
+            # Same room locks as BookingSerializer.create, taken in pk order
+            if connection.features.has_select_for_update:
+                room_ids = sorted({booking.room_id for booking in bookings})
+                list(Room.objects.select_for_update().filter(pk__in=room_ids).order_by('pk').values_list('pk', flat=True))
+
+            # All-or-nothing: any clash, with a stored booking or another item, fails the batch
+            errors, claimed = [], defaultdict(list)
+            for index, (booking, taken) in enumerate(zip(bookings, find_conflicts(bookings))):
+                earlier = [
+                    other for other, check_in, check_out in claimed[booking.room_id]
+                    if overlaps(check_in, check_out, booking.check_in, booking.check_out)
+                ]
+                claimed[booking.room_id].append((index, booking.check_in, booking.check_out))
+                if taken:
+                    errors.append({'non_field_errors': ["This room is not available for the selected dates"]})
+                elif earlier:
+                    errors.append({'non_field_errors': [f"Overlaps item {earlier[0]} for the same room"]})
+                else:
+                    errors.append({})
+            if any(errors):
+                raise serializers.ValidationError({'items': errors})
+
+            created = Booking.objects.bulk_create(bookings)
+            Through = Booking.services.through
+            Through.objects.bulk_create([
+                Through(booking_id=booking.pk, service_id=service.pk)
+                for booking, item in zip(created, items)
+                for service in item['services']
+            ])
+            record_created(created)
+
+        return created
+
+    def to_representation(self, bookings):
+        # Same shape as BookingCreateView's response, one entry per item
+        listing = Booking.objects.filter(pk__in=[booking.pk for booking in bookings]).for_listing().order_by('pk')
+        return {'items': BookingSerializer(listing, many=True, context=self.context).data}
+
 # --------------------------
 # Authentication-Specific Serializers (for Registration/Login)
 # --------------------------
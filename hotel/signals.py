@@ -0,0 +1,222 @@
+"""
+Model signal handlers keeping derived data (dashboard stats, cached room
+payloads, cached authenticated users, nightly rate calendars) in step with
+writes.
+
+Each instance remembers the values it was loaded with (post_init), so an
+update can be turned into "remove old contribution, add new one" without
+re-reading the row. Bulk writes that bypass signals (QuerySet.update,
+bulk_create) must call hotel.stats and hotel.cache directly.
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import image_urls, pricing, replicas, stats
+from . import cache as room_cache
+from .authentication import invalidate_user
+from .models import ACTIVE_BOOKING_STATUSES, Booking, CustomUser, RateRule, Room
+
+BOOKING_STATE_FIELDS = ('status', 'room_id', 'total_price', 'check_in', 'check_out')
+
+
+def booking_state(booking):
+    # Read straight from __dict__ so deferred fields (.only()) aren't fetched
+    values = booking.__dict__
+    if any(field not in values for field in BOOKING_STATE_FIELDS):
+        return None
+    return tuple(values[field] for field in BOOKING_STATE_FIELDS)
+
+
+def room_type_for(booking, room_id):
+    if room_id == booking.room_id and Booking.room.is_cached(booking):
+        return booking.room.type
+    return Room.objects.filter(pk=room_id).values_list('type', flat=True).first()
+
+
+def invalidate_rooms_on_commit(*room_ids):
+    # After commit, so a concurrent reader can't re-cache the old rows under the new version
+    room_ids = {room_id for room_id in room_ids if room_id is not None}
+    transaction.on_commit(lambda: room_cache.invalidate_rooms(room_ids))
+
+
+def availability_footprint(state):
+    # The part of a booking that decides whether it blocks its room
+    if state is None:
+        return None
+    status, room_id, _, check_in, check_out = state
+    if status not in ACTIVE_BOOKING_STATUSES:
+        return None
+    return room_id, check_in, check_out
+
+
+def booking_deltas(booking, state, sign):
+    status, room_id, total_price, check_in, check_out = state
+    return stats.booking_deltas(
+        status, room_type_for(booking, room_id), total_price, check_in, check_out, sign=sign
+    )
+
+
+@receiver(post_init, sender=Booking)
+def remember_booking_state(sender, instance, **kwargs):
+    instance._saved_state = booking_state(instance) if instance.pk else None
+
+
+@receiver(pre_save, sender=Booking)
+def load_booking_state(sender, instance, **kwargs):
+    if instance.pk and instance._saved_state is None and not instance._state.adding:
+        # Loaded with deferred fields: read the stored values before they change
+        old = Booking.objects.filter(pk=instance.pk).values_list(*BOOKING_STATE_FIELDS).first()
+        instance._saved_state = tuple(old) if old else None
+
+
+@receiver(post_save, sender=Booking)
+def update_booking_stats(sender, instance, created, **kwargs):
+    old_state = None if created else instance._saved_state
+    if old_state is None:
+        new_state = booking_state(instance)
+    else:
+        # Fields that were never loaded (and so not saved) keep their old value
+        new_state = tuple(
+            instance.__dict__.get(field, old) for field, old in zip(BOOKING_STATE_FIELDS, old_state)
+        )
+    if new_state is None or old_state == new_state:
+        return
+
+    deltas = booking_deltas(instance, new_state, 1)
+    if old_state is not None:
+        deltas.update(booking_deltas(instance, old_state, -1))
+    stats.apply_deltas(deltas)
+
+    old_footprint, new_footprint = availability_footprint(old_state), availability_footprint(new_state)
+    if old_footprint != new_footprint:
+        invalidate_rooms_on_commit(
+            old_footprint and old_footprint[0], new_footprint and new_footprint[0]
+        )
+    instance._saved_state = new_state
+
+
+def cascading_from(origin, *models):
+    # post_delete's origin: the instance or queryset delete() was called on
+    return isinstance(origin, models) or getattr(origin, 'model', None) in models
+
+
+@receiver(post_delete, sender=Booking)
+def remove_booking_stats(sender, instance, origin=None, **kwargs):
+    if cascading_from(origin, Room, CustomUser):
+        return  # counted for all of the owner's bookings at once, see remove_owned_booking_stats
+    state = instance._saved_state or booking_state(instance)
+    if state is not None:
+        stats.apply_deltas(booking_deltas(instance, state, -1))
+        footprint = availability_footprint(state)
+        if footprint is not None:
+            invalidate_rooms_on_commit(footprint[0])
+
+
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+def pin_booking_owner(sender, instance, **kwargs):
+    # The owner reads from the primary until a replica has this write (hotel/replicas.py)
+    user_id = instance.user_id
+    transaction.on_commit(lambda: replicas.record_write(user_id))
+
+
+@receiver(pre_delete, sender=Room)
+@receiver(pre_delete, sender=CustomUser)
+def remove_owned_booking_stats(sender, instance, **kwargs):
+    # The bookings are about to be deleted by the cascade: a few aggregate
+    # queries instead of a lookup and an UPDATE per booking
+    bookings = Booking.objects.filter(**{'room' if sender is Room else 'user': instance})
+    stats.apply_deltas(stats.bookings_deltas(bookings, sign=-1))
+    invalidate_rooms_on_commit(*bookings.active().values_list('room_id', flat=True).distinct())
+
+
+@receiver(post_init, sender=Room)
+def remember_room_type(sender, instance, **kwargs):
+    instance._stats_type = instance.__dict__.get('type') if instance.pk else None
+    instance._saved_price = instance.__dict__.get('price') if instance.pk else None
+    instance._saved_image_url = instance.__dict__.get('image_url') if instance.pk else None
+
+
+@receiver(pre_save, sender=Room)
+def queue_image_url_check(sender, instance, **kwargs):
+    # Never fetched here: the URL is checked by `manage.py probe_image_urls`
+    image_url = instance.__dict__.get('image_url', instance._saved_image_url)
+    if image_url != instance._saved_image_url:
+        image_urls.reset_status(instance)
+
+
+@receiver(post_save, sender=Room)
+def update_room_stats(sender, instance, created, **kwargs):
+    if created:
+        stats.apply_deltas({('total', 'rooms'): 1})
+    elif instance._stats_type is not None and instance.__dict__.get('type', instance._stats_type) != instance._stats_type:
+        # Move this room's bookings to the new type
+        count = instance.booking_set.count()
+        stats.apply_deltas({
+            ('bookings_by_room_type', instance._stats_type): -count,
+            ('bookings_by_room_type', instance.type): count,
+        })
+    instance._stats_type = instance.__dict__.get('type')
+    instance._saved_image_url = instance.__dict__.get('image_url')
+    invalidate_rooms_on_commit(instance.pk)
+
+
+@receiver(post_save, sender=Room)
+def update_rate_calendar(sender, instance, created, **kwargs):
+    price = instance.__dict__.get('price', instance._saved_price)
+    if created or price != instance._saved_price:
+        pricing.rebuild_calendars([instance])
+    instance._saved_price = price
+
+
+@receiver(post_delete, sender=Room)
+def remove_room_stats(sender, instance, **kwargs):
+    stats.apply_deltas({('total', 'rooms'): -1})
+    invalidate_rooms_on_commit(instance.pk)
+
+
+def rule_scope(rule):
+    # The rooms and nights a rule can change: (room id or None for all, first night, last night)
+    values = rule.__dict__
+    return values.get('room_id'), values.get('start_date'), values.get('end_date')
+
+
+@receiver(post_init, sender=RateRule)
+def remember_rule_scope(sender, instance, **kwargs):
+    instance._saved_scope = rule_scope(instance) if instance.pk else None
+
+
+@receiver(post_save, sender=RateRule)
+@receiver(post_delete, sender=RateRule)
+def reprice_rule_calendars(sender, instance, origin=None, **kwargs):
+    if cascading_from(origin, Room):
+        return  # cascading from a room delete, which takes the calendar with it
+    # Nights the rule covered before this write and covers now; None is open-ended
+    scopes = [rule_scope(instance)] + ([instance._saved_scope] if instance._saved_scope else [])
+    instance._saved_scope = scopes[0]
+    room_ids = {room_id for room_id, _, _ in scopes}
+    starts = [start for _, start, _ in scopes]
+    ends = [end for _, _, end in scopes]
+    rooms = None if None in room_ids else Room.objects.filter(pk__in=room_ids)
+    first = None if None in starts else min(starts)
+    last = None if None in ends else max(ends)
+    # After commit: outside the admin's transaction, and not at all if it rolls back
+    transaction.on_commit(lambda: pricing.reprice_calendars(rooms, first, last))
+
+
+@receiver(post_save, sender=CustomUser)
+def update_customer_stats(sender, instance, created, **kwargs):
+    if created:
+        stats.apply_deltas({('total', 'customers'): 1})
+    else:
+        # Profile updates, password resets, role changes, rehashes on login...
+        user_id = instance.pk
+        transaction.on_commit(lambda: invalidate_user(user_id))
+
+
+@receiver(post_delete, sender=CustomUser)
+def remove_customer_stats(sender, instance, **kwargs):
+    stats.apply_deltas({('total', 'customers'): -1})
+    user_id = instance.pk
+    transaction.on_commit(lambda: invalidate_user(user_id))
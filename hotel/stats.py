@@ -0,0 +1,134 @@
+"""
+Incrementally maintained admin dashboard statistics.
+
+Every write to Room, Booking or CustomUser turns into a set of (metric, key)
+deltas that are applied to DashboardStat rows in two queries. Occupancy is
+stored as a difference array (+1 on check-in, -1 on check-out), so
+a booking touches two rows however long the stay, and a window is read with
+one aggregate plus the rows inside it.
+"""
+from collections import Counter, defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, Count, DecimalField, F, Q, Sum, Value, When
+
+from .models import ACTIVE_BOOKING_STATUSES, Booking, CustomUser, DashboardStat, Room
+
+STATUSES = ['pending', 'approved', 'canceled', 'rejected']
+
+
+def booking_deltas(status, room_type, total_price, check_in, check_out, sign=1):
+    """Contribution of one booking to the dashboard counters."""
+    deltas = Counter({
+        ('bookings_by_status', status): sign,
+        ('revenue_by_status', status): sign * Decimal(total_price),
+        ('bookings_by_room_type', room_type): sign,
+    })
+    if status in ACTIVE_BOOKING_STATUSES:
+        # Occupied for the nights check_in .. check_out - 1, as in BookingQuerySet.overlapping
+        deltas[('occupancy_delta', check_in.isoformat())] += sign
+        deltas[('occupancy_delta', check_out.isoformat())] -= sign
+    return deltas
+
+
+def apply_deltas(deltas):
+    """Add deltas to their DashboardStat rows: one INSERT for new keys, one UPDATE."""
+    deltas = {key: value for key, value in deltas.items() if value}
+    if not deltas:
+        return
+    with transaction.atomic(savepoint=False):
+        DashboardStat.objects.bulk_create(
+            [DashboardStat(metric=metric, key=key) for metric, key in deltas],
+            ignore_conflicts=True,
+        )
+        matches = [(Q(metric=metric, key=key), delta) for (metric, key), delta in deltas.items()]
+        condition = Q()
+        for match, _ in matches:
+            condition |= match
+        DashboardStat.objects.filter(condition).update(value=F('value') + Case(
+            *[When(match, then=Value(Decimal(delta))) for match, delta in matches],
+            default=Value(Decimal(0)),
+            output_field=DecimalField(max_digits=14, decimal_places=2),
+        ))
+
+
+def bookings_deltas(bookings, sign=1):
+    """booking_deltas() summed over a queryset of bookings, with aggregate queries."""
+    stats = Counter()
+    per_status = bookings.order_by().values('status').annotate(count=Count('id'), revenue=Sum('total_price'))
+    for row in per_status:
+        stats[('bookings_by_status', row['status'])] += sign * row['count']
+        stats[('revenue_by_status', row['status'])] += sign * (row['revenue'] or 0)
+    for row in bookings.order_by().values('room__type').annotate(count=Count('id')):
+        stats[('bookings_by_room_type', row['room__type'])] += sign * row['count']
+    stays = bookings.active().order_by().values_list('check_in', 'check_out')
+    for check_in, check_out in stays.iterator(chunk_size=5000):
+        stats[('occupancy_delta', check_in.isoformat())] += sign
+        stats[('occupancy_delta', check_out.isoformat())] -= sign
+    return stats
+
+
+def compute_from_scratch():
+    """Recompute every counter from the source tables."""
+    stats = Counter({
+        ('total', 'rooms'): Room.objects.count(),
+        ('total', 'customers'): CustomUser.objects.count(),
+    })
+    stats.update(bookings_deltas(Booking.objects.all()))
+    return {key: Decimal(value) for key, value in stats.items() if value}
+
+
+def stored_stats():
+    return {
+        (metric, key): value
+        for metric, key, value in DashboardStat.objects.exclude(value=0).values_list('metric', 'key', 'value')
+    }
+
+
+@transaction.atomic
+def rebuild():
+    DashboardStat.objects.all().delete()
+    DashboardStat.objects.bulk_create(
+        [DashboardStat(metric=metric, key=key, value=value) for (metric, key), value in compute_from_scratch().items()],
+        batch_size=1000,
+    )
+
+
+def dashboard(start, end):
+    """Dashboard payload: counters plus occupancy for each day in [start, end]."""
+    grouped = defaultdict(dict)
+    rows = DashboardStat.objects.exclude(metric='occupancy_delta').values_list('metric', 'key', 'value')
+    for metric, key, value in rows:
+        grouped[metric][key] = value
+
+    total_rooms = int(grouped['total'].get('rooms', 0))
+    counts = {status: int(grouped['bookings_by_status'].get(status, 0)) for status in STATUSES}
+
+    occupancy_rows = DashboardStat.objects.filter(metric='occupancy_delta')
+    occupied = occupancy_rows.filter(key__lt=start.isoformat()).aggregate(total=Sum('value'))['total'] or 0
+    changes = dict(
+        occupancy_rows.filter(key__gte=start.isoformat(), key__lte=end.isoformat()).values_list('key', 'value')
+    )
+    occupancy = []
+    day = start
+    while day <= end:
+        occupied += changes.get(day.isoformat(), 0)
+        occupancy.append({
+            'date': day,
+            'occupied_rooms': int(occupied),
+            'rate': round(int(occupied) / total_rooms, 4) if total_rooms else 0,
+        })
+        day += timedelta(days=1)
+
+    return {
+        'total_rooms': total_rooms,
+        'total_bookings': int(sum(grouped['bookings_by_status'].values())),
+        'total_customers': int(grouped['total'].get('customers', 0)),
+        'pending_backlog': counts['pending'],
+        'bookings_by_status': counts,
+        'revenue_by_status': {status: grouped['revenue_by_status'].get(status, Decimal('0.00')) for status in STATUSES},
+        'bookings_by_room_type': {key: int(value) for key, value in grouped['bookings_by_room_type'].items() if value},
+        'occupancy': occupancy,
+    }
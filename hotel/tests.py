@@ -1,3 +1,1432 @@
-from django.test import TestCase
+import base64
+import gzip
+import io
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import zlib
+from datetime import timedelta
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import brotli
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth import authenticate
+from django.core import mail as django_mail
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.mail.backends.locmem import EmailBackend as LocmemEmailBackend
+from django.db import connection
+from django.db.backends.sqlite3.base import DatabaseWrapper as SqliteDatabaseWrapper
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .models import CustomUser, Room, Booking, Service, DashboardStat, OutboundEmail, NightlyRate
+from . import async_views, image_urls, images, listing, mail, pricing, replicas, stats, throttling
+from .authentication import snapshot_key, version_key
+from .middleware import choose_encoding
+from .renderers import FastJSONRenderer
+from .serializers import BookingSerializer, RoomSerializer
+from .routers import ReplicaRouter
+
+
+def make_room(**kwargs):
+    defaults = {
+        'type': 'Deluxe',
+        'price': Decimal('100.00'),
+        'description': 'A room',
+        'max_guests': 2,
+        'image_url': 'https://example.com/room.jpg',
+    }
+    defaults.update(kwargs)
+    return Room.objects.create(**defaults)
+
+
+def make_user(email='guest@example.com', **kwargs):
+    return CustomUser.objects.create_user(
+        username=email.split('@')[0], email=email, password='s3cret-pass!', **kwargs
+    )
+
+
+class RoomAvailabilityTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.today = timezone.now().date()
+        self.rooms = [make_room(type=f'Room {i}') for i in range(6)]
+        day = timedelta(days=1)
+        # (check_in, check_out, status) per room, index 5 has no bookings
+        layout = [
+            (self.today - day, self.today + day, 'approved'),
+            (self.today, self.today, 'pending'),
+            (self.today - day, self.today + day, 'canceled'),
+            (self.today + day, self.today + 3 * day, 'approved'),
+            (self.today - 3 * day, self.today, 'approved'),
+        ]
+        for room, (check_in, check_out, status) in zip(self.rooms, layout):
+            Booking.objects.create(
+                user=self.user, room=room, check_in=check_in, check_out=check_out, status=status
+            )
+
+    def test_annotation_matches_per_row_property(self):
+        expected = {room.pk: Room.objects.get(pk=room.pk).is_available for room in self.rooms}
+        with self.assertNumQueries(1):
+            annotated = {room.pk: room.is_available for room in Room.objects.with_availability()}
+        self.assertEqual(annotated, expected)
+        self.assertEqual(
+            [pk for pk, available in sorted(expected.items()) if available],
+            [self.rooms[2].pk, self.rooms[3].pk, self.rooms[5].pk],
+        )
+
+    def test_list_uses_the_current_date(self):
+        # A long-running worker must not keep the date its views were loaded on
+        cache.clear()
+        client = APIClient()
+        client.force_authenticate(make_user('admin@example.com', is_staff=True))
+        tomorrow = timezone.now() + timedelta(days=1)
+        with mock.patch('django.utils.timezone.now', return_value=tomorrow):
+            rooms = {room['id']: room['is_available'] for room in client.get('/api/rooms/').json()}
+            detail = client.get(f'/api/rooms/{self.rooms[3].pk}/').json()
+        self.assertFalse(rooms[self.rooms[3].pk])
+        self.assertTrue(rooms[self.rooms[4].pk])
+        self.assertFalse(detail['is_available'])
+
+    def test_date_range(self):
+        start = self.today + timedelta(days=2)
+        end = self.today + timedelta(days=5)
+        available = set(Room.objects.available(start, end).values_list('pk', flat=True))
+        self.assertNotIn(self.rooms[3].pk, available)
+        self.assertIn(self.rooms[0].pk, available)
+        self.assertEqual(self.rooms[3].is_available_between(start, end), False)
+
+
+class RoomSearchTests(TestCase):
+    def setUp(self):
+        user = make_user()
+        self.cheap = make_room(type='Single', price=Decimal('80.00'), max_guests=2)
+        self.family = make_room(type='Family', price=Decimal('150.00'), max_guests=4)
+        self.booked = make_room(type='Family', price=Decimal('120.00'), max_guests=4)
+        self.pricey = make_room(type='Family', price=Decimal('400.00'), max_guests=6)
+        self.check_in = timezone.now().date() + timedelta(days=10)
+        Booking.objects.create(
+            user=user, room=self.booked, status='approved',
+            check_in=self.check_in + timedelta(days=2), check_out=self.check_in + timedelta(days=6),
+        )
+
+    def search(self, **params):
+        params.setdefault('check_in', self.check_in.isoformat())
+        params.setdefault('check_out', (self.check_in + timedelta(days=4)).isoformat())
+        return self.client.get('/api/rooms/search/', params)
+
+    def test_filters_and_overlap(self):
+        with self.assertNumQueries(1):
+            response = self.search(max_guests=4, max_price='200')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([room['id'] for room in response.data['results']], [self.family.pk])
+
+    def test_keyset_pages(self):
+        first = self.search(page_size=2)
+        self.assertEqual([room['id'] for room in first.data['results']], [self.cheap.pk, self.family.pk])
+        second = self.client.get(first.data['next'])
+        self.assertEqual([room['id'] for room in second.data['results']], [self.pricey.pk])
+
+    def test_invalid_dates(self):
+        response = self.search(check_out=self.check_in.isoformat())
+        self.assertEqual(response.status_code, 400)
+
+
+class OccupancyCalendarTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.guest = make_user()
+        self.start = timezone.now().date() + timedelta(days=10)
+        self.rooms = [make_room() for _ in range(3)]
+        for room, offset, nights, status in [
+            (self.rooms[0], -3, 5, 'approved'),  # runs into the window: days 0-1
+            (self.rooms[0], 5, 3, 'pending'),    # days 5-7, the check-out day is free
+            (self.rooms[1], 8, 5, 'approved'),   # runs past the window: days 8-9
+            (self.rooms[1], 2, 2, 'canceled'),   # ignored
+        ]:
+            Booking.objects.create(
+                user=self.guest, room=room, status=status,
+                check_in=self.start + timedelta(days=offset),
+                check_out=self.start + timedelta(days=offset + nights),
+            )
+        self.params = {'start': self.start.isoformat(), 'end': (self.start + timedelta(days=9)).isoformat()}
+
+    def test_ranges(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/rooms/occupancy/', self.params)
+        self.assertEqual(response.status_code, 200)
+        day = lambda offset: self.start + timedelta(days=offset)
+        self.assertEqual(response.data['days'], 10)
+        self.assertEqual(response.data['rooms'], [
+            {'room': self.rooms[0].pk, 'occupied_days': 5, 'occupied': [[day(0), day(1)], [day(5), day(7)]]},
+            {'room': self.rooms[1].pk, 'occupied_days': 2, 'occupied': [[day(8), day(9)]]},
+            {'room': self.rooms[2].pk, 'occupied_days': 0, 'occupied': []},
+        ])
+
+    def test_bitmap(self):
+        response = self.client.get('/api/rooms/occupancy/', {**self.params, 'encoding': 'bitmap'})
+        self.assertEqual(response.data['rooms'], [room.pk for room in self.rooms])
+        self.assertEqual(response.data['stride'], 2)
+        grid = zlib.decompress(base64.b64decode(response.data['bitmap']))
+        rows = [int.from_bytes(grid[i:i + 2], 'little') for i in range(0, len(grid), 2)]
+        self.assertEqual(rows, [0b0011100011, 0b1100000000, 0])
+
+    def test_invalidated_by_bookings(self):
+        params = {**self.params, 'rooms': [self.rooms[2].pk]}
+        self.assertEqual(self.client.get('/api/rooms/occupancy/', params).data['rooms'][0]['occupied'], [])
+        with self.captureOnCommitCallbacks(execute=True):
+            Booking.objects.create(
+                user=self.guest, room=self.rooms[2], check_in=self.start, check_out=self.start + timedelta(days=1),
+            )
+        response = self.client.get('/api/rooms/occupancy/', params)
+        self.assertEqual(response.data['rooms'][0]['occupied'], [[self.start, self.start]])
+        self.assertEqual(self.client.get('/api/rooms/occupancy/', {'end': '2000-01-01'}).status_code, 400)
+
+    def test_window_limited_after_defaults(self):
+        # start defaults to today, so an end alone must still fit in a year
+        for params in [{'end': '2500-12-31', 'encoding': 'bitmap'}, {'start': self.start.isoformat(), 'end': '2500-12-31'}]:
+            self.assertEqual(self.client.get('/api/rooms/occupancy/', params).status_code, 400)
+        self.assertEqual(self.client.get('/api/rooms/occupancy/').data['days'], 31)
+        end = (timezone.now().date() + timedelta(days=366)).isoformat()
+        self.assertEqual(self.client.get('/api/rooms/occupancy/', {'end': end}).data['days'], 367)
+
+
+class BookingCreateTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.room = make_room(price=Decimal('100.00'))
+        self.services = [
+            Service.objects.create(name=f'Service {i}', price=Decimal('10.50')) for i in range(3)
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.check_in = timezone.now().date() + timedelta(days=5)
+
+    def post(self, **data):
+        payload = {
+            'room': self.room.pk,
+            'check_in': self.check_in.isoformat(),
+            'check_out': (self.check_in + timedelta(days=2)).isoformat(),
+            'services': [service.pk for service in self.services],
+        }
+        payload.update(data)
+        return self.client.post('/api/bookings/create/', payload, format='json')
+
+    def test_query_count(self):
+        # room, services, savepoint, overlap check, rate calendar, booking INSERT,
+        # dashboard stats INSERT + UPDATE, through INSERT, release savepoint, then
+        # room_detail availability and services for the response
+        with self.assertNumQueries(12):
+            response = self.post()
+        self.assertEqual(response.status_code, 201)
+        booking = Booking.objects.get()
+        # Two nights plus three one-off services
+        self.assertEqual(booking.total_price, Decimal('231.50'))
+        self.assertEqual(sorted(booking.services.values_list('pk', flat=True)), [s.pk for s in self.services])
+        self.assertEqual(response.data['services'], [s.pk for s in self.services])
+
+    def test_unknown_service(self):
+        response = self.post(services=[self.services[0].pk, 999])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('services', response.data)
+        self.assertFalse(Booking.objects.exists())
+
+    def test_overlapping_stay_rejected(self):
+        self.assertEqual(self.post().status_code, 201)
+        response = self.post(check_in=(self.check_in + timedelta(days=1)).isoformat(),
+                             check_out=(self.check_in + timedelta(days=4)).isoformat())
+        self.assertEqual(response.status_code, 400)
+
+    def test_adjacent_stays_both_booked(self):
+        self.assertEqual(self.post().status_code, 201)
+        # The next guest checks in on the day the first checks out
+        response = self.post(check_in=(self.check_in + timedelta(days=2)).isoformat(),
+                             check_out=(self.check_in + timedelta(days=4)).isoformat())
+        self.assertEqual(response.status_code, 201)
+        response = self.post(check_in=(self.check_in - timedelta(days=2)).isoformat(),
+                             check_out=self.check_in.isoformat())
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.room.booking_set.active().count(), 3)
+
+
+class BatchBookingCreateTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.rooms = [make_room(price=Decimal('100.00')) for _ in range(20)]
+        self.service = Service.objects.create(name='Breakfast', price=Decimal('12.00'))
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.check_in = timezone.now().date() + timedelta(days=5)
+
+    def item(self, room, offset=0, nights=2):
+        check_in = self.check_in + timedelta(days=offset)
+        return {
+            'room': room.pk,
+            'check_in': check_in.isoformat(),
+            'check_out': (check_in + timedelta(days=nights)).isoformat(),
+            'services': [self.service.pk],
+        }
+
+    def post(self, items):
+        return self.client.post('/api/bookings/batch/', {'items': items}, format='json')
+
+    def test_queries_do_not_grow_with_items(self):
+        Room.objects.filter(pk=self.rooms[0].pk).update(image='rooms/front.jpg')
+        with CaptureQueriesContext(connection) as small:
+            response = self.post([self.item(room) for room in self.rooms[:2]])
+        self.assertEqual(response.status_code, 201)
+        with CaptureQueriesContext(connection) as large:
+            response = self.post([self.item(room, offset=10) for room in self.rooms])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(large), len(small))
+
+        self.assertEqual(len(response.data['items']), 20)
+        self.assertEqual(response.data['items'][0]['total_price'], '212.00')
+        self.assertEqual(response.data['items'][0]['services'], [self.service.pk])
+        # Absolute, as BookingCreateView returns it
+        self.assertEqual(
+            response.data['items'][0]['room_detail']['image'],
+            f'http://testserver{settings.MEDIA_URL}rooms/front.jpg',
+        )
+        self.assertEqual(Booking.services.through.objects.count(), 22)
+        self.assertEqual(stats.stored_stats(), stats.compute_from_scratch())
+
+    def test_all_or_nothing(self):
+        self.assertEqual(self.post([self.item(self.rooms[0])]).status_code, 201)
+        response = self.post([self.item(self.rooms[1]), self.item(self.rooms[0], offset=1)])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['items'][0], {})
+        self.assertIn('non_field_errors', response.data['items'][1])
+
+        # Items clashing with each other
+        response = self.post([self.item(self.rooms[2]), self.item(self.rooms[2], offset=1)])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_unknown_ids(self):
+        response = self.post([self.item(self.rooms[0]), {**self.item(self.rooms[1]), 'room': 999, 'services': [998]}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.data['items'][1]), {'room', 'services'})
+        self.assertEqual(self.post([]).status_code, 400)
+
+
+class PricingTests(TestCase):
+    def setUp(self):
+        self.admin = make_user('admin@example.com', is_staff=True)
+        self.room = make_room(price=Decimal('100.00'))
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        today = timezone.now().date()
+        # Next Monday, so the weeks below line up with weekdays
+        self.monday = today + timedelta(days=7 - today.weekday())
+
+    def add_rule(self, **data):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/admin/rate-rules/', data, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        return response.data
+
+    def quote(self, check_in, nights, **params):
+        return self.client.get(f'/api/rooms/{self.room.pk}/quote/', {
+            'check_in': check_in.isoformat(),
+            'check_out': (check_in + timedelta(days=nights)).isoformat(),
+            **params,
+        })
+
+    def test_rules_and_calendar(self):
+        self.assertEqual(self.room.nightly_rates.count(), settings.PRICING_CALENDAR_DAYS)
+        self.add_rule(name='Weekend', weekdays=[4, 5], kind='percent', amount='20')
+        self.add_rule(
+            name='Gala', room=self.room.pk, kind='fixed', amount='400', priority=5,
+            start_date=(self.monday + timedelta(days=2)).isoformat(),
+            end_date=(self.monday + timedelta(days=2)).isoformat(),
+        )
+        # Mon..Sun: 100, 100, 400 (gala), 100, 120, 120, 100
+        with self.assertNumQueries(2):
+            response = self.quote(self.monday, 7)
+        self.assertEqual(response.data['room_total'], Decimal('1040.00'))
+        self.assertEqual(response.data['nights'], 7)
+
+        # Outside the calendar the rules are evaluated night by night, with the same result
+        far = self.monday + timedelta(weeks=(settings.PRICING_CALENDAR_DAYS // 7) + 1)
+        self.assertFalse(self.room.nightly_rates.filter(date=far).exists())
+        self.assertEqual(self.quote(far, 7).data['room_total'], Decimal('740.00'))
+
+        # A price change rebuilds the room's calendar
+        self.client.patch(f'/api/rooms/update/{self.room.pk}/', {'price': '50.00'}, format='json')
+        self.assertEqual(self.quote(self.monday + timedelta(days=4), 2).data['room_total'], Decimal('120.00'))
+
+    def test_rule_reprices_its_nights_after_commit(self):
+        rates = self.room.nightly_rates.order_by('date')
+        before = list(rates.values_list('date', 'price', 'cumulative'))
+        gala = self.monday + timedelta(days=2)
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.client.post('/api/admin/rate-rules/', {
+                'name': 'Gala', 'kind': 'fixed', 'amount': '400',
+                'start_date': gala.isoformat(), 'end_date': gala.isoformat(),
+            }, format='json')
+        self.assertEqual(list(rates.values_list('date', 'price', 'cumulative')), before)
+        # Rooms, rules, the one night, the shift after it (plus the savepoint)
+        with self.assertNumQueries(7):
+            callbacks[0]()
+
+        # Only the gala night is repriced; the running totals after it move by 300
+        after = list(rates.values_list('date', 'price', 'cumulative'))
+        for (night, old_price, old_total), (_, price, total) in zip(before, after):
+            self.assertEqual(price, Decimal('400.00') if night == gala else old_price)
+            self.assertEqual(total, old_total + (Decimal('300.00') if night >= gala else 0))
+        pricing.rebuild_calendars([self.room])
+        self.assertEqual(list(rates.values_list('date', 'price', 'cumulative')), after)
+
+    def test_per_night_services(self):
+        breakfast = Service.objects.create(name='Breakfast', price=Decimal('10.00'), per_night=True)
+        transfer = Service.objects.create(name='Transfer', price=Decimal('30.00'))
+        response = self.quote(self.monday, 3, services=[breakfast.pk, transfer.pk])
+        self.assertEqual([line['amount'] for line in response.data['services']], [Decimal('30.00'), Decimal('30.00')])
+        self.assertEqual(response.data['total'], Decimal('360.00'))
+        self.assertEqual(self.quote(self.monday, 3, services=[999]).status_code, 400)
+        self.assertEqual(self.quote(self.monday, 0).status_code, 400)
+
+    def test_rule_delete_and_room_delete(self):
+        rule = self.add_rule(name='Closed', room=self.room.pk, kind='percent', amount='50')
+        self.assertEqual(self.quote(self.monday, 1).data['total'], Decimal('150.00'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.delete(f'/api/admin/rate-rules/{rule["id"]}/').status_code, 204)
+        self.assertEqual(self.quote(self.monday, 1).data['total'], Decimal('100.00'))
+
+        self.add_rule(name='Again', room=self.room.pk, kind='percent', amount='50')
+        self.room.delete()
+        self.assertFalse(NightlyRate.objects.exists())
+        self.assertEqual(self.client.post('/api/admin/rate-rules/', {
+            'name': 'Bad', 'kind': 'percent', 'amount': '-100',
+        }, format='json').status_code, 400)
+
+
+class AdminBookingListTests(TestCase):
+    def setUp(self):
+        self.admin = make_user('admin@example.com', is_staff=True)
+        self.guest = make_user()
+        service = Service.objects.create(name='Breakfast', price=Decimal('12.00'))
+        start = timezone.now().date()
+        for i in range(12):
+            booking = Booking.objects.create(
+                user=self.guest, room=make_room(type=f'Room {i}'),
+                check_in=start + timedelta(days=i), check_out=start + timedelta(days=i + 2),
+                status='approved' if i % 3 == 0 else 'pending',
+            )
+            booking.services.add(service)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_page_in_constant_queries(self):
+        # ETag aggregate, bookings, their rooms with availability, their services
+        with self.assertNumQueries(4):
+            response = self.client.get('/api/admin/bookings/', {'page_size': 5})
+        self.assertEqual(len(response.data['results']), 5)
+        with self.assertNumQueries(4):
+            response = self.client.get(response.data['next'])
+        self.assertEqual(len(response.data['results']), 5)
+
+    def test_filters(self):
+        response = self.client.get('/api/admin/bookings/', {'status': 'approved'})
+        self.assertEqual(len(response.data['results']), 4)
+        start = timezone.now().date() + timedelta(days=20)
+        response = self.client.get('/api/admin/bookings/', {'start': start.isoformat()})
+        self.assertEqual(response.data['results'], [])
+        self.assertEqual(self.client.get('/api/admin/bookings/', {'status': 'bogus'}).status_code, 400)
+
+    def test_streaming_export(self):
+        response = self.client.get('/api/admin/bookings/export/', {'status': 'approved'})
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(',')[:3], ['id', 'created_at', 'status'])
+        self.assertEqual(len(lines), 5)
+        self.assertTrue(all('guest@example.com' in line and 'Breakfast' in line for line in lines[1:]))
+
+        response = self.client.get('/api/admin/bookings/export/', {'fmt': 'ndjson'})
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual(len(rows), 12)
+        self.assertEqual(rows[0]['services'], 'Breakfast')
+
+
+class BulkBookingStatusTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = make_user('admin@example.com', is_staff=True)
+        self.guest = make_user()
+        self.room = make_room()
+        start = timezone.now().date()
+        self.pending = [
+            Booking.objects.create(
+                user=self.guest, room=make_room(), check_in=start, check_out=start + timedelta(days=2),
+            )
+            for _ in range(5)
+        ]
+        self.held = Booking.objects.create(
+            user=self.guest, room=self.room, check_in=start, check_out=start + timedelta(days=3),
+        )
+        # Rejected earlier; approving them now would clash with held (and each other)
+        self.clashing = [
+            Booking.objects.create(
+                user=self.guest, room=self.room, status='rejected',
+                check_in=start + timedelta(days=2), check_out=start + timedelta(days=4),
+            ),
+            Booking.objects.create(
+                user=self.guest, room=self.room, status='rejected',
+                check_in=start + timedelta(days=5), check_out=start + timedelta(days=7),
+            ),
+            Booking.objects.create(
+                user=self.guest, room=self.room, status='rejected',
+                check_in=start + timedelta(days=6), check_out=start + timedelta(days=8),
+            ),
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def post(self, ids, status):
+        return self.client.post('/api/admin/bookings/bulk-status/', {'ids': ids, 'status': status}, format='json')
+
+    def test_approve_many_in_constant_queries(self):
+        ids = [booking.pk for booking in self.pending]
+        # SELECT bookings, conflict check, UPDATE, stats INSERT + UPDATE, outbox
+        # INSERT (+ the savepoint pair the test transaction turns atomic() into)
+        with self.assertNumQueries(8):
+            response = self.post(ids + [ids[0], 999999], 'approved')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['updated'], 5)
+        self.assertEqual(response.data['results'][-1], {'id': 999999, 'result': 'not_found'})
+        self.assertEqual(Booking.objects.filter(pk__in=ids, status='approved').count(), 5)
+        self.assertEqual(OutboundEmail.objects.count(), 5)
+        self.assertEqual(stats.stored_stats(), stats.compute_from_scratch())
+
+        response = self.post(ids[:1], 'approved')
+        self.assertEqual(response.data['results'], [{'id': ids[0], 'result': 'unchanged'}])
+
+    def test_conflicts_are_reported_per_id(self):
+        ids = [booking.pk for booking in self.clashing]
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.post(ids, 'approved')
+        self.assertEqual(response.data['results'], [
+            {'id': ids[0], 'result': 'conflict', 'conflicts_with': [self.held.pk]},
+            {'id': ids[1], 'result': 'updated'},
+            {'id': ids[2], 'result': 'conflict', 'conflicts_with': [ids[1]]},
+        ])
+        self.assertEqual(self.room.booking_set.active().count(), 2)
+        self.assertEqual(stats.stored_stats(), stats.compute_from_scratch())
+
+        response = self.post([self.held.pk], 'canceled')
+        self.assertEqual(response.data['updated'], 1)
+        self.assertEqual(self.post([ids[0]], 'approved').data['updated'], 1)
+
+    def test_overlapping_pending_bookings_approved_once(self):
+        start = timezone.now().date() + timedelta(days=20)
+        # Both pending, e.g. from before the overlap check: approving must still pick one
+        first, second = [
+            Booking.objects.create(
+                user=self.guest, room=self.room, check_in=start + timedelta(days=offset),
+                check_out=start + timedelta(days=offset + 3),
+            )
+            for offset in (0, 2)
+        ]
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.post([first.pk, second.pk], 'approved')
+        self.assertEqual(response.data['results'], [
+            {'id': first.pk, 'result': 'updated'},
+            {'id': second.pk, 'result': 'conflict', 'conflicts_with': [first.pk]},
+        ])
+        self.assertEqual(self.post([second.pk], 'approved').data['results'][0]['conflicts_with'], [first.pk])
+        self.assertEqual(Booking.objects.get(pk=second.pk).status, 'pending')
+
+    def test_admin_only(self):
+        client = APIClient()
+        client.force_authenticate(self.guest)
+        response = client.post('/api/admin/bookings/bulk-status/', {'ids': [1], 'status': 'approved'}, format='json')
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(self.post([], 'approved').status_code, 400)
+        self.assertEqual(self.post([1], 'pending').status_code, 400)
+
+
+class DashboardStatsTests(TestCase):
+    def setUp(self):
+        self.admin = make_user('admin@example.com', is_staff=True)
+        self.guest = make_user()
+        self.today = timezone.now().date()
+        self.suite = make_room(type='Suite')
+        self.single = make_room(type='Single')
+        self.booking = Booking.objects.create(
+            user=self.guest, room=self.suite, total_price=Decimal('300.00'),
+            check_in=self.today, check_out=self.today + timedelta(days=2),
+        )
+        Booking.objects.create(
+            user=self.guest, room=self.single, total_price=Decimal('80.00'), status='approved',
+            check_in=self.today + timedelta(days=1), check_out=self.today + timedelta(days=2),
+        )
+
+    maxDiff = None
+
+    def assertStatsMatchRebuild(self):
+        self.assertEqual(stats.stored_stats(), stats.compute_from_scratch())
+
+    def test_incremental_updates_match_rebuild(self):
+        self.assertStatsMatchRebuild()
+        self.booking.status = 'approved'
+        self.booking.save()
+        self.assertStatsMatchRebuild()
+        booking = Booking.objects.only('id', 'check_out').get(pk=self.booking.pk)
+        booking.check_out = self.today + timedelta(days=5)
+        booking.save()
+        self.assertStatsMatchRebuild()
+        self.suite.type = 'Penthouse'
+        self.suite.save()
+        self.assertStatsMatchRebuild()
+        self.single.delete()
+        self.assertStatsMatchRebuild()
+
+    def test_cascading_deletes(self):
+        for i in range(20):
+            Booking.objects.create(
+                user=self.guest, room=self.suite, total_price=Decimal('10.00'),
+                check_in=self.today + timedelta(days=10 + i), check_out=self.today + timedelta(days=10 + i),
+            )
+        # The bookings' counters are removed in bulk, not per booking
+        with CaptureQueriesContext(connection) as queries:
+            self.suite.delete()
+        self.assertLess(len(queries), 30)
+        self.assertStatsMatchRebuild()
+        self.guest.delete()
+        self.assertStatsMatchRebuild()
+
+    def test_dashboard(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        with self.assertNumQueries(3):
+            response = client.get('/api/admin/dashboard/', {'end': (self.today + timedelta(days=3)).isoformat()})
+        self.assertEqual(response.data['total_rooms'], 2)
+        self.assertEqual(response.data['total_bookings'], 2)
+        self.assertEqual(response.data['total_customers'], 2)
+        self.assertEqual(response.data['pending_backlog'], 1)
+        self.assertEqual(response.data['revenue_by_status']['approved'], Decimal('80.00'))
+        self.assertEqual(response.data['bookings_by_room_type'], {'Suite': 1, 'Single': 1})
+        self.assertEqual([day['occupied_rooms'] for day in response.data['occupancy']], [1, 2, 0, 0])
+        self.assertEqual(response.data['occupancy'][1]['rate'], 1.0)
+        # The one-year limit holds when start is left to its default
+        self.assertEqual(client.get('/api/admin/dashboard/', {'end': '2300-12-31'}).status_code, 400)
+        self.assertEqual(len(client.get('/api/admin/dashboard/').data['occupancy']), 30)
+
+    def test_rebuild(self):
+        DashboardStat.objects.all().delete()
+        stats.rebuild()
+        self.assertStatsMatchRebuild()
+
+
+class RoomCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = make_user('admin@example.com', is_staff=True)
+        self.room = make_room()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_hits_and_conditional_get(self):
+        first = self.client.get('/api/rooms/')
+        self.assertEqual(first.status_code, 200)
+        with self.assertNumQueries(0):
+            second = self.client.get('/api/rooms/')
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(self.client.get('/api/admin/cache/stats/').data['room_cache'], {'hits': 1, 'misses': 1})
+
+        revalidated = self.client.get('/api/rooms/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(revalidated.status_code, 304)
+        self.assertEqual(
+            self.client.get('/api/rooms/', HTTP_IF_MODIFIED_SINCE=first['Last-Modified']).status_code, 304
+        )
+
+    def test_room_update_invalidates(self):
+        etag = self.client.get(f'/api/rooms/{self.room.pk}/')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f'/api/rooms/update/{self.room.pk}/', {'price': '250.00'}, format='json')
+        response = self.client.get(f'/api/rooms/{self.room.pk}/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['price'], '250.00')
+
+    def test_booking_status_change_invalidates(self):
+        self.assertTrue(self.client.get('/api/rooms/').data[0]['is_available'])
+        today = timezone.now().date()
+        with self.captureOnCommitCallbacks(execute=True):
+            booking = Booking.objects.create(
+                user=self.admin, room=self.room, check_in=today, check_out=today + timedelta(days=1)
+            )
+        self.assertFalse(self.client.get('/api/rooms/').data[0]['is_available'])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f'/api/bookings/cancel/{booking.pk}/')
+        self.assertTrue(self.client.get('/api/rooms/').data[0]['is_available'])
+
+
+class ConditionalListTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = make_user('admin@example.com', is_staff=True)
+        self.guest = make_user()
+        check_in = timezone.now().date() + timedelta(days=3)
+        self.bookings = [
+            Booking.objects.create(
+                user=self.guest, room=make_room(type=f'Room {i}'),
+                check_in=check_in, check_out=check_in + timedelta(days=2),
+            )
+            for i in range(3)
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(self.guest)
+
+    def assertChanged(self, etag, path='/api/bookings/my-bookings/'):
+        response = self.client.get(path, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        return response['ETag']
+
+    def test_unchanged_list_is_not_modified(self):
+        etag = self.client.get('/api/bookings/my-bookings/')['ETag']
+        with self.assertNumQueries(1):  # the aggregate only
+            response = self.client.get('/api/bookings/my-bookings/', HTTP_IF_NONE_MATCH=f'W/{etag}')
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+        self.client.delete(f'/api/bookings/cancel/{self.bookings[0].pk}/')
+        etag = self.assertChanged(etag)
+        self.bookings[0].delete()
+        etag = self.assertChanged(etag)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.bookings[1].room.save()  # shown nested in the list
+        etag = self.assertChanged(etag)
+
+        self.client.force_authenticate(self.admin)
+        admin_etag = self.client.get('/api/admin/bookings/', {'page_size': 1})['ETag']
+        self.client.post(
+            '/api/admin/bookings/bulk-status/', {'ids': [self.bookings[2].pk], 'status': 'approved'}, format='json',
+        )
+        self.assertChanged(admin_etag, '/api/admin/bookings/?page_size=1')
+        self.client.force_authenticate(self.guest)
+        self.assertChanged(etag)
+
+
+@override_settings(COMPRESSION_MIN_BYTES=500)
+class CompressionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = make_user('admin@example.com', is_staff=True)
+        for i in range(10):
+            make_room(type=f'Room {i}')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_gzip_above_threshold(self):
+        plain = self.client.get('/api/rooms/')
+        self.assertFalse(plain.has_header('Content-Encoding'))
+        self.assertIn('Accept-Encoding', plain['Vary'])
+
+        response = self.client.get('/api/rooms/', HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        self.assertEqual(response['ETag'], f'W/{plain["ETag"]}')
+        response = self.client.get('/api/rooms/', HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+        response = self.client.get('/api/rooms/', HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(brotli.decompress(response.content), plain.content)
+
+        small = self.client.get('/api/user/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(small.has_header('Content-Encoding'))
+
+        export = self.client.get('/api/admin/bookings/export/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(export['Content-Encoding'], 'gzip')
+        self.assertTrue(gzip.decompress(b''.join(export.streaming_content)).startswith(b'id,created_at'))
+
+    def test_https_only_gzipped_with_padding(self):
+        plain = self.client.get('/api/rooms/', secure=True)
+        response = self.client.get('/api/rooms/', secure=True, HTTP_ACCEPT_ENCODING='br, gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        # Random padding goes in the header's file name (BREACH mitigation)
+        self.assertTrue(response.content[3] & gzip.FNAME)
+
+    def test_negotiation(self):
+        self.assertEqual(choose_encoding('br, gzip', ('gzip',)), 'gzip')
+        self.assertIsNone(choose_encoding('br', ('gzip',)))
+        self.assertEqual(choose_encoding('gzip;q=0.5, identity'), 'gzip')
+        self.assertEqual(choose_encoding('*'), choose_encoding('br, gzip'))
+        self.assertIsNone(choose_encoding('gzip;q=0, br;q=0, *'))
+        self.assertIsNone(choose_encoding('identity'))
+        self.assertIsNone(choose_encoding(''))
+
+
+class AsyncReadViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = make_user('admin@example.com', is_staff=True)
+        self.guest = make_user()
+        self.room = make_room()
+        make_room(type='Suite', price=Decimal('300.00'))
+        check_in = timezone.now().date() + timedelta(days=3)
+        booking = Booking.objects.create(user=self.guest, room=self.room, check_in=check_in, check_out=check_in + timedelta(days=2))
+        booking.services.add(Service.objects.create(name='Breakfast', price=Decimal('10.00')))
+
+    def headers(self, user):
+        return {'Authorization': f'Bearer {RefreshToken.for_user(user).access_token}'} if user else {}
+
+    def get_async(self, path, user=None, **headers):
+        with override_settings(ROOT_URLCONF='hotel_backend.urls_asgi'):
+            response = async_to_sync(self.async_client.get)(path, headers={**self.headers(user), **headers})
+            response.view_class = response.resolver_match.func.view_class  # resolved lazily
+        return response
+
+    def test_same_responses_as_sync_views(self):
+        check_in = timezone.now().date() + timedelta(days=1)
+        search = f'/api/rooms/search/?check_in={check_in}&check_out={check_in + timedelta(days=7)}&page_size=1'
+        cases = [
+            ('/api/rooms/', self.admin),
+            (f'/api/rooms/{self.room.pk}/', self.admin),
+            (f'/api/rooms/{self.room.pk + 100}/', self.admin),
+            ('/api/rooms/', self.guest),
+            ('/api/rooms/?fields=id,price', self.admin),
+            (search, None),
+            ('/api/rooms/search/?check_in=2030-01-02&check_out=2030-01-01', None),
+            ('/api/bookings/my-bookings/', self.guest),
+            ('/api/bookings/my-bookings/?fields=id,room_detail.type', self.guest),
+            ('/api/bookings/my-bookings/?fields=bogus', self.guest),
+            ('/api/bookings/my-bookings/', None),
+            ('/api/user/', self.guest),
+        ]
+        for path, user in cases:
+            with self.subTest(path=path, user=user):
+                cache.clear()
+                expected = self.client.get(path, headers=self.headers(user))
+                response = self.get_async(path, user)
+                self.assertTrue(issubclass(response.view_class, async_views.AsyncReadView))
+                self.assertEqual(response.status_code, expected.status_code)
+                self.assertEqual(response.json(), expected.json())
+                self.assertEqual(response.get('WWW-Authenticate'), expected.get('WWW-Authenticate'))
+                self.assertEqual(response.get('ETag'), expected.get('ETag'))
+
+    def test_room_cache_validators(self):
+        first = self.get_async('/api/rooms/', self.admin)
+        self.assertEqual(first['ETag'], self.client.get('/api/rooms/', headers=self.headers(self.admin))['ETag'])
+        self.assertEqual(self.get_async('/api/rooms/', self.admin, If_None_Match=first['ETag']).status_code, 304)
+        self.assertEqual(self.client.get('/api/admin/cache/stats/', headers=self.headers(self.admin)).data['room_cache'], {'hits': 1, 'misses': 1})
+
+    def test_other_methods_use_sync_views(self):
+        with override_settings(ROOT_URLCONF='hotel_backend.urls_asgi'):
+            response = async_to_sync(self.async_client.post)('/api/rooms/', {
+                'type': 'Twin', 'price': '80.00', 'description': 'New', 'max_guests': 2,
+                'image_url': 'https://example.com/twin.jpg',
+            }, headers=self.headers(self.admin))
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(Room.objects.filter(type='Twin').exists())
+
+
+class ListingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name, MEDIA_URL='/media/'))
+        self.guest = make_user()
+        self.room = make_room(image=image_upload(), description='Sea view \u2028 caf\u00e9', price=Decimal('99.5'))
+        images.process_pending()
+        make_room(type='Suite', price=Decimal('300.00'), image_url_checked_at=timezone.now())
+        breakfast = Service.objects.create(name='Breakfast', price=Decimal('12.00'))
+        parking = Service.objects.create(name='Parking', price=Decimal('5.00'))
+        check_in = timezone.now().date() + timedelta(days=3)
+        for room in Room.objects.all():
+            booking = Booking.objects.create(
+                user=self.guest, room=room, check_in=check_in, check_out=check_in + timedelta(days=2),
+            )
+            booking.services.add(parking, breakfast)
+        self.client = APIClient()
+        self.client.force_authenticate(self.guest)
+
+    def test_same_output_as_serializers(self):
+        request = self.client.get('/api/user/').wsgi_request
+        rooms = Room.objects.with_availability().order_by('pk')
+        bookings = Booking.objects.for_listing().order_by('pk')
+        expected = [
+            RoomSerializer(rooms, many=True, context={'request': request}).data,
+            BookingSerializer(bookings, many=True, context={'request': request}).data,
+        ]
+        fast = [listing.rooms(rooms, request), listing.bookings(bookings, request)]
+        self.assertEqual(fast, expected)
+        self.assertIsNotNone(fast[0][0]['image_srcset'])
+        self.assertEqual(FastJSONRenderer().render(fast), JSONRenderer().render(expected))
+
+    def test_sparse_fields(self):
+        response = self.client.get('/api/bookings/my-bookings/', {'fields': 'id,room_detail.price,services'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [list(row) for row in response.json()], [['id', 'room_detail', 'services']] * 2,
+        )
+        self.assertEqual(response.json()[-1]['room_detail'], {'price': '99.50'})
+
+        with self.assertNumQueries(2):  # ETag aggregate, bookings
+            response = self.client.get('/api/bookings/my-bookings/', {'fields': 'id,status'})
+        self.assertEqual(response.json()[0], {'id': Booking.objects.latest('created_at').pk, 'status': 'pending'})
+
+        response = self.client.get('/api/bookings/my-bookings/', {'fields': 'id,password,room_detail.bogus'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(len(response.data['fields']), 2)
+
+
+def image_upload(name='photo.jpg', size=(1600, 900)):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, (200, 120, 40)).save(buffer, 'JPEG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+
+class RoomImageTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name, MEDIA_URL='/media/'))
+        self.admin = make_user('admin@example.com', is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_variants_built_by_worker(self):
+        room = make_room(image=image_upload())
+        self.assertIsNone(self.client.get(f'/api/rooms/{room.pk}/').data['image_srcset'])
+
+        self.assertEqual(images.process_pending(), (1, 0))
+        self.assertEqual(images.process_pending(), (0, 0))
+        srcset = self.client.get(f'/api/rooms/{room.pk}/').data['image_srcset']
+        self.assertEqual([entry.split()[-1] for entry in srcset['webp'].split(', ')], ['320w', '640w', '1280w'])
+        self.assertTrue(srcset['jpeg'].startswith('http://testserver/media/rooms/variants/'))
+
+        room.refresh_from_db()
+        width, name = room.image_variants['webp'][0]
+        with default_storage.open(name) as variant, Image.open(variant) as opened:
+            self.assertEqual((opened.format, opened.size), ('WEBP', (320, 180)))
+        with default_storage.open(room.image_variants['thumbnail']['jpeg']) as thumb, Image.open(thumb) as opened:
+            self.assertEqual(opened.size, (160, 160))
+
+        # A new upload is pending again; identical content maps to the same names
+        room.image = image_upload('other.jpg')
+        with self.captureOnCommitCallbacks(execute=True):
+            room.save()
+        self.assertIsNone(self.client.get(f'/api/rooms/{room.pk}/').data['image_srcset'])
+        images.process_pending()
+        room.refresh_from_db()
+        self.assertEqual(room.image_variants['webp'][0], [width, name])
+
+    def test_small_and_broken_images(self):
+        small = make_room(image=image_upload(size=(200, 100)))
+        broken = make_room(image=SimpleUploadedFile('broken.jpg', b'not an image'))
+        self.assertEqual(images.process_pending(), (1, 1))
+        small.refresh_from_db()
+        self.assertEqual([width for width, _ in small.image_variants['jpeg']], [200])
+        broken.refresh_from_db()
+        self.assertEqual(broken.image_variants, {})
+        self.assertTrue(broken.image_variants_error)
+
+
+class ImageServer(BaseHTTPRequestHandler):
+    # Stand-in for remote image hosts; records every request it answers
+    requests = []
+
+    def do_HEAD(self):
+        self.respond(body=False)
+
+    def do_GET(self):
+        self.respond(body=True)
+
+    def respond(self, body):
+        self.requests.append((self.command, self.path))
+        if self.path == '/nohead.png' and self.command == 'HEAD':
+            return self.send_error(405)
+        redirects = {'/moved.jpg': '/ok.jpg', '/to-ftp.jpg': f'ftp://{self.headers["Host"]}/ok.jpg'}
+        if self.path in redirects:
+            self.send_response(302)
+            self.send_header('Location', redirects[self.path])
+            self.send_header('Content-Length', '0')
+            return self.end_headers()
+        routes = {
+            '/ok.jpg': (200, 'image/jpeg', 1000),
+            '/big.jpg': (200, 'image/jpeg', 10 * 1024 * 1024),
+            '/page.jpg': (200, 'text/html', 100),
+            '/nohead.png': (200, 'image/png', None),
+            '/error.jpg': (500, 'text/plain', 0),
+        }
+        if self.path not in routes:
+            return self.send_error(404)
+        code, content_type, length = routes[self.path]
+        self.send_response(code)
+        self.send_header('Content-Type', content_type)
+        if length is not None:
+            self.send_header('Content-Length', str(length))
+        self.end_headers()
+        if body and length is None:
+            self.wfile.write(b'x' * 2000)  # no Content-Length: size read from the body
+
+    def log_message(self, *args):
+        pass
+
+
+@override_settings(IMAGE_URL_MAX_BYTES=1024 * 1024, IMAGE_URL_ALLOW_PRIVATE_HOSTS=True)
+class ImageUrlProbeTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), ImageServer)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base = f'http://127.0.0.1:{cls.server.server_port}'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        ImageServer.requests.clear()
+
+    def test_saving_does_not_fetch(self):
+        room = make_room(image_url=f'{self.base}/ok.jpg')
+        self.assertEqual(room.image_url_status, 'pending')
+        self.assertEqual(ImageServer.requests, [])
+
+    def test_worker_records_status(self):
+        names = ['ok.jpg', 'big.jpg', 'page.jpg', 'missing.jpg', 'nohead.png', 'error.jpg']
+        rooms = {name: make_room(image_url=f'{self.base}/{name}') for name in names}
+        self.assertEqual(image_urls.process_pending(), len(names))
+
+        checked = {name: Room.objects.get(pk=room.pk) for name, room in rooms.items()}
+        self.assertEqual(
+            {name: room.image_url_status for name, room in checked.items()},
+            {
+                'ok.jpg': 'valid', 'big.jpg': 'invalid', 'page.jpg': 'invalid',
+                'missing.jpg': 'invalid', 'nohead.png': 'valid', 'error.jpg': 'unreachable',
+            },
+        )
+        self.assertEqual(checked['ok.jpg'].image_url_size, 1000)
+        self.assertEqual(checked['nohead.png'].image_url_size, 2000)
+        self.assertEqual(checked['missing.jpg'].image_url_detail, 'HTTP 404')
+        # Nothing was downloaded where Content-Length answered the question
+        self.assertNotIn(('GET', '/big.jpg'), ImageServer.requests)
+        self.assertEqual(image_urls.process_pending(), 0)
+
+        admin = make_user('admin@example.com', is_staff=True)
+        client = APIClient()
+        client.force_authenticate(admin)
+        response = client.get(f"/api/rooms/{rooms['big.jpg'].pk}/")
+        self.assertEqual(response.data['image_url_status'], 'invalid')
+        self.assertIn('larger than', response.data['image_url_detail'])
+
+    def test_results_cached_by_url(self):
+        first = make_room(image_url=f'{self.base}/ok.jpg')
+        make_room(image_url=f'{self.base}/ok.jpg')
+        image_urls.process_pending()
+        self.assertEqual(ImageServer.requests, [('HEAD', '/ok.jpg')])
+
+        # A known URL takes its cached result on save; a new one goes back to pending
+        late = make_room(image_url=f'{self.base}/ok.jpg')
+        self.assertEqual((late.image_url_status, late.image_url_size), ('valid', 1000))
+        first.image_url = f'{self.base}/page.jpg'
+        first.save()
+        self.assertEqual(first.image_url_status, 'pending')
+        self.assertEqual(image_urls.process_pending(), 1)
+        self.assertEqual(len(ImageServer.requests), 2)
+
+    def test_only_public_http_urls_fetched(self):
+        self.assertEqual(image_urls.probe(f'{self.base}/moved.jpg')['status'], 'valid')
+        refused = image_urls.probe(f'{self.base}/to-ftp.jpg')
+        self.assertEqual(refused['status'], 'invalid')
+        self.assertIn('Not an http(s) URL', refused['detail'])
+        self.assertEqual(image_urls.probe('file:///etc/passwd.jpg')['status'], 'invalid')
+
+        ImageServer.requests.clear()
+        with override_settings(IMAGE_URL_ALLOW_PRIVATE_HOSTS=False):
+            for url in [f'{self.base}/ok.jpg', f'http://localhost:{self.server.server_port}/ok.jpg']:
+                refused = image_urls.probe(url)
+                self.assertEqual(refused['status'], 'invalid')
+                self.assertIn('non-public host', refused['detail'])
+        self.assertEqual(ImageServer.requests, [])
+
+    def test_unreachable_retried_later(self):
+        room = make_room(image_url=f'{self.base}/error.jpg')
+        image_urls.process_pending()
+        self.assertEqual(image_urls.process_pending(), 0)
+
+        Room.objects.filter(pk=room.pk).update(image_url_checked_at=timezone.now() - timedelta(hours=1))
+        cache.clear()
+        self.assertEqual(image_urls.process_pending(), 1)
+        self.assertEqual(ImageServer.requests, [('HEAD', '/error.jpg')] * 2)
+
+
+class FailingEmailBackend(LocmemEmailBackend):
+    def send_messages(self, messages):
+        raise ConnectionError("SMTP down")
+
+
+class EmailOutboxTests(TestCase):
+    def setUp(self):
+        cache.clear()  # throttle buckets
+        self.user = make_user()
+
+    def test_password_reset_only_enqueues(self):
+        response = self.client.post('/api/auth/password/reset/', {'email': self.user.email})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(django_mail.outbox), 0)
+        queued = OutboundEmail.objects.get()
+        self.assertEqual(queued.recipients, [self.user.email])
+        self.assertIn(self.user.username, queued.body)
+
+        self.assertEqual(mail.deliver_due(), (1, 0))
+        self.assertEqual(len(django_mail.outbox), 1)
+        self.assertEqual(django_mail.outbox[0].subject, "Password Reset Request")
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, 'sent')
+        self.assertEqual(mail.deliver_due(), (0, 0))
+
+    def test_booking_approval_notifies(self):
+        admin = make_user('admin@example.com', is_staff=True)
+        booking = Booking.objects.create(
+            user=self.user, room=make_room(), check_in=timezone.now().date(),
+            check_out=timezone.now().date() + timedelta(days=1),
+        )
+        client = APIClient()
+        client.force_authenticate(admin)
+        client.patch(f'/api/admin/bookings/approve/{booking.pk}/', {}, format='json')
+        self.assertEqual(OutboundEmail.objects.get().subject, "Your booking is approved")
+
+    def test_retry_with_backoff(self):
+        queued = mail.enqueue_email("Hi", "Body", [self.user.email])
+        self.assertEqual(mail.deliver_due(connection=FailingEmailBackend()), (0, 1))
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.attempts), ('pending', 1))
+        self.assertGreater(queued.next_attempt_at, timezone.now() + timedelta(seconds=50))
+        # Not due yet
+        self.assertEqual(mail.deliver_due(), (0, 0))
+
+        with self.settings(EMAIL_OUTBOX_MAX_ATTEMPTS=2):
+            OutboundEmail.objects.update(next_attempt_at=timezone.now())
+            mail.deliver_due(connection=FailingEmailBackend())
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.attempts), ('failed', 2))
+
+
+class CachedJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = make_user(phone='5550100')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+
+    def test_cached_path_needs_no_queries(self):
+        with self.assertNumQueries(1):
+            self.client.get('/api/user/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/user/')
+        self.assertEqual(response.data['email'], self.user.email)
+
+    def test_profile_update_invalidates(self):
+        self.client.get('/api/user/')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.put('/api/user/profile/update/', {'phone': '5550199'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get('/api/user/').data['phone'], '5550199')
+        # Saving the cached instance must not clobber fields it didn't change
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('s3cret-pass!'))
+
+    def test_deactivation_invalidates(self):
+        self.client.get('/api/user/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        self.assertEqual(self.client.get('/api/user/').status_code, 401)
+
+    def test_snapshot_holds_no_password(self):
+        self.client.get('/api/user/')
+        version = cache.get(version_key(self.user.pk), 0)
+        snapshot = cache.get(snapshot_key(self.user.pk, version))
+        self.assertIsNotNone(snapshot)
+        self.assertNotIn(self.user.password, repr(snapshot))
+
+        # With revocation on, only the digest simplejwt compares is kept
+        with mock.patch.object(api_settings, 'CHECK_REVOKE_TOKEN', True):
+            cache.clear()
+            token = AccessToken.for_user(self.user)
+            self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+            self.assertEqual(self.client.get('/api/user/').status_code, 200)
+            with self.assertNumQueries(0):
+                self.assertEqual(self.client.get('/api/user/').status_code, 200)
+            snapshot = cache.get(snapshot_key(self.user.pk, cache.get(version_key(self.user.pk), 0)))
+            self.assertEqual(snapshot[1], get_md5_hash_password(self.user.password))
+            self.assertNotIn(self.user.password, repr(snapshot))
+
+
+class EmailBackendTests(TestCase):
+    def setUp(self):
+        self.user = make_user('Guest@Example.com')
+
+    def test_case_insensitive_single_query(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(authenticate(email='guest@example.COM', password='s3cret-pass!'), self.user)
+        with self.assertNumQueries(1):
+            self.assertIsNone(authenticate(email='guest@example.com', password='wrong'))
+        with self.assertNumQueries(1):
+            self.assertIsNone(authenticate(email='nobody@example.com', password='s3cret-pass!'))
+
+    def test_username_login_still_works(self):
+        self.assertEqual(authenticate(username=self.user.username, password='s3cret-pass!'), self.user)
+        response = self.client.post('/api/token/', {'username': self.user.username, 'password': 's3cret-pass!'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_login_rehashes_with_configured_cost(self):
+        self.assertTrue(self.user.password.startswith('pbkdf2_sha256$870000$'))
+        with override_settings(PASSWORD_PBKDF2_ITERATIONS=100000):
+            self.assertEqual(authenticate(email='guest@example.com', password='s3cret-pass!'), self.user)
+            self.user.refresh_from_db()
+            self.assertTrue(self.user.password.startswith('pbkdf2_sha256$100000$'))
+            # Already at the configured cost: verifies without another write
+            with self.assertNumQueries(1):
+                authenticate(email='guest@example.com', password='s3cret-pass!')
+
+
+# Same limits as settings, over a day, so a test can't straddle a refill
+@override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {
+    scope: rate.split('/')[0] + '/day' for scope, rate in settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'].items()
+}})
+class ThrottleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = make_user()
+
+    def test_login_bucket_per_email(self):
+        payload = {'email': 'GUEST@example.com', 'password': 'wrong'}
+        for _ in range(5):
+            self.assertEqual(self.client.post('/api/login/', payload).status_code, 400)
+        with self.assertNumQueries(0):
+            response = self.client.post('/api/login/', {'email': 'guest@example.com', 'password': 's3cret-pass!'})
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+        # Another email from the same IP still has tokens
+        self.assertEqual(self.client.post('/api/login/', {'email': 'other@example.com', 'password': 'x'}).status_code, 400)
+
+        self.assertEqual(throttling.counters()['login_email'], {'allowed': 6, 'rejected': 1})
+        self.assertLess(throttling.usage('login_email', 'guest@example.com')['tokens'], 1)
+        self.assertEqual(int(throttling.usage('login', '127.0.0.1')['tokens']), 30 - 7)
+
+    @override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {'login': '2/min'}})
+    def test_bucket_refills_over_time(self):
+        now = [1000.0]
+
+        def login():
+            with mock.patch.object(throttling.TokenBucketThrottle, 'timer', lambda throttle: now[0]):
+                return self.client.post('/api/login/', {'email': 'x@example.com', 'password': 'x'}).status_code
+
+        self.assertEqual([login(), login(), login()], [400, 400, 429])
+        now[0] += 29  # one token every 30 seconds, not a fresh allowance per window
+        self.assertEqual(login(), 429)
+        now[0] += 2
+        self.assertEqual([login(), login()], [400, 429])
+        now[0] += 600  # never more than a full bucket
+        self.assertEqual([login(), login(), login()], [400, 400, 429])
+
+    @override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {'login': '2/min'}})
+    def test_forwarded_for_does_not_pick_the_bucket(self):
+        # No proxy configured: a client can't get a fresh bucket by sending its own header
+        statuses = [
+            self.client.post(
+                '/api/login/', {'email': 'x@example.com', 'password': 'x'}, HTTP_X_FORWARDED_FOR=f'10.0.0.{i}',
+            ).status_code
+            for i in range(3)
+        ]
+        self.assertEqual(statuses, [400, 400, 429])
+        self.assertLess(throttling.usage('login', '127.0.0.1')['tokens'], 1)
+
+    def test_password_reset_bucket(self):
+        for _ in range(3):
+            self.assertEqual(self.client.post('/api/auth/password/reset/', {'email': self.user.email}).status_code, 200)
+        self.assertEqual(self.client.post('/api/auth/password/reset/', {'email': self.user.email}).status_code, 429)
+        self.assertEqual(OutboundEmail.objects.count(), 3)
+
+
+@override_settings(DATABASE_REPLICAS=['replica_a', 'replica_b'], DATABASE_REPLICA_MAX_LAG=5)
+class ReplicaRoutingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def caught_up(self, **ages):
+        cache.set_many({replicas.caught_up_key(alias): time.time() - age for alias, age in ages.items()})
+
+    def test_fresh_replica_chosen_lagging_skipped(self):
+        self.assertIsNone(replicas.choose_replica())  # no status yet: primary
+        self.caught_up(replica_a=1, replica_b=30)
+        self.assertEqual(replicas.choose_replica(), 'replica_a')
+        self.caught_up(replica_a=10)
+        self.assertIsNone(replicas.choose_replica())
+        self.assertIsNone(replicas.choose_replica(not_before=time.time()))
+
+    def test_own_writes_read_from_primary(self):
+        user = make_user()
+        room = make_room()
+        self.caught_up(replica_a=1, replica_b=1)
+        today = timezone.now().date()
+        with self.captureOnCommitCallbacks(execute=True):
+            Booking.objects.create(user=user, room=room, check_in=today, check_out=today + timedelta(days=1))
+        self.assertIsNone(replicas.choose_replica(user.pk))
+        self.assertIsNotNone(replicas.choose_replica(user.pk + 1))
+        # Once a replica has caught up past the write it can serve the owner again
+        self.caught_up(replica_a=-1)
+        self.assertEqual(replicas.choose_replica(user.pk), 'replica_a')
+
+    def test_router_sends_writes_to_primary(self):
+        router = ReplicaRouter()
+        token = replicas.read_alias.set('replica_a')
+        try:
+            self.assertEqual(router.db_for_read(Room), 'replica_a')
+            self.assertEqual(router.db_for_write(Room, instance=Room(pk=1)), 'default')
+        finally:
+            replicas.read_alias.reset(token)
+        self.assertIsNone(router.db_for_read(Room))
+
+
+@skipUnless(
+    connection.vendor == 'sqlite' and 'replica1' in settings.DATABASES,
+    "set SQLITE_REPLICA_PATHS to run against a replica file",
+)
+class SqliteReplicaTests(TransactionTestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        cache.clear()
+        self.user = make_user()
+        self.other = make_user('other@example.com')
+        self.room = make_room()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.sync()
+
+    def sync(self):
+        replicas.beat()
+        replicas.copy_sqlite('replica1')
+        replicas.measure()
+
+    def book(self, user, offset):
+        check_in = timezone.now().date() + timedelta(days=offset)
+        return Booking(user=user, room=self.room, check_in=check_in, check_out=check_in + timedelta(days=1))
+
+    def test_reads_follow_replica_until_stale(self):
+        client = APIClient()
+        client.force_authenticate(self.other)
+        # Inserted without signals, so nothing pins the user: only the primary has it
+        Booking.objects.bulk_create([self.book(self.other, 10)])
+        self.assertEqual(client.get('/api/bookings/my-bookings/').data, [])
+        self.sync()
+        self.assertEqual(len(client.get('/api/bookings/my-bookings/').data), 1)
+
+        Booking.objects.bulk_create([self.book(self.other, 20)])
+        with override_settings(DATABASE_REPLICA_MAX_LAG=0):
+            # Replica too far behind: back to the primary
+            self.assertEqual(len(client.get('/api/bookings/my-bookings/').data), 2)
+
+    def test_own_booking_visible_immediately(self):
+        response = self.client.post('/api/bookings/create/', {
+            'room': self.room.pk,
+            'check_in': str(timezone.now().date() + timedelta(days=5)),
+            'check_out': str(timezone.now().date() + timedelta(days=6)),
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([booking['id'] for booking in self.client.get('/api/bookings/my-bookings/').data], [response.data['id']])
+        self.assertFalse(Booking.objects.using('replica1').exists())
+
+
+@skipUnless(connection.vendor == 'sqlite', "SQLite profile only")
+class SqliteConnectionTests(TestCase):
+    def test_pragmas_applied_to_new_connections(self):
+        with connection.cursor() as cursor:
+            values = [
+                cursor.execute(f'PRAGMA {pragma}').fetchone()[0]
+                for pragma in ('journal_mode', 'synchronous', 'busy_timeout')
+            ]
+        self.assertEqual(values, ['wal', 1, 20000])  # synchronous: 1 = NORMAL
+
+    def test_connections_leave_the_journal_mode_alone(self):
+        # Opening a connection (any manage.py run) must not rewrite a database file
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'tracked.sqlite3')
+            sqlite3.connect(path).execute('CREATE TABLE t (id INTEGER)').connection.close()
+            other = SqliteDatabaseWrapper({**connection.settings_dict, 'NAME': path}, alias='tracked')
+            try:
+                with other.cursor() as cursor:
+                    self.assertEqual(cursor.execute('PRAGMA journal_mode').fetchone()[0], 'delete')
+                    self.assertEqual(cursor.execute('PRAGMA synchronous').fetchone()[0], 1)
+            finally:
+                other.close()
+
+    def test_transactions_take_the_write_lock_up_front(self):
+        self.assertEqual(connection.settings_dict['OPTIONS']['transaction_mode'], 'IMMEDIATE')
+
+
+class ConcurrentBookingTests(TransactionTestCase):
+    requests_per_range = 50
+
+    def setUp(self):
+        self.room = make_room()
+        self.users = [make_user(f'guest{i}@example.com') for i in range(4)]
+        start = timezone.now().date() + timedelta(days=30)
+        # Four back-to-back stays: each checks in the day the previous one checks out
+        self.ranges = [
+            (start + timedelta(days=3 * i), start + timedelta(days=3 * i + 3)) for i in range(4)
+        ]
+
+    def test_exactly_one_booking_wins_per_range(self):
+        jobs = [
+            (self.users[i % len(self.users)], check_in, check_out)
+            for check_in, check_out in self.ranges
+            for i in range(self.requests_per_range)
+        ]
+        barrier = threading.Barrier(len(jobs))
+        results = []
+
+        def book(user, check_in, check_out):
+            client = APIClient()
+            client.force_authenticate(user)
+            try:
+                barrier.wait()
+                response = client.post('/api/bookings/create/', {
+                    'room': self.room.pk,
+                    'check_in': check_in.isoformat(),
+                    'check_out': check_out.isoformat(),
+                }, format='json')
+                results.append(response.status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=book, args=job) for job in jobs]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(results), len(jobs))
+        self.assertEqual(results.count(201), len(self.ranges))
+        self.assertEqual(results.count(400), len(jobs) - len(self.ranges))
+        booked = sorted(Booking.objects.filter(room=self.room).values_list('check_in', 'check_out'))
+        self.assertEqual(booked, self.ranges)
@@ -0,0 +1,180 @@
+"""
+Token-bucket throttles for the unauthenticated auth endpoints.
+
+Each key (a client IP, or an email address from the request body) owns a
+bucket of `num_requests` tokens that refills continuously at
+num_requests / duration tokens per second, up to the full bucket. There is
+no window boundary at which a client gets a fresh allowance: after using the
+whole bucket it waits for tokens to trickle back.
+
+A bucket is two cache entries: the time refilling is counted from and the
+tokens drawn since then. The bucket holds
+num_requests + elapsed * rate - drawn tokens. Draws use cache.incr (and a
+rejected draw cache.decr), which are atomic on the shared cache backends, so
+any number of workers can share a bucket without coordinating and a check
+never touches the database. When a bucket would hold more than num_requests,
+its start time is moved forward to drop the excess. Both entries expire once
+an idle bucket would be full again, and a missing bucket is a full one.
+
+Views opt in with a `throttle_scope`; the rates for '<scope>' (per IP) and
+'<scope>_email' (per email) come from REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'];
+a scope without a rate is not throttled.
+"""
+import hashlib
+
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+from .cache import count
+
+SCOPES = ['login', 'login_email', 'password_reset', 'password_reset_email', 'register', 'register_email']
+
+
+def counter_key(scope, outcome):
+    return f'throttle:{scope}:{outcome}'
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    scope_suffix = ''
+
+    def __init__(self):
+        # The scope comes from the view, so the rate is looked up in allow_request()
+        pass
+
+    def get_rate(self):
+        # Read at request time (not at import, as SimpleRateThrottle does) so
+        # settings overrides apply
+        return api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+
+    def get_ident_key(self, request):
+        # DRF's ident: REMOTE_ADDR, or X-Forwarded-For behind NUM_PROXIES (settings) proxies
+        return self.get_ident(request)
+
+    def get_cache_key(self, request, view):
+        ident = self.get_ident_key(request)
+        if ident is None:
+            return None
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+    def allow_request(self, request, view):
+        base_scope = getattr(view, 'throttle_scope', None)
+        if not base_scope:
+            return True
+        self.scope = base_scope + self.scope_suffix
+        self.rate = self.get_rate()
+        if self.rate is None:
+            return True
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        allowed, self.tokens = draw(self.key, self.num_requests, self.duration, self.timer())
+        count(counter_key(self.scope, 'allowed' if allowed else 'rejected'))
+        return allowed
+
+    def wait(self):
+        # Time until the bucket holds a whole token again
+        return max(0, (1 - self.tokens) * self.duration / self.num_requests)
+
+
+class IPTokenBucketThrottle(TokenBucketThrottle):
+    """One bucket per client IP (the default ident)."""
+
+
+class EmailTokenBucketThrottle(TokenBucketThrottle):
+    scope_suffix = '_email'
+
+    def get_ident_key(self, request):
+        email = request.data.get('email') if hasattr(request.data, 'get') else None
+        if not isinstance(email, str) or not email.strip():
+            return None
+        return email_ident(email)
+
+
+def email_ident(email):
+    # Same bucket for any casing (logins are case-insensitive); hashed so the
+    # key is short and safe for memcached whatever the client sent
+    return hashlib.md5(email.strip().lower().encode()).hexdigest()
+
+
+def bucket_keys(key):
+    return f'{key}:since', f'{key}:drawn'
+
+
+def bucket(key, num_requests, duration, now):
+    """Tokens currently in the bucket at key (num_requests when it doesn't exist)."""
+    since_key, drawn_key = bucket_keys(key)
+    values = SimpleRateThrottle.cache.get_many([since_key, drawn_key])
+    if since_key not in values:
+        return num_requests
+    refilled = (now - values[since_key]) * num_requests / duration
+    return min(num_requests, num_requests + refilled - values.get(drawn_key, 0))
+
+
+def draw(key, num_requests, duration, now):
+    """Take a token from the bucket at key; returns (whether one was available, tokens left)."""
+    cache = SimpleRateThrottle.cache
+    since_key, drawn_key = bucket_keys(key)
+    if cache.add(since_key, now, timeout=duration):
+        cache.set(drawn_key, 0, timeout=duration)  # new bucket: full
+    since = cache.get(since_key, now)
+    cache.add(drawn_key, 0, timeout=duration)
+    try:
+        drawn = cache.incr(drawn_key)
+    except ValueError:
+        # Evicted between add and incr: the bucket starts over full
+        cache.set_many({since_key: now, drawn_key: 1}, timeout=duration)
+        return True, num_requests - 1
+
+    rate = num_requests / duration
+    refilled = (now - since) * rate
+    if refilled > drawn - 1:
+        # The bucket was full before this draw: drop the surplus refill
+        cache.set(since_key, now - (drawn - 1) / rate, timeout=duration)
+        refilled = drawn - 1
+    left = num_requests + refilled - drawn
+    if left < 0:
+        try:
+            cache.decr(drawn_key)  # a rejected request takes nothing
+        except ValueError:
+            pass
+        return False, left + 1
+    # Idle for `duration` seconds, any bucket is full again
+    cache.touch(since_key, duration)
+    cache.touch(drawn_key, duration)
+    return True, left
+
+
+def counters():
+    """Allowed/rejected totals per scope."""
+    keys = {counter_key(scope, outcome): (scope, outcome) for scope in SCOPES for outcome in ('allowed', 'rejected')}
+    values = SimpleRateThrottle.cache.get_many(list(keys))
+    totals = {scope: {'allowed': 0, 'rejected': 0} for scope in SCOPES}
+    for key, (scope, outcome) in keys.items():
+        totals[scope][outcome] = values.get(key, 0)
+    return totals
+
+
+def usage(scope, ident):
+    """
+    State of one bucket: tokens left, the bucket size, and seconds until the
+    next token. ident is an IP address, or an email address for '*_email' scopes.
+    """
+    throttle = IPTokenBucketThrottle()
+    throttle.scope = scope
+    rate = throttle.get_rate()
+    if rate is None:
+        return None
+    num_requests, duration = throttle.parse_rate(rate)
+    if scope.endswith('_email'):
+        ident = email_ident(ident)
+    key = throttle.cache_format % {'scope': scope, 'ident': ident}
+    tokens = bucket(key, num_requests, duration, throttle.timer())
+    return {
+        'scope': scope,
+        'tokens': round(tokens, 3),
+        'limit': num_requests,
+        'refill_in': round((1 - tokens % 1) * duration / num_requests, 3) if tokens < num_requests else 0,
+    }
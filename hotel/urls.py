@@ -1,26 +1,37 @@
 from django.urls import path
 from .views import (
     RoomList,
+    RoomSearchView,
     BookingCreateView,
     UserBookingListView,
     UserRegistrationView,
     UserLoginView,
+    TokenObtainPairView,
     BookingCreateView,
     UserBookingListView,
     CancelBookingView,
+    BatchBookingCreateView,
     AdminBookingListView,
+    AdminBookingExportView,
     ApproveBookingView,
     RejectBookingView,
+    BulkBookingStatusView,
     UserProfileView,
     AdminDashboardView,
+    AdminCacheStatsView,
+    AdminThrottleStatsView,
     RoomDetailView,
+    RoomQuoteView,
+    OccupancyCalendarView,
+    RateRuleListCreateView,
+    RateRuleDetailView,
     UpdateRoomView,
     DeleteRoomView,
     PasswordResetView, 
     PasswordResetConfirmView,
     UserProfileUpdateView
 )
-from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+from rest_framework_simplejwt.views import TokenRefreshView
 
 
 
@@ -37,22 +48,32 @@ urlpatterns = [
 
     # User Booking endpoints
     path('bookings/create/', BookingCreateView.as_view(), name='booking-create'),
+    path('bookings/batch/', BatchBookingCreateView.as_view(), name='booking-batch-create'),
     path('bookings/my-bookings/', UserBookingListView.as_view(), name='user-bookings'),
     path('bookings/cancel/<int:pk>/', CancelBookingView.as_view(), name='cancel-booking'),
     path('user/profile/update/', UserProfileUpdateView.as_view(), name='profile-update'),
 
     # Admin Booking endpoints
     path('admin/bookings/', AdminBookingListView.as_view(), name='admin-bookings'),
+    path('admin/bookings/export/', AdminBookingExportView.as_view(), name='admin-bookings-export'),
     path('admin/bookings/approve/<int:pk>/', ApproveBookingView.as_view(), name='approve-booking'),
     path('admin/bookings/reject/<int:pk>/', RejectBookingView.as_view(), name='reject-booking'),
+    path('admin/bookings/bulk-status/', BulkBookingStatusView.as_view(), name='admin-bookings-bulk-status'),
     # Admin Dashboard
     path('admin/dashboard/', AdminDashboardView.as_view(), name='admin-dashboard'),
+    path('admin/rate-rules/', RateRuleListCreateView.as_view(), name='admin-rate-rules'),
+    path('admin/rate-rules/<int:pk>/', RateRuleDetailView.as_view(), name='admin-rate-rule-detail'),
+    path('admin/cache/stats/', AdminCacheStatsView.as_view(), name='admin-cache-stats'),
+    path('admin/throttle/stats/', AdminThrottleStatsView.as_view(), name='admin-throttle-stats'),
 
     # Existing Endpoints
     path('user/', UserProfileView.as_view(), name='user-profile'),
     path('users/', UserBookingListView.as_view(), name='user-list'),
     path('rooms/', RoomList.as_view(), name='room-list'),
+    path('rooms/search/', RoomSearchView.as_view(), name='room-search'),
     path('rooms/<int:pk>/', RoomDetailView.as_view(), name='room-detail'),
+    path('rooms/<int:pk>/quote/', RoomQuoteView.as_view(), name='room-quote'),
+    path('rooms/occupancy/', OccupancyCalendarView.as_view(), name='room-occupancy'),
     path('rooms/update/<int:pk>/', UpdateRoomView.as_view(), name='update-room'),
     path('rooms/delete/<int:pk>/', DeleteRoomView.as_view(), name='delete-room'),
     path('bookings/', BookingCreateView.as_view(), name='booking-create'),
@@ -0,0 +1,15 @@
+"""
+Routes answered by hotel/async_views.py when serving over ASGI; listed ahead
+of hotel/urls.py in hotel_backend/urls_asgi.py.
+"""
+from django.urls import path
+
+from . import async_views
+
+urlpatterns = [
+    path('bookings/my-bookings/', async_views.UserBookingListView.as_view()),
+    path('user/', async_views.UserProfileView.as_view()),
+    path('rooms/', async_views.RoomListView.as_view()),
+    path('rooms/search/', async_views.RoomSearchView.as_view()),
+    path('rooms/<int:pk>/', async_views.RoomDetailView.as_view()),
+]
@@ -1,90 +1,177 @@
-from django.shortcuts import render
-from rest_framework import generics, permissions, status, serializers
+from django.shortcuts import get_object_or_404
+from rest_framework import generics, permissions, status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt import views as jwt_views
 from django.contrib.auth import authenticate, get_user_model
-from .models import Room, Booking, CustomUser, Service
+from .models import Room, Booking, CustomUser, Service, RateRule
 from .serializers import (
     RoomSerializer, 
     BookingSerializer, 
+    BatchBookingSerializer,
     UserSerializer,
     UserRegistrationSerializer,
     UserLoginSerializer,
     BookingStatusSerializer, 
     PasswordResetSerializer, 
-    PasswordResetConfirmSerializer
+    PasswordResetConfirmSerializer,
+    RoomSearchSerializer,
+    AdminBookingFilterSerializer,
+    BulkBookingStatusSerializer,
+    QuoteSerializer,
+    OccupancyCalendarSerializer,
+    RateRuleSerializer,
+    DashboardWindowSerializer
 )
+from . import stats
+from . import pricing
+from . import occupancy
+from . import cache as room_cache
+from . import listing
+from .replicas import ReplicaReadMixin
+from .mail import enqueue_template_email
+from .bookings import notify_booking_status, bulk_update_status
+from .pagination import RoomSearchPagination, AdminBookingPagination
+from .throttling import IPTokenBucketThrottle, EmailTokenBucketThrottle
+from . import throttling
 from rest_framework.permissions import IsAuthenticated
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from .authentication import CachedJWTAuthentication
 from rest_framework.generics import RetrieveAPIView
-from django_rest_passwordreset.models import ResetPasswordToken
 from django.contrib.auth.tokens import PasswordResetTokenGenerator
-from django.utils.encoding import force_bytes, force_str
-from django.core.mail import send_mail
-from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
-from django.template.loader import render_to_string
 import os
-from django.conf import settings
-from django.template.exceptions import TemplateDoesNotExist
+import csv
+import json
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Prefetch
+from django.http import StreamingHttpResponse
 
 # -------------------------------------------------
 # Existing Views (Rooms, Bookings, Users)
 # -------------------------------------------------
-class RoomList(generics.ListCreateAPIView):
-    queryset = Room.objects.all()
+class RoomList(ReplicaReadMixin, generics.ListCreateAPIView):
     serializer_class = RoomSerializer
     permission_classes = [permissions.IsAdminUser]  # Only admins can create rooms
 
-class RoomDetailView(RetrieveAPIView):
-    queryset = Room.objects.all()
+    def get_queryset(self):
+        # Per request: availability is for today, not for the day the class was loaded
+        return Room.objects.with_availability()
+
+    def replica_not_before(self):
+        # A payload cached under this version must include the change that made it
+        return room_cache.current_version(room_cache.CATALOG_VERSION_KEY) / 1000
+
+    def list(self, request, *args, **kwargs):
+        # Cached until a room or an availability-affecting booking changes.
+        # Rows are built from .values() (hotel/listing.py), same shape as RoomSerializer.
+        fields, _ = listing.parse_fields(request, listing.ROOM_FIELDS)
+        return room_cache.cached_room_response(
+            request, room_cache.CATALOG_VERSION_KEY,
+            lambda: listing.rooms(self.filter_queryset(self.get_queryset()), request, fields),
+        )
+
+class RoomDetailView(ReplicaReadMixin, RetrieveAPIView):
     serializer_class = RoomSerializer  # Use your actual serializer
     permission_classes = [permissions.IsAdminUser]
 
+    def get_queryset(self):
+        return Room.objects.with_availability()
+
+    def replica_not_before(self):
+        return room_cache.current_version(room_cache.room_version_key(self.kwargs['pk'])) / 1000
+
+    def retrieve(self, request, *args, **kwargs):
+        return room_cache.cached_room_response(
+            request, room_cache.room_version_key(kwargs['pk']),
+            lambda: self.get_serializer(self.get_object()).data,
+        )
+
+class RoomSearchView(generics.ListAPIView):
+    # Public search: rooms free for the whole stay, matching guests/type/price
+    serializer_class = RoomSerializer
+    pagination_class = RoomSearchPagination
+    permission_classes = [permissions.AllowAny]
+
+    def get_queryset(self):
+        params = RoomSearchSerializer(data=self.request.query_params)
+        params.is_valid(raise_exception=True)
+        # One query: the NOT EXISTS overlap check runs on the booking index
+        return Room.objects.search(**params.validated_data)
+
+    def list(self, request, *args, **kwargs):
+        # Today's availability is annotated instead of checked per room; the
+        # cursor reads its position from the ordering columns of the rows
+        fields, _ = listing.parse_fields(request, listing.ROOM_FIELDS)
+        rows = self.paginate_queryset(listing.room_values(
+            self.get_queryset().with_availability(), fields, self.pagination_class.ordering,
+        ))
+        return self.get_paginated_response(listing.room_payload(rows, request, fields))
+
+class RoomQuoteView(APIView):
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request, pk):
+        # Priced from the room's precomputed rate calendar; see hotel/pricing.py
+        room = get_object_or_404(Room, pk=pk)
+        params = QuoteSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        data = params.validated_data
+        return Response(
+            pricing.quote(room, data['check_in'], data['check_out'], data['services']),
+            status=status.HTTP_200_OK,
+        )
+
+class OccupancyCalendarView(APIView):
+    # Public like room search: only which days are taken, not by whom
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        # The serializer resolves the default window before limiting it to a year
+        params = OccupancyCalendarSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        data = params.validated_data
+        # One query per window (see hotel/occupancy.py), cached until availability changes
+        return room_cache.cached_room_response(
+            request, room_cache.CATALOG_VERSION_KEY,
+            lambda: occupancy.calendar(data['start'], data['end'], data.get('rooms'), data['encoding']),
+        )
+
 class BookingCreateView(generics.CreateAPIView):
     serializer_class = BookingSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def perform_create(self, serializer):
-        # Get room ID from request data
-        room_id = self.request.data.get('room')
-        try:
-            room = Room.objects.get(id=room_id)
-        except Room.DoesNotExist:
-            raise serializers.ValidationError("Invalid room ID")
+        # Room, services and price are all resolved by BookingSerializer
+        serializer.save(user=self.request.user)
 
-        # Get service IDs from request data
-        services_ids = self.request.data.get('services', [])
-        print("Received Service IDs:", services_ids)
-        
-        # Save the booking with user and room
-        booking = serializer.save(
-            user=self.request.user,
-            room=room
-        )
-        
-        # Add services to booking
-        if services_ids:
-            try:
-                services = Service.objects.filter(id__in=services_ids)
-                print("Found Services:", list(services.values_list('id', flat=True)))
-                if len(services) != len(services_ids):
-                    print("Invalid Service IDs:", services_ids)
-                    raise serializers.ValidationError("One or more service IDs are invalid")
-                booking.services.set(services)
-            except Exception as e:
-                raise serializers.ValidationError(f"Error adding services: {str(e)}")
-
-class UserBookingListView(generics.ListAPIView):
+class BatchBookingCreateView(generics.CreateAPIView):
+    serializer_class = BatchBookingSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def perform_create(self, serializer):
+        # Every item is checked and inserted in one transaction; see BatchBookingSerializer
+        serializer.save(user=self.request.user)
+
+class UserBookingListView(ReplicaReadMixin, generics.ListAPIView):
     serializer_class = BookingSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
         # Return bookings for the logged-in user
         return Booking.objects.filter(user=self.request.user)\
-                             .select_related('room')\
                              .order_by('-created_at')
 
+    def list(self, request, *args, **kwargs):
+        # BookingSerializer's output from .values() rows; see hotel/listing.py.
+        # A client holding the current list gets a 304 from one aggregate query.
+        fields, nested = listing.parse_fields(
+            request, listing.BOOKING_FIELDS, {'room_detail': listing.ROOM_FIELDS},
+        )
+        bookings = self.get_queryset()
+        return room_cache.booking_list_response(request, bookings, lambda: Response(listing.bookings(
+            bookings, request, fields, nested.get('room_detail', listing.ROOM_FIELDS),
+        )))
+
 class CancelBookingView(generics.UpdateAPIView):
     queryset = Booking.objects.all()
     serializer_class = BookingSerializer
@@ -111,20 +198,46 @@ class CancelBookingView(generics.UpdateAPIView):
 # Existing Views (Admin)
 # -------------------------------------------------
 
-class AdminDashboardView(APIView):
+class AdminDashboardView(ReplicaReadMixin, APIView):
     permission_classes = [permissions.IsAdminUser]
 
     def get(self, request):
-        total_rooms = Room.objects.count()
-        total_bookings = Booking.objects.count()
-        total_customers = CustomUser.objects.count()
+        # Counters are maintained incrementally (see hotel/stats.py), so this is
+        # a few small reads no matter how many bookings exist
+        params = DashboardWindowSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        return Response(
+            stats.dashboard(params.validated_data['start'], params.validated_data['end']), status=status.HTTP_200_OK,
+        )
+    
+class AdminCacheStatsView(APIView):
+    permission_classes = [permissions.IsAdminUser]
 
-        return Response({
-            'total_rooms': total_rooms,
-            'total_bookings': total_bookings,
-            'total_customers': total_customers,
-        }, status=status.HTTP_200_OK)
+    def get(self, request):
+        return Response({'room_cache': room_cache.counters()}, status=status.HTTP_200_OK)
+
+class AdminThrottleStatsView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        # Totals per scope; ?scope=login&key=<ip or email> adds that bucket's state
+        payload = {'totals': throttling.counters()}
+        scope, key = request.query_params.get('scope'), request.query_params.get('key')
+        if scope and key:
+            payload['bucket'] = throttling.usage(scope, key)
+        return Response(payload, status=status.HTTP_200_OK)
     
+class RateRuleListCreateView(generics.ListCreateAPIView):
+    # Saving or deleting a rule reprices the affected calendars after commit (hotel/signals.py)
+    queryset = RateRule.objects.order_by('priority', 'pk')
+    serializer_class = RateRuleSerializer
+    permission_classes = [permissions.IsAdminUser]
+
+class RateRuleDetailView(generics.RetrieveUpdateDestroyAPIView):
+    queryset = RateRule.objects.all()
+    serializer_class = RateRuleSerializer
+    permission_classes = [permissions.IsAdminUser]
+
 class UpdateRoomView(generics.UpdateAPIView):
     queryset = Room.objects.all()
     serializer_class = RoomSerializer
@@ -146,11 +259,94 @@ class ManageCustomersView(generics.ListAPIView):
     serializer_class = UserSerializer
     permission_classes = [permissions.IsAdminUser]
     
-class AdminBookingListView(generics.ListAPIView):
-    queryset = Booking.objects.all()
+class AdminBookingListView(ReplicaReadMixin, generics.ListAPIView):
     serializer_class = BookingSerializer
+    pagination_class = AdminBookingPagination
+    permission_classes = [permissions.IsAdminUser]
+
+    def get_queryset(self):
+        params = AdminBookingFilterSerializer(data=self.request.query_params)
+        params.is_valid(raise_exception=True)
+        return Booking.objects.filter_admin(**params.validated_data)
+
+    def list(self, request, *args, **kwargs):
+        fields, nested = listing.parse_fields(
+            request, listing.BOOKING_FIELDS, {'room_detail': listing.ROOM_FIELDS},
+        )
+        bookings = self.get_queryset()
+
+        def build():
+            # The cursor reads its position from the ordering columns of the rows
+            ordering = [field.lstrip('-') for field in self.pagination_class.ordering]
+            rows = self.paginate_queryset(listing.booking_values(bookings, fields, ordering))
+            return self.get_paginated_response(listing.booking_payload(
+                rows, request, fields, nested.get('room_detail', listing.ROOM_FIELDS),
+            ))
+
+        # Validated against the whole filtered list, whichever page this is
+        return room_cache.booking_list_response(request, bookings, build)
+
+class Echo:
+    # File-like object whose write() returns the line, for streaming csv.writer output
+    def write(self, value):
+        return value
+
+class AdminBookingExportView(APIView):
     permission_classes = [permissions.IsAdminUser]
 
+    EXPORT_FIELDS = [
+        'id', 'created_at', 'status', 'check_in', 'check_out', 'total_price',
+        'room_id', 'room_type', 'room_price', 'user_id', 'user_email', 'services',
+    ]
+    CHUNK_SIZE = 2000
+
+    def get(self, request):
+        # ?fmt=csv (default) or ?fmt=ndjson; "format" is reserved by DRF content negotiation
+        fmt = request.query_params.get('fmt', 'csv')
+        if fmt not in ('csv', 'ndjson'):
+            return Response({"detail": "fmt must be csv or ndjson."}, status=status.HTTP_400_BAD_REQUEST)
+
+        params = AdminBookingFilterSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        rows = self.export_rows(params.validated_data)
+
+        if fmt == 'csv':
+            writer = csv.writer(Echo())
+            content = (writer.writerow(row) for row in self.with_header(rows))
+            content_type = 'text/csv'
+        else:
+            content = (
+                json.dumps(dict(zip(self.EXPORT_FIELDS, row)), cls=DjangoJSONEncoder) + '\n'
+                for row in rows
+            )
+            content_type = 'application/x-ndjson'
+
+        response = StreamingHttpResponse(content, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="bookings.{fmt}"'
+        return response
+
+    def with_header(self, rows):
+        # The header goes out before the first query runs
+        yield self.EXPORT_FIELDS
+        yield from rows
+
+    def export_rows(self, filters):
+        bookings = Booking.objects.select_related('room', 'user').only(
+            'id', 'created_at', 'status', 'check_in', 'check_out', 'total_price',
+            'room__id', 'room__type', 'room__price', 'user__id', 'user__email',
+        ).prefetch_related(
+            Prefetch('services', queryset=Service.objects.only('id', 'name'))
+        ).filter_admin(**filters).order_by('id')
+
+        # iterator() keeps at most one chunk (and its prefetched services) in memory
+        for booking in bookings.iterator(chunk_size=self.CHUNK_SIZE):
+            yield [
+                booking.id, booking.created_at, booking.status, booking.check_in, booking.check_out,
+                booking.total_price, booking.room.id, booking.room.type, booking.room.price,
+                booking.user.id, booking.user.email,
+                '; '.join(service.name for service in booking.services.all()),
+            ]
+
 class ApproveBookingView(generics.UpdateAPIView):
     queryset = Booking.objects.all()
     serializer_class = BookingStatusSerializer  # Add this line
@@ -158,7 +354,22 @@ class ApproveBookingView(generics.UpdateAPIView):
     http_method_names = ['patch']
 
     def perform_update(self, serializer):
-        serializer.save(status='approved')
+        booking = serializer.save(status='approved')
+        notify_booking_status(booking)
+
+class BulkBookingStatusView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    def post(self, request):
+        # One UPDATE for the whole list; see hotel/bookings.py
+        serializer = BulkBookingStatusSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = bulk_update_status(**serializer.validated_data)
+        return Response({
+            'status': serializer.validated_data['status'],
+            'updated': sum(1 for result in results if result['result'] == 'updated'),
+            'results': results,
+        }, status=status.HTTP_200_OK)
 
 class RejectBookingView(generics.UpdateAPIView):
     queryset = Booking.objects.all()
@@ -167,12 +378,16 @@ class RejectBookingView(generics.UpdateAPIView):
     http_method_names = ['patch']
 
     def perform_update(self, serializer):
-        serializer.save(status='rejected')
+        booking = serializer.save(status='rejected')
+        notify_booking_status(booking)
 
 # -------------------------------------------------
 # Authentication Views (Add these)
 # -------------------------------------------------
 class UserRegistrationView(APIView):
+    throttle_classes = [IPTokenBucketThrottle, EmailTokenBucketThrottle]
+    throttle_scope = 'register'
+
     def post(self, request):
         serializer = UserRegistrationSerializer(data=request.data)
         if serializer.is_valid():
@@ -185,6 +400,9 @@ class UserRegistrationView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 class UserLoginView(APIView):
+    throttle_classes = [IPTokenBucketThrottle, EmailTokenBucketThrottle]
+    throttle_scope = 'login'
+
     def post(self, request):
         # Pass request context to serializer
         serializer = UserLoginSerializer(data=request.data, context={'request': request})
@@ -204,9 +422,15 @@ class UserLoginView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
 
+class TokenObtainPairView(jwt_views.TokenObtainPairView):
+    # Username logins share the per-IP login bucket with UserLoginView
+    throttle_classes = [IPTokenBucketThrottle]
+    throttle_scope = 'login'
+
+
 class UserProfileView(APIView):
     permission_classes = [IsAuthenticated]
-    authentication_classes = [JWTAuthentication]  # Make sure you import this
+    authentication_classes = [CachedJWTAuthentication]
 
     def get(self, request):
         serializer = UserSerializer(request.user)
@@ -214,7 +438,7 @@ class UserProfileView(APIView):
     
 class UserProfileUpdateView(APIView):
     permission_classes = [IsAuthenticated]
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
 
     def put(self, request):
         user = request.user
@@ -234,6 +458,9 @@ User = get_user_model()
 token_generator = PasswordResetTokenGenerator()
 
 class PasswordResetView(APIView):
+    throttle_classes = [IPTokenBucketThrottle, EmailTokenBucketThrottle]
+    throttle_scope = 'password_reset'
+
     def post(self, request):
         serializer = PasswordResetSerializer(data=request.data)
         if serializer.is_valid():
@@ -248,47 +475,13 @@ class PasswordResetView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     def send_reset_email(self, user):
-        try:
-            # Generate reset token only (no uid needed)
-            token = token_generator.make_token(user)
-
-            # Prepare simplified email context
-            context = {
-                'user': user,
-                'token': token,
-            }
-
-            # Initialize messages with fallback values
-            html_message = None
-            plain_message = None
-
-            # Render text template first
-            try:
-                plain_message = render_to_string('registration/password_reset_email.txt', context)
-                print("Text template rendered successfully")
-            except Exception as e:
-                print(f"Error rendering text template: {e}")
-                raise
-
-            # Attempt HTML template only if needed
-            try:
-                html_message = render_to_string('registration/password_reset_email.html', context)
-                print("HTML template rendered successfully")
-            except Exception as e:
-                print(f"Error rendering HTML template: {e}")
-
-            # Send email with fallback to text-only
-            send_mail(
-                "Password Reset Request",
-                plain_message,
-                None,
-                [user.email],
-                html_message=html_message,  # Safe to pass None
-            )
-
-        except Exception as e:
-            print(f"Error sending email: {e}")
-            return Response({"detail": "Failed to send reset email"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        # Queued; delivered by `manage.py send_queued_email`
+        enqueue_template_email(
+            "Password Reset Request",
+            'registration/password_reset_email',
+            {'user': user, 'token': token_generator.make_token(user)},
+            [user.email],
+        )
 
 class PasswordResetConfirmView(APIView):
     def post(self, request):
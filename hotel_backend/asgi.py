@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'hotel_backend.settings')
+# Async versions of the read endpoints (hotel/async_views.py)
+os.environ.setdefault('DJANGO_ROOT_URLCONF', 'hotel_backend.urls_asgi')
 
 application = get_asgi_application()
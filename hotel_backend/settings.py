@@ -58,6 +58,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',  # Add this first
+    'hotel.middleware.CompressionMiddleware',  # brotli/gzip; compresses what the others return
     'django.middleware.common.CommonMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -68,6 +69,13 @@ MIDDLEWARE = [
     'whitenoise.middleware.WhiteNoiseMiddleware',
 ]
 
+# Responses smaller than this many bytes are sent uncompressed (hotel/middleware.py)
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+# 0-11; low levels compress dynamic JSON nearly as well for a fraction of the CPU
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+# Content types that are already compressed
+COMPRESSION_SKIP_TYPES = ['image/', 'video/', 'audio/', 'application/zip', 'application/gzip']
+
 CORS_ALLOW_METHODS = [
     'DELETE',
     'GET',
@@ -103,10 +111,30 @@ CORS_ALLOW_CREDENTIALS = True
 AUTH_USER_MODEL = 'hotel.CustomUser'
 
 AUTHENTICATION_BACKENDS = [
-    'hotel.backends.EmailBackend',  # Use email for auth
-    'django.contrib.auth.backends.ModelBackend',  # Fallback
+    # Email logins, plus username logins through ModelBackend's code path, so no
+    # separate fallback backend (and second lookup) is needed
+    'hotel.backends.EmailBackend',
 ]
 
+# Password hashing policy. PASSWORD_HASHER picks the hasher for new passwords;
+# the others stay listed so older hashes still verify, and any hash not made
+# with the current hasher and cost is upgraded on the next successful login.
+# `manage.py bench_hashers` reports logins/sec per core for each setting.
+PASSWORD_HASHER_CHOICES = {
+    'pbkdf2': 'hotel.hashers.TunedPBKDF2PasswordHasher',
+    'argon2': 'hotel.hashers.TunedArgon2PasswordHasher',  # needs argon2-cffi
+    'scrypt': 'django.contrib.auth.hashers.ScryptPasswordHasher',
+    'bcrypt': 'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',  # needs bcrypt
+}
+PASSWORD_HASHER = os.getenv("PASSWORD_HASHER", "pbkdf2")
+PASSWORD_HASHERS = [PASSWORD_HASHER_CHOICES[PASSWORD_HASHER]] + [
+    path for name, path in PASSWORD_HASHER_CHOICES.items() if name != PASSWORD_HASHER
+] + ['django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher']
+PASSWORD_PBKDF2_ITERATIONS = int(os.getenv("PASSWORD_PBKDF2_ITERATIONS", "870000"))  # Django 5.1 default
+PASSWORD_ARGON2_TIME_COST = int(os.getenv("PASSWORD_ARGON2_TIME_COST", "2"))
+PASSWORD_ARGON2_MEMORY_COST = int(os.getenv("PASSWORD_ARGON2_MEMORY_COST", "102400"))  # KiB
+PASSWORD_ARGON2_PARALLELISM = int(os.getenv("PASSWORD_ARGON2_PARALLELISM", "8"))
+
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = 'smtp.gmail.com'
 EMAIL_PORT = 587
@@ -114,6 +142,11 @@ EMAIL_USE_TLS = True
 EMAIL_HOST_USER = os.getenv("EMAIL_HOST_USER")  # Replace with your Gmail
 EMAIL_HOST_PASSWORD = os.getenv("EMAIL_HOST_PASSWORD")
 DEFAULT_FROM_EMAIL = os.getenv("EMAIL_HOST_USER")
+
+# Outbound email queue (see hotel/mail.py and `manage.py send_queued_email`)
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.getenv("EMAIL_OUTBOX_MAX_ATTEMPTS", "5"))
+EMAIL_OUTBOX_RETRY_BASE = int(os.getenv("EMAIL_OUTBOX_RETRY_BASE", "60"))  # seconds, doubled per attempt
+EMAIL_OUTBOX_LEASE_SECONDS = int(os.getenv("EMAIL_OUTBOX_LEASE_SECONDS", "300"))
 from datetime import timedelta
 
 SIMPLE_JWT = {
@@ -123,11 +156,34 @@ SIMPLE_JWT = {
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'hotel.authentication.CachedJWTAuthentication',
     ],
+    # JSONRenderer's output through orjson (hotel/renderers.py)
+    'DEFAULT_RENDERER_CLASSES': [
+        'hotel.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    # Token buckets for the auth endpoints (see hotel/throttling.py): '<scope>'
+    # is per client IP, '<scope>_email' per email address in the request body
+    'DEFAULT_THROTTLE_RATES': {
+        'login': os.getenv("THROTTLE_LOGIN", "30/min"),
+        'login_email': os.getenv("THROTTLE_LOGIN_EMAIL", "5/min"),
+        'password_reset': os.getenv("THROTTLE_PASSWORD_RESET", "10/hour"),
+        'password_reset_email': os.getenv("THROTTLE_PASSWORD_RESET_EMAIL", "3/hour"),
+        'register': os.getenv("THROTTLE_REGISTER", "20/hour"),
+        'register_email': os.getenv("THROTTLE_REGISTER_EMAIL", "5/hour"),
+    },
+    # Reverse proxies in front of the app. The client IP the throttles key on
+    # is REMOTE_ADDR when 0, else read that many hops back in X-Forwarded-For;
+    # never trust the header when nothing in front of the app rewrites it.
+    'NUM_PROXIES': int(os.getenv("NUM_PROXIES", "0")),
 }
 
-ROOT_URLCONF = 'hotel_backend.urls'
+# Seconds an authenticated user's row may be served from the cache
+AUTH_USER_CACHE_TIMEOUT = int(os.getenv("AUTH_USER_CACHE_TIMEOUT", "60"))
+
+# hotel_backend/asgi.py switches to hotel_backend.urls_asgi
+ROOT_URLCONF = os.getenv("DJANGO_ROOT_URLCONF", 'hotel_backend.urls')
 
 TEMPLATES = [
     {
@@ -155,13 +211,109 @@ WSGI_APPLICATION = 'hotel_backend.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
-DATABASES = {
+# DATABASE_ENGINE picks the profile: 'sqlite' (default, single host) or 'postgres'.
+# Both keep connections open between requests (DATABASE_CONN_MAX_AGE seconds) and
+# check them before reuse.
+
+DATABASE_ENGINE = os.getenv("DATABASE_ENGINE", "sqlite")
+DATABASE_CONN_MAX_AGE = int(os.getenv("DATABASE_CONN_MAX_AGE", "60"))
+
+if DATABASE_ENGINE == 'postgres':
+    # Driver and pool: psycopg[pool] in requirements.txt
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.getenv("DATABASE_NAME", "hotel"),
+            'USER': os.getenv("DATABASE_USER", "hotel"),
+            'PASSWORD': os.getenv("DATABASE_PASSWORD", ""),
+            'HOST': os.getenv("DATABASE_HOST", "localhost"),
+            'PORT': os.getenv("DATABASE_PORT", "5432"),
+            'CONN_MAX_AGE': DATABASE_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {},
+        }
+    }
+    if os.getenv("DATABASE_POOL_MAX_SIZE"):
+        # psycopg's connection pool (needs psycopg[pool]) instead of one persistent
+        # connection per thread; Django requires CONN_MAX_AGE = 0 with it
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': int(os.getenv("DATABASE_POOL_MIN_SIZE", "2")),
+            'max_size': int(os.getenv("DATABASE_POOL_MAX_SIZE")),
+            'timeout': float(os.getenv("DATABASE_POOL_TIMEOUT", "10")),
+        }
+    # Streaming replicas of the primary, one alias per host
+    for number, host in enumerate(filter(None, os.getenv("DATABASE_REPLICA_HOSTS", "").split(',')), 1):
+        DATABASES[f'replica{number}'] = {
+            **DATABASES['default'], 'HOST': host.strip(), 'TEST': {'MIRROR': 'default'},
+        }
+else:
+    SQLITE_TIMEOUT = int(os.getenv("SQLITE_TIMEOUT", "20"))  # seconds to wait for the write lock
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.getenv("SQLITE_PATH", BASE_DIR / 'db.sqlite3'),
+            'CONN_MAX_AGE': DATABASE_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                # Take the write lock when a transaction starts, so booking creation
+                # serializes per database instead of failing with "database is locked"
+                'transaction_mode': 'IMMEDIATE',
+                'timeout': SQLITE_TIMEOUT,
+            },
+            'TEST': {
+                # File-backed test database so concurrent booking tests can use
+                # several connections at once
+                'NAME': BASE_DIR / 'test_db.sqlite3',
+            },
+        }
+    }
+    # Copies of the primary file, refreshed by `manage.py replica_heartbeat --copy-sqlite`
+    for number, path in enumerate(filter(None, os.getenv("SQLITE_REPLICA_PATHS", "").split(',')), 1):
+        DATABASES[f'replica{number}'] = {
+            **DATABASES['default'], 'NAME': path.strip(),
+            'TEST': {'NAME': BASE_DIR / f'test_replica{number}.sqlite3'},
+        }
+
+# Read replicas (hotel/replicas.py): only views using ReplicaReadMixin read from them,
+# and only while they are fresh enough.
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['hotel.routers.ReplicaRouter']
+DATABASE_REPLICA_MAX_LAG = float(os.getenv("DATABASE_REPLICA_MAX_LAG", "5"))  # seconds
+DATABASE_REPLICA_STICKY_SECONDS = int(os.getenv("DATABASE_REPLICA_STICKY_SECONDS", "60"))
+DATABASE_REPLICA_STATUS_TTL = int(os.getenv("DATABASE_REPLICA_STATUS_TTL", "15"))  # > heartbeat interval
+
+# Applied to every new SQLite connection (hotel/db.py). synchronous=NORMAL is
+# durable in WAL mode except for the last commits on power loss; mmap serves
+# reads from the page cache. The lock wait is the 'timeout' option above.
+SQLITE_PRAGMAS = {
+    'synchronous': os.getenv("SQLITE_SYNCHRONOUS", "normal"),
+    'mmap_size': int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+}
+# Stored in the database file, so set once by `manage.py migrate` (migration
+# 0014), not per connection. WAL lets readers run while a booking is written.
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "wal")
+
+# Cache
+# Local memory by default. Production should point CACHE_BACKEND/CACHE_LOCATION at a
+# shared cache (e.g. django.core.cache.backends.redis.RedisCache) so invalidation
+# reaches every worker process.
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': os.getenv("CACHE_BACKEND", 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv("CACHE_LOCATION", 'hotel-backend'),
     }
 }
 
+# Seconds a serialized room list/detail payload may stay cached (it is also
+# invalidated on every room or booking change)
+ROOM_CACHE_TIMEOUT = int(os.getenv("ROOM_CACHE_TIMEOUT", "3600"))
+
+# Nights of precomputed prices kept per room (see hotel/pricing.py); quotes
+# further out are priced rule by rule
+PRICING_CALENDAR_DAYS = int(os.getenv("PRICING_CALENDAR_DAYS", "730"))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -201,6 +353,29 @@ STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
+# Uploaded files (Room.image) and their variants, outside the source tree.
+# Served by Django only when DEBUG (hotel_backend/urls.py); in production the
+# web server maps MEDIA_URL to MEDIA_ROOT.
+MEDIA_ROOT = os.getenv("MEDIA_ROOT", BASE_DIR / 'media')
+MEDIA_URL = os.getenv("MEDIA_URL", "/media/")
+
+# Responsive room image variants (see hotel/images.py and `manage.py process_room_images`).
+# Names are content-hashed, so ROOM_IMAGE_VARIANT_DIR can be served with
+# "Cache-Control: public, max-age=31536000, immutable".
+ROOM_IMAGE_VARIANT_DIR = 'rooms/variants'
+ROOM_IMAGE_WIDTHS = [320, 640, 1280]
+ROOM_IMAGE_THUMBNAIL_SIZE = 160
+ROOM_IMAGE_QUALITY = 80
+
+# Background checks of Room.image_url (see hotel/image_urls.py and `manage.py probe_image_urls`)
+IMAGE_URL_MAX_BYTES = int(os.getenv("IMAGE_URL_MAX_BYTES", str(5 * 1024 * 1024)))
+IMAGE_URL_PROBE_TIMEOUT = float(os.getenv("IMAGE_URL_PROBE_TIMEOUT", "5"))
+IMAGE_URL_PROBE_WORKERS = int(os.getenv("IMAGE_URL_PROBE_WORKERS", "8"))
+IMAGE_URL_CACHE_TIMEOUT = int(os.getenv("IMAGE_URL_CACHE_TIMEOUT", "86400"))  # per URL
+IMAGE_URL_RETRY_SECONDS = int(os.getenv("IMAGE_URL_RETRY_SECONDS", "900"))  # before re-checking an unreachable URL
+# Off: URLs (and redirects) resolving to loopback, private or link-local addresses are refused
+IMAGE_URL_ALLOW_PRIVATE_HOSTS = os.getenv("IMAGE_URL_ALLOW_PRIVATE_HOSTS", "False").lower() == "true"
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
@@ -14,6 +14,8 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
+from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import path, include
 from django.http import HttpResponse
@@ -28,3 +30,6 @@ urlpatterns = [
     path('api/', include('hotel.urls')),  # Directly include hotel.urls under /api/
     path('api/password_reset/', include('django_rest_passwordreset.urls', namespace='password_reset')),
 ]
+
+# Uploads and image variants during development (empty unless DEBUG)
+urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -0,0 +1,14 @@
+"""
+URL configuration when served over ASGI (hotel_backend/asgi.py).
+
+The async read views take their paths first; everything else resolves as in
+hotel_backend/urls.py.
+"""
+from django.urls import include, path
+
+from .urls import urlpatterns as wsgi_urlpatterns
+
+urlpatterns = [
+    path('api/', include('hotel.urls_async')),
+    *wsgi_urlpatterns,
+]